@@ -188,6 +188,7 @@ from datatransport import ProcessClient
 from datatransport import newstool
 from datatransport import NewsPoller
 from datatransport import ConfigComponent
+from datatransport import clock
 
 # Fake the rrdtool module
 
@@ -300,14 +301,15 @@ class Period(ConfigComponent):
         self.log.info("        plotrate: %s" % self.plotrate)
 
         self.plotrate = self.plotrate.total_seconds()
-        self.next_plot_time = time.time()
+        self.next_plot_time = clock.time()
 
     def ready_to_plot(self):
-        return time.time() > self.next_plot_time
+        return clock.time() > self.next_plot_time
 
     def schedule_next_plot(self):
-        waittime = self.plotrate - time.time() % self.plotrate
-        self.next_plot_time = time.time() + waittime
+        curtime = clock.time()
+        waittime = self.plotrate - curtime % self.plotrate
+        self.next_plot_time = curtime + waittime
 
 
 ####################################################################
@@ -446,7 +448,7 @@ class Variable(ConfigComponent):
         timeout = timeout.total_seconds()
         duration = duration.total_seconds()
 
-        startTime = time.time() - duration
+        startTime = clock.time() - duration
 
         cmd = []
         cmd.append(self.database)
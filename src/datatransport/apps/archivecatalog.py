@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""ArchiveGroups file catalog"""
+
+##############################################################################
+#
+#   ArchiveGroups file catalog
+#
+#   Optional SQLite index of the files ArchiveGroups has written. Each
+#   file is recorded with its newsgroup, the time span and message
+#   range it covers and its size. Files are "open" while their time
+#   span is still being written to and closed when the span ends. The
+#   MD5 checksum of a closed file is only computed when asked for
+#   (checksum(), transport-catalog query --md5).
+#
+#   The catalog lets expiry run as an indexed range query on end_time
+#   instead of walking every checkpoint's history, and answers questions
+#   such as "which files cover 2026-03-02 for group X" without walking
+#   the archive directories (see transport-catalog).
+#
+#   The catalog can be rebuilt from the checkpoint store, which knows
+#   the newsgroup and time span of the files ArchiveGroups wrote. Only
+#   those files are ever expired. Other files found under an optional
+#   root directory can be listed too, but are kept open (closed=0) so
+#   expiry never removes them.
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#
+##############################################################################
+
+import hashlib
+import os
+import sqlite3
+import threading
+
+from datetime import datetime, UTC
+from pathlib import Path
+
+from datatransport.utilities import PatternTemplate
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS files (
+        path            TEXT PRIMARY KEY,
+        newsgroup       TEXT,
+        start_time      TEXT,
+        end_time        TEXT,
+        size            INTEGER,
+        first_message   INTEGER,
+        last_message    INTEGER,
+        md5             TEXT,
+        closed          INTEGER DEFAULT 0
+    );
+
+    CREATE INDEX IF NOT EXISTS files_end_time ON files (closed, end_time);
+    CREATE INDEX IF NOT EXISTS files_newsgroup ON files (newsgroup, start_time);
+"""
+
+COLUMNS = [
+    "path",
+    "newsgroup",
+    "start_time",
+    "end_time",
+    "size",
+    "first_message",
+    "last_message",
+    "md5",
+    "closed",
+]
+
+
+def encode_time(value):
+    """Datetime to sortable text (UTC)"""
+    return value.astimezone(UTC).isoformat()
+
+
+def file_md5(path):
+    """MD5 hexdigest of a file"""
+
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "md5").hexdigest()
+
+
+def history_naming(history=0, mode="rename"):
+    """
+    (span_name, history_name) functions giving the file names the way
+    ArchiveGroups does for output.history and output.history.mode
+    """
+
+    replace_history = PatternTemplate("history")
+
+    def slot(generation):
+        return str(generation % (history + 1))
+
+    def span_name(checkpoint, name):
+        if mode == "slots":
+            return replace_history(name, slot(checkpoint.generation))
+        return replace_history(name, "0")
+
+    def history_name(checkpoint, index, name):
+        if mode == "slots":
+            return replace_history(name, slot(checkpoint.generation - index - 1))
+        return replace_history(name, str(index))
+
+    return span_name, history_name
+
+
+def checkpoint_files(checkpoints, span_name=None, history_name=None):
+    """
+    Map the files the checkpoints know about to
+    (newsgroup, start_time, end_time, closed) for rebuild().
+    span_name(checkpoint, name) and history_name(checkpoint, index, name)
+    give the file names (see history_naming(), the default is rename
+    mode).
+    """
+
+    default_span_name, default_history_name = history_naming()
+
+    span_name = span_name or default_span_name
+    history_name = history_name or default_history_name
+
+    known = {}
+
+    for checkpoint in checkpoints:
+        group = checkpoint.newsgroup
+
+        for name in checkpoint.filenames:
+            path = os.path.abspath(span_name(checkpoint, name))
+            known[path] = (group, checkpoint.start_time, checkpoint.last_time, False)
+
+        for index, (filenames, last_time) in enumerate(checkpoint.history):
+            for name in filenames:
+                path = os.path.abspath(history_name(checkpoint, index, name))
+                known.setdefault(path, (group, last_time, last_time, True))
+
+    return known
+
+
+class ArchiveCatalog:
+    """SQLite index of archived files"""
+
+    def __init__(self, path, log=None):
+        self.path = Path(path)
+        self.log = log
+        self.lock = threading.RLock()
+
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    # Recording --------------------------------------------------------------
+
+    # pylint: disable=too-many-arguments
+    def record(self, path, newsgroup, msg_time, msg_num, size, new):
+        """
+        Record a write to path. A new file starts a new entry, otherwise
+        the existing entry is extended. size is the total file size.
+        """
+
+        path = os.path.abspath(path)
+        msg_time = encode_time(msg_time)
+
+        with self.lock:
+            if not new:
+                updated = self.conn.execute(
+                    "UPDATE files SET end_time=max(end_time, ?), size=?, "
+                    "last_message=max(last_message, ?), md5=NULL, closed=0, "
+                    "newsgroup=coalesce(newsgroup, ?) WHERE path=?",
+                    (msg_time, size, msg_num, newsgroup, path),
+                )
+                if updated.rowcount:
+                    return
+
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, NULL, 0)",
+                (path, newsgroup, msg_time, msg_time, size, msg_num, msg_num),
+            )
+
+    def finish(self, paths):
+        """Mark files as complete"""
+
+        with self.lock:
+            for path in paths:
+                self.conn.execute(
+                    "UPDATE files SET closed=1 WHERE path=?", (os.path.abspath(path),)
+                )
+
+    def checksum(self, path):
+        """MD5 of a closed file, computed on first use (None if unknown)"""
+
+        path = os.path.abspath(path)
+
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT md5, closed FROM files WHERE path=?", (path,)
+            ).fetchone()
+
+        if row is None or not row[1]:
+            return None
+
+        if row[0]:
+            return row[0]
+
+        try:
+            checksum = file_md5(path)
+        except OSError:
+            return None
+
+        with self.lock:
+            self.conn.execute(
+                "UPDATE files SET md5=? WHERE path=? AND closed=1", (checksum, path)
+            )
+
+        return checksum
+
+    def rename(self, oldpath, newpath):
+        """Follow a file that was renamed"""
+
+        with self.lock:
+            self.conn.execute(
+                "UPDATE OR REPLACE files SET path=? WHERE path=?",
+                (os.path.abspath(newpath), os.path.abspath(oldpath)),
+            )
+
+    def remove(self, path):
+        """Forget a file"""
+
+        with self.lock:
+            self.conn.execute(
+                "DELETE FROM files WHERE path=?", (os.path.abspath(path),)
+            )
+
+    # Queries ----------------------------------------------------------------
+
+    def expire(self, cutoff):
+        """
+        Remove the closed files whose last message is older than cutoff
+        from the catalog and return their paths
+        """
+
+        cutoff = encode_time(cutoff)
+
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path FROM files WHERE closed=1 AND end_time < ? "
+                "AND newsgroup IS NOT NULL",
+                (cutoff,),
+            ).fetchall()
+            self.conn.execute(
+                "DELETE FROM files WHERE closed=1 AND end_time < ? "
+                "AND newsgroup IS NOT NULL",
+                (cutoff,),
+            )
+
+        return [path for (path,) in rows]
+
+    def query(self, newsgroup=None, start=None, stop=None):
+        """Files (as dicts) overlapping [start, stop], oldest first"""
+
+        where = []
+        params = []
+
+        if newsgroup:
+            where.append("newsgroup GLOB ?")
+            params.append(newsgroup)
+
+        if start:
+            where.append("end_time >= ?")
+            params.append(encode_time(start))
+
+        if stop:
+            where.append("start_time <= ?")
+            params.append(encode_time(stop))
+
+        sql = f"SELECT {', '.join(COLUMNS)} FROM files"
+
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+
+        sql += " ORDER BY newsgroup, start_time"
+
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def stats(self):
+        """Number of files and bytes per newsgroup"""
+
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT newsgroup, count(*), sum(size), min(start_time), "
+                "max(end_time) FROM files GROUP BY newsgroup ORDER BY newsgroup"
+            ).fetchall()
+
+        keys = ["newsgroup", "files", "bytes", "start_time", "end_time"]
+
+        return [dict(zip(keys, row)) for row in rows]
+
+    # Rebuilding -------------------------------------------------------------
+
+    def rebuild(self, known, root=None):
+        """
+        Replace the catalog with the known files, which maps absolute
+        paths to (newsgroup, start_time, end_time, closed). Other files
+        under root (if given) are added as open, so they never expire.
+        """
+
+        count = 0
+
+        with self.lock:
+            self.conn.execute("DELETE FROM files")
+
+            for path, (newsgroup, start_time, end_time, closed) in known.items():
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    continue
+
+                self.insert(path, newsgroup, start_time, end_time, size, closed)
+                count += 1
+
+            if root:
+                count += self.add_unknown(root, known)
+
+            self.conn.commit()
+
+        if self.log:
+            self.log.info("Catalog rebuilt with %d files", count)
+
+        return count
+
+    def add_unknown(self, root, known):
+        """Add the files under root that are not known (as open)"""
+
+        count = 0
+
+        for dirpath, dirnames, filenames in os.walk(root):
+            # Skip staging and temporary files
+            dirnames[:] = [name for name in dirnames if name[0] != "."]
+
+            for filename in filenames:
+                if filename.startswith("."):
+                    continue
+
+                path = os.path.abspath(os.path.join(dirpath, filename))
+
+                if path in known:
+                    continue
+
+                try:
+                    info = os.stat(path)
+                except OSError:
+                    continue
+
+                mtime = datetime.fromtimestamp(info.st_mtime, UTC)
+                self.insert(path, None, mtime, mtime, info.st_size, False)
+                count += 1
+
+        return count
+
+    # pylint: disable=too-many-arguments
+    def insert(self, path, newsgroup, start_time, end_time, size, closed):
+        """Add a file entry"""
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, NULL, NULL, NULL, ?)",
+            (
+                path,
+                newsgroup,
+                encode_time(start_time),
+                encode_time(end_time),
+                size,
+                int(closed),
+            ),
+        )
+
+    def commit(self):
+        """Commit pending changes"""
+
+        with self.lock:
+            self.conn.commit()
+
+    def close(self):
+        """Commit and close the database"""
+
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
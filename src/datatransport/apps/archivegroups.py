@@ -360,38 +360,108 @@
 #   2026-04-29  Todd Valentic
 #               Fix datetime.UTC -> UTC
 #
+#   2026-10-19  Todd Valentic
+#               now() uses the installed clock (simulation support)
+#               Replace the shelve checkpoint database with an SQLite
+#                   store that only writes changes (see archivestore.py).
+#                   The old checkpoint.db is imported on first use.
+#                   New options: checkpoint.path, checkpoint.batch
+#               Process newsgroups concurrently with input.workers, each
+#                   worker on its own connection. Groups are scheduled
+#                   by input.priority then backlog and processed in
+#                   slices of input.slice messages so a large backlog
+#                   does not hold up the other groups.
+#               Decode attachments into a staging directory on the
+#                   archive filesystem (output.staging) and rename them
+#                   into place. Appends and cross-filesystem saves use
+#                   copy_file_range(). overwrite=false uses os.link()
+#                   so an existing file is never replaced.
+#               Keep output files open between appends when
+#                   concatenating (output.cache.size, output.cache.idle,
+#                   output.cache.fsync). Checkpoint.on_reset closes
+#                   them when a time span ends.
+#               Join split files (X-Transport-Part) with PartAssembler.
+#                   Parts are appended in order as they arrive with a
+#                   running MD5 and tracked in the checkpoint store.
+#                   Stale assemblies are removed after parts.max_age.
+#               Uncompress in-process (gzip, bz2, lzma, zstd) instead of
+#                   running gunzip/bunzip2. Messages with several
+#                   compressed files use a process pool when
+#                   output.uncompress.workers > 1.
+#               Match newsgroups, filenames and rules with compiled
+#                   GlobMatchers and parse the output path template
+#                   once per rule (CompiledTemplate).
+#               Only process groups whose high mark has moved past the
+#                   checkpoint. Idle group timeouts are kept in a heap
+#                   keyed by poll_time + timeout.
+#               Optional archive catalog (catalog.enable) recording each
+#                   file written. Expiry uses the catalog when enabled
+#                   and only removes files from the checkpoints (and
+#                   drops them from the checkpoint history). Other
+#                   files under catalog.root are listed but kept.
+#               output.history.mode=slots writes each span into slot
+#                   generation % (history+1) instead of renaming every
+#                   history file, and keeps a JSON index of the slots
+#                   (output.history.index).
+#               output.container=tar packs the files into tar containers
+#                   (named by the output rules) with a sidecar index
+#                   for direct access by name or time.
+#               Seek to input.start_time and stop at input.stop_time with
+#                   a binary search over the article dates (XHDR) instead
+#                   of downloading every article in between
+#                   (input.seek, input.seek.headers, input.seek.window,
+#                   input.seek.margin).
+#
 ##############################################################################
 
+import collections
+import heapq
+import json
+import concurrent.futures
 import email
+import errno
 import fnmatch
-import glob
 import math
+import multiprocessing
+import nntplib
 import os
-import shelve
-import shutil
 import stat
 import sys
-import subprocess
+import tempfile
+import threading
 import traceback
 
 from datetime import datetime, UTC
-from hashlib import md5
 from pathlib import Path
 
 from datatransport import ProcessClient
 from datatransport import NewsPoster
 from datatransport import newstool
+from datatransport import clock
+from datatransport.apps.archivecatalog import ArchiveCatalog
+from datatransport.apps.archivecatalog import checkpoint_files
+from datatransport.apps.archivestore import CheckpointStore
+from datatransport.apps import container
+from datatransport.apps.dateindex import DateIndex
+from datatransport.apps.handlecache import HandleCache
+from datatransport.apps.partassembly import PartAssembler
 
 from datatransport.utilities import size_desc
 from datatransport.utilities import remove_file
 from datatransport.utilities import PatternTemplate
+from datatransport.utilities import CompiledTemplate
+from datatransport.utilities import GlobMatcher
+from datatransport.utilities import compile_globs
 from datatransport.utilities import datefunc
 from datatransport.utilities import make_path
+from datatransport.utilities import copy_into
+from datatransport.utilities import decompress_file
+from datatransport.utilities import is_compressed
 
 
 def now():
     """Return current time"""
-    return datetime.now(UTC)
+    return clock.now()
 
 
 class Checkpoint:
@@ -416,6 +486,13 @@ class Checkpoint:
         self.history = []
         self.max_history = max_history
 
+        # Count of closed spans, selects the slot in slots history mode
+        self.generation = 0
+
+        # Called with the checkpoint when a span with files is reset
+        # (not stored)
+        self.on_reset = None
+
     def update_message(self, msg_num, date=None):
         """Update current state"""
 
@@ -450,9 +527,13 @@ class Checkpoint:
         if not date:
             date = now()
 
+        if self.filenames and getattr(self, "on_reset", None):
+            self.on_reset(self)
+
         if self.filenames:
             self.history.insert(0, (self.filenames, self.last_time))
             self.history = self.history[0 : self.max_history + 1]
+            self.generation = getattr(self, "generation", 0) + 1
 
             if self.keep_summary:
                 self.summary_files.append(self.filenames)
@@ -604,6 +685,18 @@ class ArchiveGroups(ProcessClient):
         self.start_current_reset = self.config.get_boolean(
             "input.start_current.reset", True
         )
+        self.workers = self.config.get_int("input.workers", 1)
+        self.slice = self.config.get_int("input.slice", 100)
+        self.priority = self.config.get_list("input.priority")
+        self.seek = self.config.get_boolean("input.seek", True)
+        self.seek_headers = self.config.get_list("input.seek.headers")
+        self.seek_window = self.config.get_int("input.seek.window", 20)
+        self.seek_margin = self.config.get_int("input.seek.margin", 0)
+
+        # Workers overlap retrieving articles, but only one at a time
+        # saves files (they share the working directory and templates)
+
+        self.process_lock = threading.RLock()
 
         self.dest_path = self.config.get("output.path", "")
         self.dest_name = self.config.get("output.name", "<rule>")
@@ -612,9 +705,24 @@ class ArchiveGroups(ProcessClient):
         self.max_messages = self.config.get_int("output.max_messages", 1)
         self.expire = self.config.get_timedelta("output.expire", None)
         self.history = self.config.get_int("output.history", 0)
+        self.history_mode = self.config.get("output.history.mode", "rename")
+        self.history_index = self.config.get(
+            "output.history.index", "history/<newsgroup>.json"
+        )
         self.plain_text_name = self.config.get("output.plain_text_name", "noname.txt")
         self.uncompress = self.config.get_boolean("output.uncompress", False)
+        self.uncompress_workers = self.config.get_int("output.uncompress.workers", 1)
+        self.uncompress_executor = None
         self.overwrite = self.config.get_boolean("output.overwrite", True)
+        self.container = self.config.get("output.container", None)
+        self.staging_path = self.find_staging_path()
+
+        self.handles = HandleCache(
+            self.config.get_int("output.cache.size", 16),
+            self.config.get_timedelta("output.cache.idle", 60).total_seconds(),
+            self.config.get("output.cache.fsync", "never"),
+            self.log,
+        )
 
         self.report_subject = self.config.get(
             "report.subject", "Newsgroup archive report"
@@ -644,6 +752,19 @@ class ArchiveGroups(ProcessClient):
 
         self.debug = self.config.get_boolean("debug", False)
 
+        self.checkpoint_path = self.config.get("checkpoint.path", "checkpoint.sqlite")
+        self.checkpoint_batch = self.config.get_int("checkpoint.batch", 100)
+
+        self.parts_path = self.config.get(
+            "parts.path", os.path.join(self.staging_path, "work")
+        )
+        self.parts_max_age = self.config.get_timedelta("parts.max_age", 60 * 60 * 24)
+
+        self.catalog_enable = self.config.get_boolean("catalog.enable", False)
+        self.catalog_path = self.config.get("catalog.path", "catalog.sqlite")
+        self.catalog_root = self.config.get("catalog.root", None)
+        self.catalog_rebuild = self.config.get_boolean("catalog.rebuild", False)
+
         self.include_newsgroups = self.config.get_list("input.newsgroups")
         self.exclude_newsgroups = self.config.get_list("input.newsgroups.exclude")
         self.include_filenames = self.config.get_list("input.filenames", "*")
@@ -663,32 +784,128 @@ class ArchiveGroups(ProcessClient):
             self.log.exception("There was a problem parsing output.rules.")
             self.abort()
 
+        self.match_newsgroup = GlobMatcher(
+            self.include_newsgroups, self.exclude_newsgroups
+        )
+        self.match_filename = GlobMatcher(
+            self.include_filenames, self.exclude_filenames
+        )
+
+        self.rule_matchers = [
+            (
+                compile_globs([grouppattern]).match,
+                compile_globs([filepattern]).match,
+                rule,
+            )
+            for grouppattern, filepattern, rule in self.rules
+        ]
+        self.group_rules = {}
+        self.path_templates = {}
+
+        # Heap of (poll_time + timeout, newsgroup) for active groups
+
+        self.timeouts = []
+        self.listed = set()
+
+        # Article dates for seeking to the start and stop times. Groups
+        # already past the start time do not need to seek for it again.
+
+        self.date_index = DateIndex(self.seek_headers, self.seek_window)
+        self.seek_started = set()
+
         self.validate_setup()
         self.setup_database()
+        self.setup_catalog()
 
     def __del__(self):
         try:
+            self.handles.close_all()
             self.database.close()
+            if self.catalog:
+                self.catalog.close()
         except:
             pass
 
     def setup_database(self):
         """Setup checkpoint database"""
 
-        self.database = shelve.open("checkpoint.db")
+        self.database = CheckpointStore(
+            self.checkpoint_path,
+            Checkpoint,
+            legacy="checkpoint.db",
+            batch=self.checkpoint_batch,
+            log=self.log,
+        )
+
+        self.assembler = PartAssembler(self.database, self.parts_path, self.log)
 
         # Update the config parameters in the database to new values.
+        # These are not stored, so there is nothing to write.
 
-        for key, checkpoint in self.database.items():
+        for _key, checkpoint in self.database.items():
             checkpoint.max_history = self.history
             checkpoint.keep_summary = self.summary_enable
             checkpoint.summary_max_files = self.summary_max_files
-            self.database[key] = checkpoint
+            checkpoint.on_reset = self.close_span
+
+    def setup_catalog(self):
+        """Open the archive catalog if enabled"""
+
+        self.catalog = None
+
+        if not self.catalog_enable:
+            return
+
+        exists = os.path.exists(self.catalog_path)
+
+        self.catalog = ArchiveCatalog(self.catalog_path, self.log)
+
+        if self.catalog_rebuild or not exists:
+            checkpoints = [checkpoint for _key, checkpoint in self.database.items()]
+            known = checkpoint_files(checkpoints, self.span_name, self.history_name)
+            self.catalog.rebuild(known, self.catalog_root)
+
+    def close_span(self, checkpoint):
+        """Close any open output files at the end of a time span"""
+
+        paths = [self.span_name(checkpoint, name) for name in checkpoint.filenames]
+
+        for path in paths:
+            self.handles.close(path)
+
+        if self.catalog:
+            self.catalog.finish(paths)
 
-        # Make sure that the on-disk files are initialized, otherwise they will
-        # be zero-length and cause problems next time if opened that way.
+    def find_staging_path(self):
+        """Directory to decode attachments into before they are saved"""
 
-        self.database.sync()
+        staging = self.config.get("output.staging", None)
+
+        if staging:
+            return Path(staging).absolute() if staging != "." else Path(".")
+
+        # Default to a directory on the same filesystem as the archive
+        # so that saving a file is a rename instead of a copy.
+
+        base = Path(self.dest_path.split("<")[0].split("%")[0] or ".").absolute()
+
+        while not base.exists() and base != base.parent:
+            base = base.parent
+
+        if base.stat().st_dev == Path(".").stat().st_dev:
+            return Path(".")
+
+        name = f".staging.{self.groupname.replace('/', '.')}.{self.name}"
+
+        return base.joinpath(name)
+
+    def source_name(self, filename):
+        """Filename as it appeared in the message (without staging path)"""
+
+        try:
+            return str(Path(filename).relative_to(self.staging_path))
+        except ValueError:
+            return str(filename)
 
     def validate_setup(self):
         """Validate setup"""
@@ -717,6 +934,10 @@ class ArchiveGroups(ProcessClient):
                 )
                 self.abort("Exiting")
 
+        if self.container and self.container != "tar":
+            self.log.error("Unknown output.container: %s", self.container)
+            self.abort("Exiting")
+
         self.log.debug("Watching these newsgroups (+ = include, - = exclude):")
         for newsgroup in self.include_newsgroups:
             self.log.debug("  + %s", newsgroup)
@@ -740,41 +961,37 @@ class ArchiveGroups(ProcessClient):
             high_mark = int(high_mark)
             low_mark = int(low_mark)
 
-            for incgroup in self.include_newsgroups:
-                if fnmatch.fnmatch(newsgroup, incgroup):
-                    keep = 1
-                    for excgroup in self.exclude_newsgroups:
-                        if fnmatch.fnmatch(newsgroup, excgroup):
-                            keep = 0
-                            break
-                    if keep:
-                        groups.append((newsgroup, low_mark, high_mark))
-                        if not newsgroup in self.database:
-                            checkpoint = Checkpoint(
-                                newsgroup, low_mark, self.history, self.summary_enable
-                            )
-                            self.database[newsgroup] = checkpoint
-                            self.database.sync()
+            if not self.match_newsgroup(newsgroup):
+                continue
+
+            groups.append((newsgroup, low_mark, high_mark))
+
+            if not newsgroup in self.database:
+                checkpoint = Checkpoint(
+                    newsgroup, low_mark, self.history, self.summary_enable
+                )
+                checkpoint.on_reset = self.close_span
+                self.database[newsgroup] = checkpoint
+
+        # Groups that are new (or back) on the server may need timing out
+
+        listed = {newsgroup for newsgroup, _low_mark, _high_mark in groups}
+
+        for newsgroup in listed.difference(self.listed):
+            self.schedule_timeout(self.database[newsgroup])
+
+        self.listed = listed
 
         return groups
 
     def filter_filenames(self, filenames):
         """Filter filenames"""
 
-        goodfiles = []
-
-        for filename in filenames:
-            for incpattern in self.include_filenames:
-                if fnmatch.fnmatch(filename, incpattern):
-                    keep = 1
-                    for excpattern in self.exclude_filenames:
-                        if fnmatch.fnmatch(filename, excpattern):
-                            keep = 0
-                            break
-                    if keep:
-                        goodfiles.append(filename)
-
-        return goodfiles
+        return [
+            filename
+            for filename in filenames
+            if self.match_filename(self.source_name(filename))
+        ]
 
     def get_file_time(self, _newsgroup, _filename):
         """Get timestamp from filename"""
@@ -783,11 +1000,9 @@ class ArchiveGroups(ProcessClient):
     def compute_name(self, filename, checkpoint):
         """Compute filename"""
 
+        filename = self.source_name(filename)
         rule = self.find_rule(checkpoint.newsgroup, filename)
 
-        path = os.path.join(self.dest_path, self.dest_name)
-        path = self.replace_rule(path, rule)
-
         try:
             filetime = self.config.get_file_time(checkpoint.newsgroup, filename)
         except:
@@ -805,23 +1020,54 @@ class ArchiveGroups(ProcessClient):
         #        of the expansion here, helped, but I need to
         #        figure out a better way of doing this...
 
-        path = self.replace_newsgroup(path, checkpoint.newsgroup)
-        path = self.replace_proc_group(path, self.groupname)
-        path = self.replace_client_name(path, self.name)
-        path = self.replace_filename(path, str(filename))
-        path = self.replace_header(path)
-        path = filetime.strftime(path)
+        template = self.path_template(rule)
+
+        path = template(
+            {
+                "newsgroup": checkpoint.newsgroup,
+                "procgroup": self.groupname,
+                "clientname": self.name,
+                "filename": str(filename),
+            }
+        )
+
+        return filetime.strftime(path)
+
+    def path_template(self, rule):
+        """Output path template for a rule, parsed once"""
 
-        return path
+        if rule not in self.path_templates:
+            path = os.path.join(self.dest_path, self.dest_name)
+            path = self.replace_rule(path, rule)
+
+            self.path_templates[rule] = CompiledTemplate(
+                path,
+                [
+                    self.replace_newsgroup,
+                    self.replace_proc_group,
+                    self.replace_client_name,
+                    self.replace_filename,
+                    self.replace_header,
+                ],
+            )
+
+        return self.path_templates[rule]
 
     def find_rule(self, newsgroup, filename):
         """Find matching rule"""
 
-        for rule in self.rules:
-            if fnmatch.fnmatch(newsgroup, rule[0]) and fnmatch.fnmatch(
-                filename, rule[1]
-            ):
-                return rule[2]
+        # Only the rules for this newsgroup need checking per file
+
+        if newsgroup not in self.group_rules:
+            self.group_rules[newsgroup] = [
+                (match_filename, rule)
+                for match_newsgroup, match_filename, rule in self.rule_matchers
+                if match_newsgroup(newsgroup)
+            ]
+
+        for match_filename, rule in self.group_rules[newsgroup]:
+            if match_filename(filename):
+                return rule
 
         return ""
 
@@ -869,6 +1115,27 @@ class ArchiveGroups(ProcessClient):
         except:
             self.log.error("Error posting summary message")
 
+    def slot(self, generation):
+        """History slot used by a generation"""
+        return str(generation % (self.history + 1))
+
+    def span_name(self, checkpoint, name):
+        """Filename for the current span"""
+
+        if self.history_mode == "slots":
+            return self.replace_history(name, self.slot(checkpoint.generation))
+
+        return self.replace_history(name, str(0))
+
+    def history_name(self, checkpoint, index, name):
+        """Filename for entry index in the checkpoint history"""
+
+        if self.history_mode == "slots":
+            generation = checkpoint.generation - index - 1
+            return self.replace_history(name, self.slot(generation))
+
+        return self.replace_history(name, str(index))
+
     def roll_files(self, checkpoint):
         """Only keep N files"""
 
@@ -880,6 +1147,10 @@ class ArchiveGroups(ProcessClient):
             self.log.debug("  no files to roll")
             return
 
+        if self.history_mode == "slots":
+            self.roll_slots(checkpoint)
+            return
+
         history_index = list(range(len(checkpoint.history)))
         history_index.reverse()
 
@@ -895,14 +1166,66 @@ class ArchiveGroups(ProcessClient):
                         if oldname == newname:
                             self.log.debug("  keeping  %s", oldname)
                         else:
-                            os.rename(oldname, newname)
+                            self.rename_output(oldname, newname)
                             self.log.debug("  copying  %s -> %s", oldname, newname)
                     else:
-                        os.remove(oldname)
+                        self.remove_output(oldname)
                         self.log.debug("  removing %s", oldname)
                 except:
                     pass
 
+    def roll_slots(self, checkpoint):
+        """Free the slot for the new span and update the history index"""
+
+        # Files are never renamed. Each span is written to slot
+        # generation % (history + 1), so the only work is removing
+        # the oldest generation, which used the slot being reused.
+
+        if len(checkpoint.history) > checkpoint.max_history:
+            for index in range(checkpoint.max_history, len(checkpoint.history)):
+                for filename in checkpoint.history[index][0]:
+                    oldname = self.history_name(checkpoint, index, filename)
+                    try:
+                        self.remove_output(oldname)
+                        self.log.debug("  removing %s", oldname)
+                    except OSError:
+                        pass
+
+            del checkpoint.history[checkpoint.max_history :]
+
+        self.write_history_index(checkpoint)
+
+    def write_history_index(self, checkpoint):
+        """Atomically replace the index of history files for a newsgroup"""
+
+        if not self.history_index:
+            return
+
+        index = {
+            "newsgroup": checkpoint.newsgroup,
+            "generation": checkpoint.generation,
+            "current": self.slot(checkpoint.generation),
+            "history": [
+                {
+                    "index": position + 1,
+                    "last_time": last_time.isoformat(),
+                    "files": [
+                        self.history_name(checkpoint, position, name)
+                        for name in filenames
+                    ],
+                }
+                for position, (filenames, last_time) in enumerate(checkpoint.history)
+            ],
+        }
+
+        filename = self.replace_newsgroup(self.history_index, checkpoint.newsgroup)
+        make_path(filename, self.dest_path_mode)
+
+        fd, tmpname = tempfile.mkstemp(dir=os.path.dirname(filename) or ".")
+        with os.fdopen(fd, "w") as output:
+            json.dump(index, output, indent=4)
+        os.replace(tmpname, filename)
+
     def save_callback(self, filename):
         """Save callback"""
 
@@ -912,19 +1235,61 @@ class ArchiveGroups(ProcessClient):
     def save_handler(self, srcname, destname, mode):
         """Save handler"""
 
-        srcfile = open(srcname, "rb")
-        destfile = open(destname, mode)
-        shutil.copyfileobj(srcfile, destfile)
-        srcfile.close()
-        destfile.close()
-        os.chmod(destname, self.dest_file_mode)
+        # Append in place. The file is not opened with O_APPEND because
+        # copy_file_range() does not support it.
+
+        if mode == "ab" and os.path.exists(destname):
+            destfile = self.handles.get(destname)
+            copy_into(srcname, destfile)
+            self.handles.written(destfile)
+            return
+
+        self.handles.close(destname)
+
+        # New file. Rename the source into place if it is on the same
+        # filesystem, otherwise copy to a temporary file next to the
+        # destination first so the file appears atomically.
+
+        os.chmod(srcname, self.dest_file_mode)
+
+        try:
+            self.place_file(srcname, destname)
+            return
+        except OSError as err:
+            if err.errno != errno.EXDEV:
+                raise
+
+        destdir = os.path.dirname(destname)
+        fd, tempname = tempfile.mkstemp(dir=destdir, prefix=".", suffix=".tmp")
+
+        try:
+            with os.fdopen(fd, "wb") as destfile:
+                copy_into(srcname, destfile)
+            os.chmod(tempname, self.dest_file_mode)
+            self.place_file(tempname, destname)
+        finally:
+            remove_file(tempname)
+
+    def place_file(self, srcname, destname):
+        """Move a file into place, only replacing the destination if allowed"""
+
+        if self.overwrite:
+            os.replace(srcname, destname)
+            return
+
+        try:
+            os.link(srcname, destname)
+        except FileExistsError:
+            self.log.debug("  destination exists - not saving")
+
+        os.remove(srcname)
 
     def save_file(self, srcname, checkpoint):
         """Save single file"""
 
         num_bytes = os.stat(srcname)[stat.ST_SIZE]
         name = self.compute_name(srcname, checkpoint)
-        destname = self.replace_history(name, str(0))
+        destname = self.span_name(checkpoint, name)
         destname = os.path.abspath(destname)
 
         self.log.debug("Saving %s", srcname)
@@ -933,11 +1298,16 @@ class ArchiveGroups(ProcessClient):
         self.log.debug("  nummessages: %d", checkpoint.num_messages)
         self.log.debug("  is_active: %s", checkpoint.is_active())
 
-        if not self.overwrite and os.path.exists(destname):
+        if self.container:
+            # Members are always added, the name sets the container
+            mode = "ab" if os.path.exists(destname) else "wb"
+            self.log.info("Pack  : %s -> %s", srcname, destname)
+
+        elif not self.overwrite and os.path.exists(destname):
             self.log.debug("  destination exists - not saving")
             return
 
-        if self.max_messages != 1 and checkpoint.is_active():
+        elif self.max_messages != 1 and checkpoint.is_active():
             mode = "ab"
             self.log.info("Concat: %s -> %s", srcname, destname)
         else:
@@ -951,10 +1321,11 @@ class ArchiveGroups(ProcessClient):
             raise err
 
         try:
-            if os.path.abspath(srcname) != destname:
+            if self.container:
+                self.pack_file(srcname, destname)
+            elif os.path.abspath(srcname) != destname:
                 self.save_handler(srcname, destname, mode)
-
-            if os.path.isfile(destname):
+            elif os.path.isfile(destname):
                 os.chmod(destname, self.dest_file_mode)
         except:
             self.log.exception("Problem saving file")
@@ -967,29 +1338,102 @@ class ArchiveGroups(ProcessClient):
 
         checkpoint.update_file(name, num_bytes)
 
-    def uncompress_file(self, cmd, filename):
-        """Uncompress file if needed"""
+        if self.catalog:
+            self.catalog.record(
+                destname,
+                checkpoint.newsgroup,
+                self.msg_time,
+                self.msg_num,
+                os.path.getsize(destname),
+                mode == "wb",
+            )
 
-        uncompressname = filename.stem
+    def pack_file(self, srcname, destname):
+        """Add a file to a container"""
 
-        try:
-            status, output = subprocess.getstatusoutput(f"{cmd} {filename}")
-        except IOError:
-            self.abort("Error running uncompression: %s", cmd)
+        new = not os.path.exists(destname)
 
-        if status == 0:
-            self.log.debug("  uncompressing: %s", filename)
+        container.append_file(
+            destname,
+            srcname,
+            self.source_name(srcname),
+            self.msg_time,
+            self.dest_file_mode,
+        )
+
+        if new:
+            os.chmod(destname, self.dest_file_mode)
+
+    def remove_output(self, filename):
+        """Remove an output file (and its index for containers)"""
+
+        if self.catalog:
+            self.catalog.remove(filename)
+
+        if self.container:
+            container.remove_container(filename)
+        else:
+            os.remove(filename)
+
+    def rename_output(self, oldname, newname):
+        """Rename an output file (and its index for containers)"""
+
+        os.rename(oldname, newname)
+
+        if self.container and container.index_name(oldname).exists():
+            os.rename(container.index_name(oldname), container.index_name(newname))
+
+        if self.catalog:
+            self.catalog.rename(oldname, newname)
+
+    def uncompress_pool(self):
+        """Process pool for decompressing several files at once"""
+
+        if self.uncompress_executor is None:
+            self.uncompress_executor = concurrent.futures.ProcessPoolExecutor(
+                self.uncompress_workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+
+        return self.uncompress_executor
+
+    def uncompress_files(self, filenames):
+        """Uncompress files if needed, returns the resulting filenames"""
+
+        compressed = [name for name in filenames if is_compressed(name)]
+
+        if not self.uncompress or not compressed:
+            return filenames
+
+        if self.uncompress_workers > 1 and len(compressed) > 1:
+            pool = self.uncompress_pool()
+            jobs = {name: pool.submit(decompress_file, name) for name in compressed}
         else:
-            subject = "Archive: Error umcompressing file"
-            note = []
-            note.append("Error trying to uncompress file")
-            note.append("   command: %s", cmd)
-            note.append("   status:  %d", status)
-            note.append("   output:  %s", output)
-            self.post_error(subject, note)
-            return None
+            jobs = {}
 
-        return Path(uncompressname)
+        results = []
+
+        for filename in filenames:
+            if filename not in compressed:
+                results.append(filename)
+                continue
+
+            self.log.debug("  uncompressing: %s", filename)
+
+            try:
+                if filename in jobs:
+                    results.append(jobs[filename].result())
+                else:
+                    results.append(decompress_file(filename))
+            except Exception as err:  # pylint: disable=broad-exception-caught
+                subject = "Archive: Error uncompressing file"
+                note = []
+                note.append("Error trying to uncompress file")
+                note.append(f"   filename: {filename}")
+                note.append(f"   error:    {err}")
+                self.post_error(subject, note)
+
+        return results
 
     def last_tracback(self):
         """Format last traceback"""
@@ -1019,6 +1463,7 @@ class ArchiveGroups(ProcessClient):
         # Hack alert - the callbacks sometimes want access to
         # the message time.
         self.msg_time = msg_time
+        self.msg_num = msg_num
 
         # Roll old files
 
@@ -1028,19 +1473,7 @@ class ArchiveGroups(ProcessClient):
 
         # Uncompress any files that need it
 
-        uncompressedfiles = []
-
-        for filename in filenames:
-            if self.uncompress:
-                # if filename.suffix == ".zip":
-                #    filename = self.uncompress_file("unzip -o", filename)
-                if filename.suffix == ".gz":
-                    filename = self.uncompress_file("gunzip -f", filename)
-                elif filename.suffix == ".bz2":
-                    filename = self.uncompress_file("bunzip2 -f", filename)
-
-            if filename:
-                uncompressedfiles.append(filename)
+        uncompressedfiles = self.uncompress_files(filenames)
 
         # Run the callback function if needed
 
@@ -1105,17 +1538,28 @@ class ArchiveGroups(ProcessClient):
 
         return message
 
+    def retrieve_message(self, newsserver, msg_num):
+        """Retrieve and parse an article"""
+
+        article = newsserver.article(str(msg_num))[1]
+        return email.message_from_bytes(b"\n".join(article.lines))
+
     def process_message(self, newsserver, msg_num, checkpoint):
         """Process message"""
 
         try:
-            article = newsserver.article(str(msg_num))[1]
-            message = email.message_from_bytes(b"\n".join(article.lines))
+            message = self.retrieve_message(newsserver, msg_num)
         except:
             self.log.exception("    unable to retrieve article body")
             checkpoint.touch_message(msg_num)
             return
 
+        with self.process_lock:
+            self.archive_message(message, msg_num, checkpoint)
+
+    def archive_message(self, message, msg_num, checkpoint):
+        """Save the files in a message"""
+
         message = self.modify_message(message)
 
         if not message:
@@ -1164,7 +1608,7 @@ class ArchiveGroups(ProcessClient):
                 checkpoint.reset(msg_time, msg_num)
 
         try:
-            filenames = newstool.save_files(message)
+            filenames = newstool.save_files(message, path=self.staging_path)
         except:
             self.log.exception("    rejecting - unable to parse message body")
             checkpoint.touch_message(msg_num)
@@ -1174,54 +1618,47 @@ class ArchiveGroups(ProcessClient):
             # Assumes that there is only one part attached
 
             part, total = map(int, message["X-Transport-Part"].split("/"))
-            srcname = os.path.basename(filenames[0])
             destname = os.path.basename(message["X-Transport-Filename"])
-            workdir = os.path.join("work", checkpoint.newsgroup, destname)
-            workname = os.path.join(workdir, srcname)
-
-            if not os.path.exists(workdir):
-                os.makedirs(workdir)
-
-            shutil.move(srcname, workname)
-
-            parts = sorted(glob.glob(os.path.join(workdir, "*")))
-
-            if len(parts) == total:
-                with Path(destname).open("wb") as destfile:
-                    for filepart in parts:
-                        contents = Path(filepart).read_bytes()
-                        destfile.write(contents)
-
-                remove_file(parts)
-                os.rmdir(workdir)
-
-                self.log.debug("Joined split message: %d parts", total)
+            destname = os.path.join(self.staging_path, destname)
+
+            checksum = self.assembler.add(
+                checkpoint.newsgroup,
+                os.path.basename(destname),
+                part,
+                total,
+                filenames[0],
+                destname,
+                msg_time,
+            )
 
-                if "x-transport-md5" in message:
-                    orgmd5 = message["x-transport-md5"]
-                    newmd5 = md5(Path(destname).read_bytes()).hexdigest()
-                    if orgmd5 == newmd5:
-                        self.log.debug("  MD5 checksum matches")
-                        filenames = [destname]
-                    else:
-                        subject = "Archive: MD5 mismatch"
+            if checksum is None:
+                self.log.debug("Joining split message: part %d of %d", part, total)
+                checkpoint.touch_message(msg_num)
+                return
 
-                        note = []
-                        note.append("MD5 mistmatch in file")
-                        note.append(f"  message ID: {message['Xref']}")
-                        note.append(f"  filename:   {destname}")
-                        note.append(f"  expected:   {orgmd5}")
-                        note.append(f"  found:      {newmd5}")
-                        self.post_error(subject, note)
+            self.log.debug("Joined split message: %d parts", total)
 
-                        filenames = []
-                else:
-                    self.log.debug("  No MD5 checksum to compare")
+            if "x-transport-md5" in message:
+                orgmd5 = message["x-transport-md5"]
+                if orgmd5 == checksum:
+                    self.log.debug("  MD5 checksum matches")
                     filenames = [destname]
-
+                else:
+                    subject = "Archive: MD5 mismatch"
+
+                    note = []
+                    note.append("MD5 mistmatch in file")
+                    note.append(f"  message ID: {message['Xref']}")
+                    note.append(f"  filename:   {destname}")
+                    note.append(f"  expected:   {orgmd5}")
+                    note.append(f"  found:      {checksum}")
+                    self.post_error(subject, note)
+
+                    remove_file([destname])
+                    filenames = []
             else:
-                filenames = []
-                self.log.debug("Joining split message: part %d of %d", part, total)
+                self.log.debug("  No MD5 checksum to compare")
+                filenames = [destname]
 
         goodfiles = self.filter_filenames(filenames)
         self.log.debug(
@@ -1255,8 +1692,109 @@ class ArchiveGroups(ProcessClient):
             if not self.timespan and not self.timegap:
                 checkpoint.reset(msg_time, msg_num)
 
-    def process_group(self, newsserver, checkpoint, low_mark, high_mark):
-        """Process newsgroup"""
+    # pylint: disable=too-many-arguments
+    def process_group(
+        self, newsserver, checkpoint, low_mark, high_mark, first=None, limit=None
+    ):
+        """Process newsgroup, returns the last message number handled"""
+
+        # Later slices of a group (first set) continue from the
+        # checkpoint, preparing again would reset it
+
+        if first is None:
+            with self.process_lock:
+                if not self.prepare_group(checkpoint, low_mark, high_mark):
+                    return high_mark
+
+        newsserver.group(checkpoint.newsgroup)
+
+        first_msg = checkpoint.last_message + 1
+
+        if first:
+            first_msg = max(first_msg, first)
+
+        stop_msg = high_mark + 1
+
+        if self.seek and (self.start_time or self.stop_time):
+            first_msg, stop_msg = self.seek_range(
+                newsserver, checkpoint, first_msg, high_mark
+            )
+
+        last_msg = min(high_mark, stop_msg - 1)
+
+        if limit:
+            last_msg = min(last_msg, first_msg + limit - 1)
+
+        for msg_num in range(first_msg, last_msg + 1):
+            self.log.debug("  processing message %d", msg_num)
+
+            self.process_message(newsserver, msg_num, checkpoint)
+            self.database[checkpoint.newsgroup] = checkpoint
+
+            if self.is_stopped():
+                return last_msg
+
+        if last_msg == stop_msg - 1 and stop_msg <= high_mark:
+            self.log.info(
+                "  skipping %d message(s) past the stop time",
+                high_mark - stop_msg + 1,
+            )
+            with self.process_lock:
+                msg_time = self.date_index.date(checkpoint.newsgroup, stop_msg)
+                if msg_time:
+                    msg_time += self.time_offset
+                checkpoint.reset(msg_time, high_mark)
+            self.database[checkpoint.newsgroup] = checkpoint
+            return high_mark
+
+        return last_msg
+
+    def seek_range(self, newsserver, checkpoint, first_msg, high_mark):
+        """
+        Use the article dates to find the first message at or after the
+        start time and the first one past the stop time. Returns
+        (first message, stop message).
+        """
+
+        newsgroup = checkpoint.newsgroup
+        stop_msg = high_mark + 1
+
+        try:
+            if self.start_time and newsgroup not in self.seek_started:
+                when = self.start_time - self.time_offset
+                start = self.date_index.seek(
+                    newsserver, newsgroup, first_msg, high_mark, when
+                )
+                start = max(first_msg, start - self.seek_margin)
+
+                if start <= high_mark:
+                    self.seek_started.add(newsgroup)
+
+                if start > first_msg:
+                    self.log.info(
+                        "  skipping %d message(s) before the start time",
+                        start - first_msg,
+                    )
+                    with self.process_lock:
+                        checkpoint.touch_message(start - 1)
+                    self.database[newsgroup] = checkpoint
+                    first_msg = start
+
+            if self.stop_time and first_msg <= high_mark:
+                when = self.stop_time - self.time_offset
+                stop_msg = self.date_index.seek(
+                    newsserver, newsgroup, first_msg, high_mark, when, after=True
+                )
+                stop_msg = min(stop_msg + self.seek_margin, high_mark + 1)
+
+        except nntplib.NNTPPermanentError:
+            self.log.warning("Server does not support XHDR, not seeking by time")
+            self.seek = False
+
+        return first_msg, stop_msg
+
+    def prepare_group(self, checkpoint, low_mark, high_mark):
+        """Update the checkpoint, returns True if there are messages to read"""
 
         self.log.debug("Processing newsgroup: %s", checkpoint.newsgroup)
         self.log.debug(
@@ -1280,7 +1818,7 @@ class ArchiveGroups(ProcessClient):
 
         elif low_mark > high_mark:
             self.log.debug("  no messages on server")
-            return
+            return False
 
         elif (
             checkpoint.last_message < low_mark - 1
@@ -1288,6 +1826,7 @@ class ArchiveGroups(ProcessClient):
         ):
             self.log.info("  message count reset")
             checkpoint.reset(last_message=low_mark - 1)
+            self.seek_started.discard(checkpoint.newsgroup)
 
         if checkpoint.last_message == high_mark:
             self.log.debug("  no new messages")
@@ -1299,19 +1838,87 @@ class ArchiveGroups(ProcessClient):
                         self.post_report(checkpoint, "Time out reached")
                     checkpoint.reset(last_message=high_mark)
 
-                return
+                return False
 
-        newsserver.group(checkpoint.newsgroup)
+        return True
 
-        for msg_num in range(checkpoint.last_message + 1, high_mark + 1):
-            self.log.debug("  processing message %d", msg_num)
+    def changed_groups(self, groups):
+        """Groups with new articles since the last poll"""
 
-            self.process_message(newsserver, msg_num, checkpoint)
-            self.database[checkpoint.newsgroup] = checkpoint
-            self.database.sync()
+        # Catching up on the first poll needs every group
 
-            if self.is_stopped():
-                break
+        if self.start_current != 0:
+            return groups
+
+        changed = []
+
+        for newsgroup, low_mark, high_mark in groups:
+            last_message = self.database[newsgroup].last_message
+
+            if low_mark > high_mark or last_message == high_mark:
+                continue
+
+            changed.append((newsgroup, low_mark, high_mark))
+
+        self.log.debug(
+            "%d of %d groups have new messages", len(changed), len(groups)
+        )
+
+        return changed
+
+    def schedule_timeout(self, checkpoint):
+        """Add an active group to the timeout heap"""
+
+        if self.timeout and checkpoint.is_active():
+            deadline = checkpoint.poll_time + self.timeout
+            heapq.heappush(self.timeouts, (deadline, checkpoint.newsgroup))
+
+    def check_timeouts(self):
+        """Reset groups that have not had a message within the timeout"""
+
+        current = now()
+
+        while self.timeouts and self.timeouts[0][0] <= current:
+            deadline, newsgroup = heapq.heappop(self.timeouts)
+
+            if newsgroup not in self.listed:
+                continue
+
+            checkpoint = self.database[newsgroup]
+
+            # Entries are left behind when a group is polled again
+
+            if not checkpoint.is_active():
+                continue
+
+            if checkpoint.poll_time + self.timeout != deadline:
+                continue
+
+            self.log.info("Time out reached: %s", newsgroup)
+
+            if self.report_timeout:
+                self.post_report(checkpoint, "Time out reached")
+
+            checkpoint.reset(last_message=checkpoint.last_message)
+            self.database[newsgroup] = checkpoint
+
+    def schedule_groups(self, groups):
+        """Order groups by priority pattern, then largest backlog first"""
+
+        def rank(entry):
+            newsgroup, _low_mark, high_mark = entry
+
+            for index, pattern in enumerate(self.priority):
+                if fnmatch.fnmatch(newsgroup, pattern):
+                    break
+            else:
+                index = len(self.priority)
+
+            backlog = high_mark - self.database[newsgroup].last_message
+
+            return index, -max(backlog, 0)
+
+        return sorted(groups, key=rank)
 
     def check_groups(self):
         """Check newsgroups"""
@@ -1320,23 +1927,118 @@ class ArchiveGroups(ProcessClient):
         port = self.pollserver_port
 
         with newstool.NewsTool().open_server(host, port) as newsserver:
-            for newsgroup, low_mark, high_mark in self.get_groups(newsserver):
-                checkpoint = self.database[newsgroup]
-                self.process_group(newsserver, checkpoint, low_mark, high_mark)
-                self.database[newsgroup] = checkpoint
-                self.database.sync()
+            groups = self.changed_groups(self.get_groups(newsserver))
 
-                if self.is_stopped():
-                    break
+            if self.workers <= 1:
+                for newsgroup, low_mark, high_mark in groups:
+                    checkpoint = self.database[newsgroup]
+                    self.process_group(newsserver, checkpoint, low_mark, high_mark)
+                    self.database[newsgroup] = checkpoint
+
+                    if self.is_stopped():
+                        break
+
+        if self.workers > 1:
+            self.check_groups_concurrent(groups)
+
+        with self.process_lock:
+            for newsgroup, _low_mark, _high_mark in groups:
+                self.schedule_timeout(self.database[newsgroup])
+
+            self.check_timeouts()
+
+        self.database.commit()
+
+        if self.catalog:
+            self.catalog.commit()
 
         if self.start_current_reset:
             self.start_current = 0
 
+    def check_groups_concurrent(self, groups):
+        """Check newsgroups with a pool of workers"""
+
+        # Entries are (newsgroup, low_mark, high_mark, next message)
+
+        schedule = self.schedule_groups(groups)
+        pending = collections.deque((*entry, None) for entry in schedule)
+        lock = threading.Lock()
+
+        def next_group():
+            with lock:
+                return pending.popleft() if pending else None
+
+        def requeue(entry):
+            with lock:
+                pending.append(entry)
+
+        def worker():
+            host = self.pollserver_host
+            port = self.pollserver_port
+
+            try:
+                newsserver = newstool.NewsTool().open_server(host, port)
+            except:
+                self.log.exception("Worker failed to connect to %s:%s", host, port)
+                return
+
+            with newsserver:
+                while self.is_running():
+                    entry = next_group()
+
+                    if entry is None:
+                        break
+
+                    newsgroup, low_mark, high_mark, first = entry
+                    checkpoint = self.database[newsgroup]
+
+                    try:
+                        last = self.process_group(
+                            newsserver,
+                            checkpoint,
+                            low_mark,
+                            high_mark,
+                            first,
+                            self.slice,
+                        )
+                    except SystemExit:
+                        break
+                    except:
+                        note = [traceback.format_exc()]
+                        with self.process_lock:
+                            self.post_error(f"Archive: problem in {newsgroup}", note)
+                        last = high_mark
+
+                    self.database[newsgroup] = checkpoint
+
+                    # Go to the back of the line to let the other groups run
+
+                    if last < high_mark:
+                        requeue((newsgroup, low_mark, high_mark, last + 1))
+
+        numworkers = min(self.workers, len(pending))
+
+        self.log.debug("Processing %d groups with %d workers", len(pending), numworkers)
+
+        threads = []
+
+        for index in range(numworkers):
+            thread = threading.Thread(target=worker, name=f"ArchiveWorker-{index}")
+            thread.start()
+            threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+
     def expire_files(self):
         """Expire old files"""
 
         self.log.debug("Expiring old files")
 
+        if self.catalog:
+            self.expire_catalog()
+            return
+
         for key, checkpoint in self.database.items():
             self.log.debug("  - %s", key)
 
@@ -1362,10 +2064,10 @@ class ArchiveGroups(ProcessClient):
 
                     if expire:
                         for filename in filenames.keys():
-                            filename = self.replace_history(filename, index)
+                            filename = self.history_name(checkpoint, index, filename)
                             self.log.debug("         %s", filename)
                             try:
-                                os.remove(filename)
+                                self.remove_output(filename)
                             except:
                                 pass
                         del checkpoint.history[index]
@@ -1374,7 +2076,57 @@ class ArchiveGroups(ProcessClient):
 
             self.database[key] = checkpoint
 
-        self.database.sync()
+        self.database.commit()
+
+    def expire_catalog(self):
+        """Expire old files using the catalog"""
+
+        expired = set(self.catalog.expire(now() - self.expire))
+
+        for filename in sorted(expired):
+            self.log.debug("  - %s", filename)
+            try:
+                self.remove_output(filename)
+            except OSError as err:
+                self.log.error("Problem removing %s: %s", filename, err)
+
+        if expired:
+            for key, checkpoint in self.database.items():
+                if self.prune_history(checkpoint, expired):
+                    self.database[key] = checkpoint
+
+        self.catalog.commit()
+        self.database.commit()
+
+    def prune_history(self, checkpoint, expired):
+        """
+        Drop expired files (absolute paths) from the checkpoint history,
+        so they are not rolled again. Emptied entries are removed from
+        the end of the history, where the oldest spans are, so the
+        positions (and file names) of the others do not change.
+        """
+
+        changed = False
+
+        for index, (filenames, last_time) in enumerate(checkpoint.history):
+            keep = {
+                name: stats
+                for name, stats in filenames.items()
+                if os.path.abspath(self.history_name(checkpoint, index, name))
+                not in expired
+            }
+
+            if len(keep) < len(filenames):
+                checkpoint.history[index] = (keep, last_time)
+                changed = True
+
+        while checkpoint.history and not checkpoint.history[-1][0]:
+            checkpoint.history.pop()
+
+        if changed and self.history_mode == "slots":
+            self.write_history_index(checkpoint)
+
+        return changed
 
     def check_summary(self):
         """Check if time for summary report"""
@@ -1406,7 +2158,7 @@ class ArchiveGroups(ProcessClient):
 
             self.database[key] = checkpoint
 
-        self.database.sync()
+        self.database.commit()
 
     def main(self):
         """Main application"""
@@ -1423,11 +2175,21 @@ class ArchiveGroups(ProcessClient):
                 note = [traceback.format_exc()]
                 self.post_error("Archive: problem checking groups", note)
 
+            self.handles.close_idle()
+            self.assembler.collect(now() - self.parts_max_age)
             self.check_summary()
 
             if self.expire:
                 self.expire_files()
 
+        self.handles.close_all()
+
+        if self.catalog:
+            self.catalog.close()
+
+        if self.uncompress_executor:
+            self.uncompress_executor.shutdown()
+
         self.log.info("Finished")
 
 
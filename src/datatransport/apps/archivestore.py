@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""ArchiveGroups checkpoint store"""
+
+##############################################################################
+#
+#   ArchiveGroups checkpoint store
+#
+#   Persistent newsgroup state for ArchiveGroups kept in an SQLite
+#   database (WAL mode). This replaces the shelve database, which
+#   re-pickled the whole Checkpoint, including its history and summary
+#   file lists, after every message.
+#
+#   The state is split into separate tables:
+#
+#       watermarks  - last message and the scalar counters/times
+#       files       - files in the current time span
+#       history     - one row per completed span (rolled files)
+#       summary     - one row per span since the last summary report
+#
+#   The checkpoints are held in memory. When one is saved, it is
+#   compared with what was last written and only the changes are
+#   applied. History and summary entries are compared by value with a
+#   copy of what was written: new entries are inserted, dropped ones
+#   deleted and an entry changed in place is rewritten (along with the
+#   newer ones, so the row ids keep the list order). Changes are
+#   committed every batch saves and when commit() is called (once per
+#   polling cycle).
+#
+#   An existing shelve checkpoint.db is imported the first time the
+#   store is created.
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#               Store the history generation (upgrades older databases)
+#               Match history and summary entries by value, not identity
+#               Remove files only after the changes are committed
+#                   (remove_after_commit)
+#
+##############################################################################
+
+import dbm
+import json
+import os
+import shelve
+import sqlite3
+import threading
+
+from datetime import datetime
+from pathlib import Path
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS watermarks (
+        newsgroup       TEXT PRIMARY KEY,
+        last_message    INTEGER,
+        num_messages    INTEGER,
+        num_bytes       INTEGER,
+        start_time      TEXT,
+        last_time       TEXT,
+        poll_time       TEXT,
+        summary_start   TEXT,
+        summary_bytes   INTEGER,
+        summary_msgs    INTEGER,
+        generation      INTEGER DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS files (
+        newsgroup       TEXT,
+        filename        TEXT,
+        msgs            INTEGER,
+        bytes           INTEGER,
+        PRIMARY KEY (newsgroup, filename)
+    );
+
+    CREATE TABLE IF NOT EXISTS history (
+        id              INTEGER PRIMARY KEY AUTOINCREMENT,
+        newsgroup       TEXT,
+        last_time       TEXT,
+        files           TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS summary (
+        id              INTEGER PRIMARY KEY AUTOINCREMENT,
+        newsgroup       TEXT,
+        files           TEXT
+    );
+
+    CREATE INDEX IF NOT EXISTS history_newsgroup ON history (newsgroup);
+    CREATE INDEX IF NOT EXISTS summary_newsgroup ON summary (newsgroup);
+"""
+
+WATERMARK_FIELDS = [
+    "last_message",
+    "num_messages",
+    "num_bytes",
+    "start_time",
+    "last_time",
+    "poll_time",
+    "summary_start",
+    "summary_bytes",
+    "summary_msgs",
+    "generation",
+]
+
+# Fields added after the first release, with the value for old checkpoints
+
+ADDED_FIELDS = {"generation": ("INTEGER", 0)}
+
+TIME_FIELDS = {"start_time", "last_time", "poll_time", "summary_start"}
+
+
+def encode_files(filenames):
+    """Serialize a {filename: (msgs, bytes)} map"""
+    return json.dumps({str(k): list(v) for k, v in filenames.items()})
+
+
+def decode_files(text):
+    """Deserialize a {filename: (msgs, bytes)} map"""
+    return {k: tuple(v) for k, v in json.loads(text).items()}
+
+
+def copy_history(entry):
+    """Snapshot of a history entry, (filenames, last_time)"""
+    return (dict(entry[0]), entry[1])
+
+
+def copy_summary(entry):
+    """Snapshot of a summary entry, filenames"""
+    return dict(entry)
+
+
+def encode_time(value):
+    """Datetime to text (keeps the timezone)"""
+    return value.isoformat()
+
+
+def decode_time(text):
+    """Text to datetime"""
+    return datetime.fromisoformat(text)
+
+
+class Saved:
+    """What was last written for a checkpoint"""
+
+    def __init__(self):
+        self.watermark = None
+        self.files = {}
+        self.history = []
+        self.summary = []
+
+
+class CheckpointStore:
+    """SQLite backed checkpoint database"""
+
+    def __init__(self, path, factory, legacy=None, batch=100, log=None):
+        self.path = Path(path)
+        self.factory = factory
+        self.batch = max(1, batch)
+        self.log = log
+
+        self.lock = threading.RLock()
+        self.pending = 0
+        self.removals = []
+
+        self.checkpoints = {}
+        self.saved = {}
+
+        exists = self.path.exists()
+
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.upgrade()
+        self.conn.commit()
+
+        if not exists and legacy:
+            self.migrate(legacy)
+
+        self.load()
+
+    def upgrade(self):
+        """Add columns missing from an older database"""
+
+        rows = self.conn.execute("PRAGMA table_info(watermarks)")
+        columns = {row[1] for row in rows}
+
+        for key, (kind, default) in ADDED_FIELDS.items():
+            if key not in columns:
+                self.conn.execute(
+                    f"ALTER TABLE watermarks ADD COLUMN {key} {kind} DEFAULT {default}"
+                )
+
+    # Mapping interface ------------------------------------------------------
+
+    def __contains__(self, newsgroup):
+        return newsgroup in self.checkpoints
+
+    def __getitem__(self, newsgroup):
+        return self.checkpoints[newsgroup]
+
+    def __setitem__(self, newsgroup, checkpoint):
+        self.save(newsgroup, checkpoint)
+
+    def __len__(self):
+        return len(self.checkpoints)
+
+    def keys(self):
+        """Newsgroup names"""
+        return list(self.checkpoints)
+
+    def items(self):
+        """(newsgroup, checkpoint) pairs"""
+        return list(self.checkpoints.items())
+
+    # Loading ----------------------------------------------------------------
+
+    def load(self):
+        """Read all of the checkpoints into memory"""
+
+        fields = ", ".join(WATERMARK_FIELDS)
+        watermarks = self.conn.execute(f"SELECT newsgroup, {fields} FROM watermarks")
+
+        for row in watermarks.fetchall():
+            newsgroup = row[0]
+
+            checkpoint = self.factory(newsgroup, 1, 0, False)
+            saved = Saved()
+
+            for key, value in zip(WATERMARK_FIELDS, row[1:]):
+                if key in TIME_FIELDS:
+                    value = decode_time(value)
+                setattr(checkpoint, key, value)
+
+            saved.watermark = self.watermark(checkpoint)
+
+            rows = self.conn.execute(
+                "SELECT filename, msgs, bytes FROM files WHERE newsgroup=?",
+                (newsgroup,),
+            )
+            checkpoint.filenames = {name: (m, b) for name, m, b in rows}
+            saved.files = dict(checkpoint.filenames)
+
+            rows = self.conn.execute(
+                "SELECT id, last_time, files FROM history "
+                "WHERE newsgroup=? ORDER BY id DESC",
+                (newsgroup,),
+            )
+            checkpoint.history = []
+            for rowid, last_time, files in rows.fetchall():
+                entry = (decode_files(files), decode_time(last_time))
+                checkpoint.history.append(entry)
+                saved.history.append((rowid, copy_history(entry)))
+
+            rows = self.conn.execute(
+                "SELECT id, files FROM summary WHERE newsgroup=? ORDER BY id",
+                (newsgroup,),
+            )
+            checkpoint.summary_files = []
+            for rowid, files in rows.fetchall():
+                entry = decode_files(files)
+                checkpoint.summary_files.append(entry)
+                saved.summary.append((rowid, copy_summary(entry)))
+
+            self.checkpoints[newsgroup] = checkpoint
+            self.saved[newsgroup] = saved
+
+    def migrate(self, legacy):
+        """Import checkpoints from a shelve database"""
+
+        if not dbm.whichdb(str(legacy)):
+            return
+
+        if self.log:
+            self.log.info("Importing checkpoints from %s", legacy)
+
+        with shelve.open(str(legacy), flag="r") as database:
+            for newsgroup, checkpoint in database.items():
+                self.checkpoints[newsgroup] = checkpoint
+                self.save(newsgroup, checkpoint)
+
+        self.commit()
+
+        self.checkpoints = {}
+        self.saved = {}
+
+    # Saving -----------------------------------------------------------------
+
+    def watermark(self, checkpoint):
+        """Scalar state as a tuple"""
+
+        values = []
+
+        for key in WATERMARK_FIELDS:
+            if key in ADDED_FIELDS:
+                value = getattr(checkpoint, key, ADDED_FIELDS[key][1])
+            else:
+                value = getattr(checkpoint, key)
+            if key in TIME_FIELDS:
+                value = encode_time(value)
+            values.append(value)
+
+        return tuple(values)
+
+    def save(self, newsgroup, checkpoint):
+        """Write the changes since the checkpoint was last saved"""
+
+        with self.lock:
+            self.checkpoints[newsgroup] = checkpoint
+            saved = self.saved.setdefault(newsgroup, Saved())
+
+            self.save_watermark(newsgroup, checkpoint, saved)
+            self.save_files(newsgroup, checkpoint, saved)
+            self.save_history(newsgroup, checkpoint, saved)
+            self.save_summary(newsgroup, checkpoint, saved)
+
+            self.pending += 1
+
+            if self.pending >= self.batch:
+                self.commit()
+
+    def save_watermark(self, newsgroup, checkpoint, saved):
+        """Update the scalar state if changed"""
+
+        watermark = self.watermark(checkpoint)
+
+        if watermark == saved.watermark:
+            return
+
+        fields = ", ".join(WATERMARK_FIELDS)
+        marks = ", ".join("?" * (len(WATERMARK_FIELDS) + 1))
+
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO watermarks (newsgroup, {fields}) "
+            f"VALUES ({marks})",
+            (newsgroup, *watermark),
+        )
+
+        saved.watermark = watermark
+
+    def save_files(self, newsgroup, checkpoint, saved):
+        """Update the current span files that changed"""
+
+        current = checkpoint.filenames
+
+        for filename in set(saved.files).difference(current):
+            self.conn.execute(
+                "DELETE FROM files WHERE newsgroup=? AND filename=?",
+                (newsgroup, str(filename)),
+            )
+
+        for filename, (msgs, numbytes) in current.items():
+            if saved.files.get(filename) != (msgs, numbytes):
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                    (newsgroup, str(filename), msgs, numbytes),
+                )
+
+        saved.files = dict(current)
+
+    def save_history(self, newsgroup, checkpoint, saved):
+        """Insert new and delete dropped history entries"""
+
+        saved.history = self.save_entries(
+            saved.history,
+            checkpoint.history,
+            lambda entry: self.conn.execute(
+                "INSERT INTO history (newsgroup, last_time, files) VALUES (?, ?, ?)",
+                (newsgroup, encode_time(entry[1]), encode_files(entry[0])),
+            ).lastrowid,
+            "DELETE FROM history WHERE id=?",
+            copy_history,
+            newest_first=True,
+        )
+
+    def save_summary(self, newsgroup, checkpoint, saved):
+        """Insert new and delete dropped summary entries"""
+
+        saved.summary = self.save_entries(
+            saved.summary,
+            checkpoint.summary_files,
+            lambda entry: self.conn.execute(
+                "INSERT INTO summary (newsgroup, files) VALUES (?, ?)",
+                (newsgroup, encode_files(entry)),
+            ).lastrowid,
+            "DELETE FROM summary WHERE id=?",
+            copy_summary,
+            newest_first=False,
+        )
+
+    # pylint: disable=too-many-arguments
+    def save_entries(self, saved, current, insert, delete, copy, newest_first):
+        """
+        Sync a list of entries with their rows. Entries are matched in
+        order by value. Once one has no match, it and all of the newer
+        entries are written as new rows so the row ids follow the list.
+        """
+
+        if newest_first:
+            saved = saved[::-1]
+            current = current[::-1]
+
+        results = []
+        position = 0
+        appending = False
+
+        for entry in current:
+            if not appending:
+                for index in range(position, len(saved)):
+                    if saved[index][1] == entry:
+                        break
+                else:
+                    index = None
+
+                if index is not None:
+                    for rowid, _entry in saved[position:index]:
+                        self.conn.execute(delete, (rowid,))
+                    results.append(saved[index])
+                    position = index + 1
+                    continue
+
+                appending = True
+
+            results.append((insert(entry), copy(entry)))
+
+        for rowid, _entry in saved[position:]:
+            self.conn.execute(delete, (rowid,))
+
+        if newest_first:
+            results.reverse()
+
+        return results
+
+    def remove_after_commit(self, path):
+        """Remove a file once the current changes are committed"""
+
+        with self.lock:
+            self.removals.append(path)
+
+    def commit(self):
+        """Commit pending changes"""
+
+        with self.lock:
+            self.conn.commit()
+            self.pending = 0
+
+            for path in self.removals:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+            self.removals = []
+
+    def close(self):
+        """Commit and close the database"""
+
+        with self.lock:
+            self.commit()
+            self.conn.close()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""Packed container files"""
+
+##############################################################################
+#
+#   Packed container files
+#
+#   ArchiveGroups can pack the files from many messages into one
+#   container (output.container: tar) instead of writing each one as
+#   its own file. The containers are ordinary tar files, so the usual
+#   tools can read them, and are named by the output rules like any
+#   other output file (one container per rule and time span).
+#
+#   Members are appended without reading the archive: every container
+#   ends with exactly two zero blocks, which the next member overwrites.
+#   Each member is also listed in a sidecar index (<container>.idx, one
+#   JSON record per line) with its name, time, data offset and size so
+#   a member can be read directly by name or time. The index can be
+#   rebuilt from the tar file if it is lost. A file that does not look
+#   like a container (tar blocks ending with the two zero blocks) is
+#   never appended to.
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#               Whole second mtimes (no pax header per member), check
+#                   the container before appending
+#
+##############################################################################
+
+import json
+import os
+import tarfile
+
+from datetime import datetime, UTC
+from pathlib import Path
+
+BLOCKSIZE = tarfile.BLOCKSIZE
+END_BLOCKS = tarfile.NUL * (BLOCKSIZE * 2)
+
+
+def index_name(container):
+    """Sidecar index for a container"""
+    return Path(f"{container}.idx")
+
+
+def check_container(output, size):
+    """Raise ReadError unless the open file of size bytes is a container"""
+
+    if size % BLOCKSIZE or size < len(END_BLOCKS):
+        raise tarfile.ReadError(f"{output.name} is not a tar container")
+
+    output.seek(size - len(END_BLOCKS))
+
+    if output.read(len(END_BLOCKS)) != END_BLOCKS:
+        raise tarfile.ReadError(f"{output.name} is not a tar container")
+
+    if size == len(END_BLOCKS):
+        return
+
+    output.seek(0)
+
+    try:
+        tarfile.TarInfo.frombuf(output.read(BLOCKSIZE), tarfile.ENCODING, "strict")
+    except tarfile.HeaderError as err:
+        raise tarfile.ReadError(f"{output.name} is not a tar container") from err
+
+
+def append_file(container, filename, arcname, mtime=None, mode=0o644):
+    """
+    Append filename to the container as arcname. Returns the number
+    of bytes added to the container.
+    """
+
+    container = Path(container)
+    filename = Path(filename)
+
+    info = tarfile.TarInfo(str(arcname))
+    info.size = filename.stat().st_size
+    info.mode = mode
+    # Whole seconds, a fractional mtime needs a pax header per member
+
+    info.mtime = int(mtime.timestamp() if mtime else filename.stat().st_mtime)
+
+    header = info.tobuf(format=tarfile.PAX_FORMAT)
+    padding = -info.size % BLOCKSIZE
+
+    if not container.exists():
+        container.touch()
+
+    with container.open("r+b") as output, filename.open("rb") as source:
+        before = output.seek(0, os.SEEK_END)
+
+        if before:
+            check_container(output, before)
+
+        output.seek(max(before - len(END_BLOCKS), 0))
+        output.write(header)
+        offset = output.tell()
+        copied = 0
+        while data := source.read(1024 * 1024):
+            output.write(data)
+            copied += len(data)
+        output.write(tarfile.NUL * padding)
+        output.write(END_BLOCKS)
+        output.truncate()
+        after = output.tell()
+
+    entry = {
+        "name": str(arcname),
+        "mtime": info.mtime,
+        "offset": offset,
+        "size": copied,
+    }
+
+    with index_name(container).open("a", encoding="utf-8") as index:
+        index.write(json.dumps(entry) + "\n")
+
+    return after - before
+
+
+def read_index(container):
+    """List of index entries (dicts), rebuilding the index if missing"""
+
+    filename = index_name(container)
+
+    if not filename.exists():
+        rebuild_index(container)
+
+    with filename.open(encoding="utf-8") as index:
+        return [json.loads(line) for line in index if line.strip()]
+
+
+def rebuild_index(container):
+    """Recreate the sidecar index from the tar file"""
+
+    entries = []
+
+    with tarfile.open(container, "r:") as tar:
+        for member in tar:
+            if member.isfile():
+                entries.append(
+                    {
+                        "name": member.name,
+                        "mtime": member.mtime,
+                        "offset": member.offset_data,
+                        "size": member.size,
+                    }
+                )
+
+    filename = index_name(container)
+    tmpname = filename.with_name(f".{filename.name}.tmp")
+
+    with tmpname.open("w", encoding="utf-8") as index:
+        for entry in entries:
+            index.write(json.dumps(entry) + "\n")
+
+    os.replace(tmpname, filename)
+
+    return entries
+
+
+def find_members(container, name=None, start=None, stop=None):
+    """
+    Index entries matching name and/or time range [start, stop].
+    When a name was stored more than once, the last one is used.
+    """
+
+    entries = {}
+
+    for entry in read_index(container):
+        mtime = datetime.fromtimestamp(entry["mtime"], UTC)
+        if name and entry["name"] != name:
+            continue
+        if start and mtime < start:
+            continue
+        if stop and mtime > stop:
+            continue
+        entries[entry["name"]] = entry
+
+    return list(entries.values())
+
+
+def read_member(container, entry):
+    """Contents of an index entry"""
+
+    with open(container, "rb") as source:
+        source.seek(entry["offset"])
+        return source.read(entry["size"])
+
+
+def extract(container, dest=".", name=None, start=None, stop=None):
+    """Write the matching members into dest, returns the paths"""
+
+    paths = []
+
+    with open(container, "rb") as source:
+        for entry in find_members(container, name, start, stop):
+            path = Path(dest, os.path.basename(entry["name"]))
+            source.seek(entry["offset"])
+            path.write_bytes(source.read(entry["size"]))
+            os.utime(path, (entry["mtime"], entry["mtime"]))
+            paths.append(path)
+
+    return paths
+
+
+def remove_container(container):
+    """Remove a container and its index"""
+
+    for filename in (Path(container), index_name(container)):
+        try:
+            filename.unlink()
+        except FileNotFoundError:
+            pass
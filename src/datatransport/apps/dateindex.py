@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Article date index"""
+
+##############################################################################
+#
+#   Article date index
+#
+#   Maps article numbers to their dates for each newsgroup using the
+#   header data from the news server (XHDR), without downloading the
+#   articles. ArchiveGroups uses this to find the first article at or
+#   after input.start_time, and the first one past input.stop_time,
+#   with a binary search instead of reading every article in between.
+#
+#   Article dates are assumed to (mostly) increase with the article
+#   number. The headers are tried in the same order as message_date()
+#   uses, so the seek agrees with the time used to filter the messages.
+#   Articles that do not exist (expired or cancelled) are skipped.
+#
+#   Lookups are fetched a window of articles at a time and remembered,
+#   so the later steps of a search are usually answered from memory.
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#
+##############################################################################
+
+import datetime
+import nntplib
+
+from dateutil import parser
+
+HEADERS = ["X-Transport-Date", "NNTP-Posting-Date", "Date"]
+
+
+def parse_date(value):
+    """Parse a header date (UTC if no timezone), None if not a date"""
+
+    try:
+        timestamp = parser.parse(value)
+    except (ValueError, OverflowError):
+        return None
+
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=datetime.UTC)
+
+    return timestamp
+
+
+class DateIndex:
+    """Article number to date lookup for newsgroups"""
+
+    def __init__(self, headers=None, window=20):
+        self.headers = headers or HEADERS
+        self.window = max(window, 1)
+
+        # newsgroup -> {article number: date or None if missing}
+        self.dates = {}
+
+    def fetch(self, newsserver, newsgroup, first, last):
+        """Lookup the dates for the articles in [first, last]"""
+
+        dates = self.dates.setdefault(newsgroup, {})
+        missing = {num for num in range(first, last + 1) if num not in dates}
+
+        if not missing:
+            return
+
+        found = {}
+
+        for header in self.headers:
+            lo, hi = min(missing), max(missing)
+
+            try:
+                _resp, lines = newsserver.xhdr(header, f"{lo}-{hi}")
+            except nntplib.NNTPTemporaryError:
+                # No articles in the range
+                lines = []
+
+            for num, value in lines:
+                num = int(num)
+                if num in found or num not in missing:
+                    continue
+                found[num] = parse_date(value)
+
+            missing = {num for num in missing if not found.get(num)}
+
+            if not missing:
+                break
+
+        for num in range(first, last + 1):
+            dates.setdefault(num, found.get(num))
+
+    def date(self, newsgroup, num):
+        """Date of an article already looked up, None if unknown"""
+
+        return self.dates.get(newsgroup, {}).get(num)
+
+    def first_article(self, newsserver, newsgroup, first, last):
+        """(number, date) of the first article in [first, last] or None"""
+
+        for start in range(first, last + 1, self.window):
+            stop = min(start + self.window - 1, last)
+            self.fetch(newsserver, newsgroup, start, stop)
+
+            for num in range(start, stop + 1):
+                date = self.date(newsgroup, num)
+                if date:
+                    return num, date
+
+        return None
+
+    def last_article(self, newsserver, newsgroup, first, last):
+        """(number, date) of the last article in [first, last] or None"""
+
+        for stop in range(last, first - 1, -self.window):
+            start = max(stop - self.window + 1, first)
+            self.fetch(newsserver, newsgroup, start, stop)
+
+            for num in range(stop, start - 1, -1):
+                date = self.date(newsgroup, num)
+                if date:
+                    return num, date
+
+        return None
+
+    # pylint: disable=too-many-arguments
+    def seek(self, newsserver, newsgroup, first, last, when, after=False):
+        """
+        First article number in [first, last] dated at or after when
+        (past when if after is set). Returns last + 1 if there is none.
+        """
+
+        def before(date):
+            return date <= when if after else date < when
+
+        self.prune(newsgroup, first)
+
+        found = self.first_article(newsserver, newsgroup, first, last)
+
+        if found is None:
+            return last + 1
+
+        if not before(found[1]):
+            return first
+
+        lo = found[0] + 1
+
+        found = self.last_article(newsserver, newsgroup, lo, last)
+
+        if found is None or before(found[1]):
+            return last + 1
+
+        hi = found[0]
+
+        # Articles before lo are all before when, hi is not
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+            found = self.first_article(newsserver, newsgroup, mid, hi - 1)
+
+            if found is None:
+                hi = mid
+            elif before(found[1]):
+                lo = found[0] + 1
+            else:
+                hi = mid
+
+        return lo
+
+    def prune(self, newsgroup, first):
+        """Forget articles before first"""
+
+        dates = self.dates.get(newsgroup)
+
+        if dates:
+            for num in [num for num in dates if num < first]:
+                del dates[num]
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Small file batching"""
+
+##############################################################################
+#
+#   Small file batching
+#
+#   Packs files waiting to be posted into batches that are posted as a
+#   single article with several attachments. Used by FileWatch and the
+#   FilePost watchers for sources that drop many small files, which
+#   would otherwise each cost a connection and an article on the server.
+#
+#   A batch holds at most max_files files and max_bytes bytes (a single
+#   file larger than max_bytes is sent on its own). Full batches are
+#   posted right away. The last, partial batch waits until its oldest
+#   file has lingered for the linger time so that more files can join.
+#   A limit of 0 means no limit. The files stay on disk until their
+#   batch is posted, so nothing needs to be saved over a restart.
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#
+##############################################################################
+
+import os
+
+
+class FileBatcher:
+    """Group files into size bounded batches"""
+
+    def __init__(self, max_files=0, max_bytes=0, linger=0):
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.linger = linger
+
+        # When each file was first seen
+        self.first_seen = {}
+
+    @property
+    def enabled(self):
+        """True if any limit is set"""
+        return bool(self.max_files or self.max_bytes or self.linger)
+
+    def split(self, filenames):
+        """Split files (in order) into (batch, bytes) within the limits"""
+
+        batches = []
+        batch = []
+        batch_bytes = 0
+
+        for filename in filenames:
+            try:
+                size = os.path.getsize(filename)
+            except OSError:
+                continue
+
+            full = self.max_files and len(batch) >= self.max_files
+            full = full or (self.max_bytes and batch_bytes + size > self.max_bytes)
+
+            if batch and full:
+                batches.append((batch, batch_bytes))
+                batch = []
+                batch_bytes = 0
+
+            batch.append(filename)
+            batch_bytes += size
+
+        if batch:
+            batches.append((batch, batch_bytes))
+
+        return batches
+
+    def is_full(self, batch, size):
+        """True if no more files would fit in the batch"""
+
+        if self.max_files and len(batch) >= self.max_files:
+            return True
+
+        return bool(self.max_bytes and size >= self.max_bytes)
+
+    def ready(self, filenames, now):
+        """Batches ready to post from the files found at time now (secs)"""
+
+        self.first_seen = {
+            filename: self.first_seen.get(filename, now) for filename in filenames
+        }
+
+        batches = self.split(filenames)
+
+        if batches and not self.is_full(*batches[-1]):
+            oldest = min(self.first_seen[filename] for filename in batches[-1][0])
+            if now - oldest < self.linger:
+                batches.pop()
+
+        return [batch for batch, _size in batches]
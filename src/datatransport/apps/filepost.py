@@ -28,6 +28,21 @@
 #       files - list of file names (including path) to look for. If
 #               multiple names are listed, they should be separated
 #               by spaces. The name can include normal shell wildcards.
+#       batch.files - max number of files per article (0 = no limit)
+#       batch.bytes - max bytes per article (0 = no limit)
+#       batch.linger - how long to wait for a partial batch to fill
+#       rate - how often to check (default pollrate)
+#       settle - only post files that have not changed for this long
+#                and between two checks, or that were closed after
+#                writing when using events (default: post files as
+#                soon as they are found)
+#
+#   The watchers are checked on their own schedules by a pool of worker
+#   threads, so a slow watcher does not hold up the others:
+#
+#       workers - number of watchers processed at once (4)
+#       events - also check when files change (watchdog) (False)
+#       report.rate - how often to log the statistics (1h)
 #
 #   2010-08-16  Todd Valentic
 #               Initial implementation
@@ -44,16 +59,58 @@
 #   2023-07-27  Todd Valentic
 #               Updated for transport3 / python3
 #
+#   2026-10-19  Todd Valentic
+#               Batch small files into multi-attachment articles
+#                   (batch.files, batch.bytes, batch.linger)
+#               Run the watchers concurrently on a pool of worker
+#                   threads, each on its own rate (watch.<name>.rate,
+#                   defaults to pollrate) from a timer heap. With
+#                   events, a watcher is also woken by changes in its
+#                   directory. Each watcher logs the files posted,
+#                   backlog and latency every report.rate. Synced
+#                   rates use the client's wait.spread and wait.jitter.
+#               Scan with os.scandir, only listing directories again
+#                   when they change. Optionally wait for files to
+#                   settle (or be closed) before posting them (settle)
+#               An event while a watcher is running checks it again
+#                   as soon as it is done
+#
 ##########################################################################
 
+import concurrent.futures
+import heapq
+import itertools
+import os
+import random
 import sys
+import threading
 
-from datatransport import ProcessClient
-from datatransport import NewsPoster
-from datatransport import ConfigComponent
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from datatransport import ConfigComponent, NewsPoster, ProcessClient, clock
+from datatransport.apps.filebatch import FileBatcher
+from datatransport.apps.filescanner import GlobScanner
 from datatransport.utilities import remove_file
 
 
+class WatchEvents(FileSystemEventHandler):
+    """Wake a watcher when something changes in its directory"""
+
+    def __init__(self, watcher, wake):
+        self.watcher = watcher
+        self.wake = wake
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+
+        if event.event_type == "closed":
+            self.watcher.scanner.mark_closed(event.src_path)
+
+        self.wake(self.watcher)
+
+
 class Watcher(ConfigComponent):
     """Watch group component"""
 
@@ -66,30 +123,95 @@ class Watcher(ConfigComponent):
         self.filespecs = self.config.get_list("files")
         self.remove_files = self.config.get_boolean("removefiles", True)
         self.group_files = self.config.get_boolean("groupfiles", False)
+        self.rate = self.config.get_rate("rate", self.parent.rate)
+
+        self.batcher = FileBatcher(
+            self.config.get_int("batch.files", 0),
+            self.config.get_bytes("batch.bytes", 0),
+            self.config.get_timedelta("batch.linger", 0).total_seconds(),
+        )
 
         if not self.filespecs:
             self.abort("No watch files listed in the config file")
 
+        settle = self.config.get_timedelta("settle", None)
+        settle = settle.total_seconds() if settle is not None else None
+
+        self.scanner = GlobScanner(self.watchpath, self.filespecs, settle)
+
+        # Scheduling state (see FilePost)
+
+        self.due = None
+        self.active = False
+        self.pending = False
+
+        # Statistics since the last report
+
+        self.backlog = 0
+        self.posted = 0
+        self.latency = []
+
         self.log.info("Posting to %s", self.config.get("post.newsgroup"))
         self.log.info("Watching path: %s", self.watchpath)
         self.log.info("Watching for: %s", self.filespecs)
+        self.log.info("Rate: %s", self.rate)
 
-    def find_files(self):
-        """Find matching files to post"""
+        if settle is not None:
+            self.log.info("Settle time: %ss", settle)
 
-        filenames = []
+    def next_time(self, now):
+        """Next time to check for files after now (unix secs)"""
 
-        for filespec in self.filespecs:
-            filenames.extend(self.watchpath.glob(filespec))
+        period = self.rate.period.total_seconds()
 
-        filenames = [f for f in filenames if f.is_file()]
+        if self.rate.sync:
+            offset = self.rate.offset.total_seconds() if self.rate.offset else 0
+            curtime = now - offset - self.parent.wait_phase(period)
+            due = now + period - curtime % period
+        else:
+            due = now + period
 
-        return sorted(filenames)
+        # Same stagger and jitter as ProcessClient.wait()
+
+        if self.parent.wait_jitter:
+            due += random.uniform(0, self.parent.wait_jitter.total_seconds())
+
+        return due
+
+    def is_recursive(self):
+        """True if the file specs look below the watch path"""
+
+        return any("/" in spec or "**" in spec for spec in self.filespecs)
+
+    def report(self):
+        """Log and reset the posting statistics"""
+
+        if self.latency:
+            latency = f"{sum(self.latency) / len(self.latency):0.1f}s avg, "
+            latency += f"{max(self.latency):0.1f}s max"
+        else:
+            latency = "-"
+
+        self.log.info(
+            "Posted %d files, backlog %d, latency %s",
+            self.posted,
+            self.backlog,
+            latency,
+        )
+
+        self.posted = 0
+        self.latency = []
+
+    def find_files(self):
+        """Find matching files to post"""
+
+        return self.scanner.scan()
 
     def process(self):
         """Check for new files"""
 
         filenames = self.find_files()
+        self.backlog = len(filenames)
 
         if not filenames:
             self.log.debug("No files present")
@@ -97,10 +219,22 @@ class Watcher(ConfigComponent):
 
         if self.group_files:
             filenames = [filenames]
+        elif self.batcher.enabled:
+            filenames = self.batcher.ready(filenames, clock.time())
 
         for filegroup in filenames:
             starttime = self.now()
 
+            if isinstance(filegroup, list):
+                names = [str(n) for n in filegroup]
+            else:
+                names = [str(filegroup)]
+
+            try:
+                oldest = min(os.path.getmtime(name) for name in names)
+            except OSError:
+                oldest = None
+
             try:
                 self.news_poster.post(filegroup)
             except Exception as e:  # pylint: disable=broad-exception-caught
@@ -108,20 +242,24 @@ class Watcher(ConfigComponent):
                 return
 
             elapsed = (self.now() - starttime).total_seconds()
-            
-            if isinstance(filegroup, list):
-                names = [str(n) for n in filegroup]
-            else:
-                names = filegroup
 
             self.log.info("Files posted (%0.2fs): %s", elapsed, names)
 
+            self.posted += len(names)
+            self.backlog -= len(names)
+
+            if oldest is not None:
+                self.latency.append(clock.time() - oldest)
+
             if self.remove_files:
                 try:
                     remove_file(filegroup)
                 except OSError as e:
                     self.log.exception("Problem deleting file %s: %s", filegroup, e)
 
+            if self.is_stopped():
+                return
+
 
 class FilePost(ProcessClient):
     """Process Client"""
@@ -129,23 +267,144 @@ class FilePost(ProcessClient):
     def __init__(self, argv):
         ProcessClient.__init__(self, argv)
 
-        self.rate = self.config.get_rate("pollrate")
+        self.rate = self.config.get_rate("pollrate", 60)
+        self.workers = self.config.get_int("workers", 4)
+        self.use_events = self.config.get_boolean("events", False)
+        self.report_rate = self.config.get_timedelta("report.rate", "1h")
         self.watches = self.config.get_components("watches", factory=Watcher)
 
-    def process(self):
-        """Process each file watch group"""
+        # Heap of (due time, sequence, watcher). A watcher is either in
+        # the heap or being processed. Entries that no longer match the
+        # watcher's due time are stale and skipped. An event for a
+        # watcher being processed sets its pending flag so it is
+        # checked again as soon as it is done.
 
-        for watch in self.watches.values():
-            watch.process()
+        self.schedule = []
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.observer = None
 
-            if self.is_stopped():
-                break
+    def reschedule(self, watcher, due):
+        """Put a watcher back in the schedule"""
+
+        with self.lock:
+            watcher.due = due
+            heapq.heappush(self.schedule, (due, next(self.sequence), watcher))
+
+        self.wakeup.set()
+
+    def wake(self, watcher):
+        """Check a watcher now (filesystem event)"""
+
+        now = clock.time()
+
+        with self.lock:
+            if watcher.active:
+                watcher.pending = True
+                return
+
+            if watcher.due is None or watcher.due <= now:
+                return
+
+        self.reschedule(watcher, now)
+
+    def run_watcher(self, watcher):
+        """Process a watcher (worker thread)"""
+
+        try:
+            watcher.process()
+        except Exception:  # pylint: disable=broad-exception-caught
+            watcher.log.exception("Problem processing")
+        finally:
+            with self.lock:
+                watcher.active = False
+                pending = watcher.pending
+                watcher.pending = False
+
+            now = clock.time()
+            self.reschedule(watcher, now if pending else watcher.next_time(now))
+
+    def due_watchers(self, now):
+        """Remove and return the watchers due at now"""
+
+        due = []
+
+        with self.lock:
+            while self.schedule and self.schedule[0][0] <= now:
+                when, _sequence, watcher = heapq.heappop(self.schedule)
+                if when == watcher.due and not watcher.active:
+                    watcher.active = True
+                    due.append(watcher)
+
+        return due
+
+    def next_due(self):
+        """Time of the next scheduled check"""
+
+        with self.lock:
+            return self.schedule[0][0] if self.schedule else None
+
+    def start_events(self):
+        """Wake watchers on filesystem events"""
+
+        try:
+            self.observer = Observer()
+            for watcher in self.watches.values():
+                handler = WatchEvents(watcher, self.wake)
+                path = str(watcher.watchpath)
+                self.observer.schedule(handler, path, recursive=watcher.is_recursive())
+            self.observer.start()
+        except OSError:
+            self.log.exception("Problem watching for events, polling only")
+            self.observer = None
+
+    def report(self):
+        """Report each watcher's latency and backlog"""
+
+        for watcher in self.watches.values():
+            watcher.report()
 
     def main(self):
         """Main application"""
 
-        while self.wait(self.rate):
-            self.process()
+        if self.use_events:
+            self.start_events()
+
+        now = clock.time()
+
+        for watcher in self.watches.values():
+            if watcher.rate.at_start:
+                self.reschedule(watcher, now)
+            else:
+                self.reschedule(watcher, watcher.next_time(now))
+
+        report_secs = self.report_rate.total_seconds()
+        next_report = now + report_secs
+
+        with concurrent.futures.ThreadPoolExecutor(
+            self.workers, thread_name_prefix="Watcher"
+        ) as executor:
+            while self.is_running():
+                now = clock.time()
+
+                for watcher in self.due_watchers(now):
+                    executor.submit(self.run_watcher, watcher)
+
+                if report_secs and now >= next_report:
+                    self.report()
+                    next_report = now + report_secs
+
+                # Wake for the next check, an event or to look at the
+                # exit flag once a second
+
+                self.wakeup.clear()
+                timeout = min(max((self.next_due() or now + 1) - now, 0), 1)
+                clock.get_clock().wait(self.wakeup, timeout)
+
+        if self.observer:
+            self.observer.stop()
+            self.observer.join()
 
 
 def main():
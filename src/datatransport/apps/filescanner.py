@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""Event driven file scanner"""
+
+##############################################################################
+#
+#   Event driven file scanner
+#
+#   Keeps a persistent queue of new files in a directory tree using
+#   filesystem events (watchdog) instead of walking the whole tree on
+#   every poll. Used by PostDataFiles (input.scanner: watch).
+#
+#   Files are queued when they are closed after writing or moved into
+#   the tree. On platforms without close events (watchdog falls back to
+#   polling there), created and modified files are queued instead. The
+#   queue is kept in a small SQLite database so files seen before a
+#   restart are not lost, and a reconciliation scan at startup picks up
+#   anything that arrived while the process was not running.
+#
+#   Queued files that were not reported closed (or moved in) are only
+#   returned once their size and modification time are unchanged since
+#   the previous call and they have not been modified for the settle
+#   time, the same check GlobScanner makes.
+#
+#   Note that filesystem events are not delivered for network mounts
+#   (NFS, CIFS) - use the find scanner for those.
+#
+#   GlobScanner is the polling counterpart used by FileWatch and FilePost.
+#   It lists the directories named by the file specs with os.scandir and
+#   only lists a directory again when its modification time changes.
+#   With a settle time, a file is only returned once its size and
+#   modification time are unchanged since the previous scan and it has
+#   not been modified for the settle time, or once it has been reported
+#   closed after writing (mark_closed) and has not changed since, so
+#   partial files are not posted.
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#               Add GlobScanner
+#               Settle check for files not reported closed in FileScanner
+#
+##############################################################################
+
+import fnmatch
+import os
+import sqlite3
+import stat
+import threading
+import time
+from pathlib import Path
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from datatransport.utilities import compile_globs
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS queue (
+        path    TEXT PRIMARY KEY,
+        mtime   REAL
+    );
+"""
+
+
+class FileScanner(FileSystemEventHandler):
+    """Persistent queue of new files in a directory tree"""
+
+    def __init__(self, path, pattern, queuefile, log, settle=0):
+        self.path = Path(path)
+        self.pattern = pattern
+        self.log = log
+        self.settle = settle
+
+        # (size, mtime) of the queued files at the last files() call and
+        # of the files reported closed, when they were closed
+
+        self.seen = {}
+        self.closed = {}
+
+        self.lock = threading.Lock()
+        self.changed = threading.Event()
+        self.observer = None
+        self.close_events = False
+
+        self.conn = sqlite3.connect(queuefile, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    # Events -----------------------------------------------------------------
+
+    def on_closed(self, event):
+        if not event.is_directory:
+            self.add(event.src_path, closed=True)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.add(event.dest_path, closed=True)
+
+    def on_created(self, event):
+        if not event.is_directory and not self.close_events:
+            self.add(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory and not self.close_events:
+            self.add(event.src_path)
+
+    # Queue ------------------------------------------------------------------
+
+    def matches(self, filename):
+        """Check the file name against the pattern (like find -name)"""
+
+        return fnmatch.fnmatch(os.path.basename(filename), self.pattern)
+
+    def add(self, filename, closed=False):
+        """Queue a file if it matches, closed if complete"""
+
+        if not self.matches(filename):
+            return
+
+        try:
+            info = os.stat(filename)
+        except OSError:
+            return
+
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO queue VALUES (?, ?)",
+                (str(filename), info.st_mtime),
+            )
+            self.conn.commit()
+
+            if closed:
+                self.closed[str(filename)] = (info.st_size, info.st_mtime_ns)
+
+        self.changed.set()
+
+    def remove(self, filename):
+        """Remove a file from the queue"""
+
+        with self.lock:
+            self.conn.execute("DELETE FROM queue WHERE path=?", (str(filename),))
+            self.conn.commit()
+            self.closed.pop(str(filename), None)
+            self.seen.pop(str(filename), None)
+
+    def files(self):
+        """
+        Queued files that are complete (sorted by name), dropping any
+        that are gone
+        """
+
+        with self.lock:
+            rows = self.conn.execute("SELECT path FROM queue ORDER BY path").fetchall()
+
+        now = time.time()
+        filenames = []
+        seen = {}
+
+        for (filename,) in rows:
+            try:
+                info = os.stat(filename)
+            except OSError:
+                info = None
+
+            if info is None or not stat.S_ISREG(info.st_mode):
+                self.remove(filename)
+                continue
+
+            key = (info.st_size, info.st_mtime_ns)
+            seen[filename] = key
+
+            with self.lock:
+                closed = self.closed.get(filename)
+
+                # Written to again after it was closed
+
+                if closed is not None and closed != key:
+                    del self.closed[filename]
+
+            settled = (
+                self.seen.get(filename) == key and now - info.st_mtime >= self.settle
+            )
+
+            if closed == key or settled:
+                filenames.append(Path(filename))
+
+        with self.lock:
+            self.seen = seen
+
+        return filenames
+
+    def count(self):
+        """Number of queued files"""
+
+        with self.lock:
+            return self.conn.execute("SELECT count(*) FROM queue").fetchone()[0]
+
+    # Scanning ---------------------------------------------------------------
+
+    def scan(self, since=0):
+        """Queue the matching files modified after since (unix time)"""
+
+        entries = []
+        pending = [self.path]
+
+        while pending:
+            try:
+                with os.scandir(pending.pop()) as scanner:
+                    for entry in scanner:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file() and self.matches(entry.name):
+                            mtime = entry.stat().st_mtime
+                            if mtime > since:
+                                entries.append((entry.path, mtime))
+            except OSError as err:
+                self.log.debug("Problem scanning: %s", err)
+
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO queue VALUES (?, ?)", entries)
+            self.conn.commit()
+
+        self.log.info("Reconciliation scan queued %d files", len(entries))
+
+        if entries:
+            self.changed.set()
+
+        return len(entries)
+
+    def start(self):
+        """Start watching for events"""
+
+        # Only the inotify observer reports when a file is closed
+
+        self.close_events = Observer.__name__ == "InotifyObserver"
+
+        self.observer = Observer()
+        self.observer.schedule(self, str(self.path), recursive=True)
+        self.observer.start()
+
+        self.log.info("Watching %s (%s)", self.path, Observer.__name__)
+
+    def stop(self):
+        """Stop watching and close the queue"""
+
+        if self.observer:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+
+        with self.lock:
+            self.conn.close()
+
+    def wait(self, stop_event, timeout):
+        """
+        Wait up to timeout secs for new files, returns early if
+        stop_event is set
+        """
+
+        remaining = timeout
+
+        while remaining > 0 and not stop_event.is_set():
+            if self.changed.wait(min(remaining, 0.5)):
+                break
+            remaining -= 0.5
+
+        self.changed.clear()
+
+
+class GlobScanner:
+    """Find files matching shell patterns, optionally only stable ones"""
+
+    # Directories modified more recently than this are always listed
+    # again in case the modification time did not change (coarse
+    # timestamps on some filesystems)
+
+    DIR_GRACE = 2
+
+    def __init__(self, path, filespecs, settle=None):
+        self.path = Path(path)
+        self.settle = settle
+
+        # Specs without wildcards in the directory part are matched
+        # against the names in that directory. Anything else uses glob.
+
+        patterns = {}
+        self.globs = []
+
+        for spec in filespecs:
+            dirname, name = os.path.split(spec)
+            if any(char in dirname for char in "*?[") or "**" in spec:
+                self.globs.append(spec)
+            else:
+                patterns.setdefault(self.path / dirname, []).append(name)
+
+        self.patterns = {
+            dirname: compile_globs(names).match for dirname, names in patterns.items()
+        }
+
+        self.dirs = {}
+        self.seen = {}
+        # Closed files -> (size, mtime) when they were closed
+        self.closed = {}
+        self.lock = threading.Lock()
+
+    def mark_closed(self, filename):
+        """Note that a file was closed after writing (filesystem event)"""
+
+        try:
+            info = os.stat(filename)
+        except OSError:
+            return
+
+        with self.lock:
+            self.closed[os.path.abspath(filename)] = (info.st_size, info.st_mtime_ns)
+
+    def list_dir(self, dirname, match):
+        """Matching files in a directory, cached by modification time"""
+
+        try:
+            info = os.stat(dirname)
+        except OSError:
+            return []
+
+        cached = self.dirs.get(dirname)
+
+        if (
+            cached
+            and cached[0] == info.st_mtime_ns
+            and time.time() - info.st_mtime > self.DIR_GRACE
+        ):
+            return cached[1]
+
+        try:
+            with os.scandir(dirname) as entries:
+                filenames = [
+                    entry.path
+                    for entry in entries
+                    if match(entry.name) and entry.is_file()
+                ]
+        except OSError:
+            return []
+
+        self.dirs[dirname] = (info.st_mtime_ns, filenames)
+
+        return filenames
+
+    def candidates(self):
+        """All of the files matching the specs"""
+
+        filenames = set()
+
+        for dirname, match in self.patterns.items():
+            filenames.update(self.list_dir(dirname, match))
+
+        for spec in self.globs:
+            filenames.update(str(f) for f in self.path.glob(spec) if f.is_file())
+
+        return filenames
+
+    def scan(self):
+        """Sorted list of the files ready to post"""
+
+        filenames = self.candidates()
+
+        if self.settle is None:
+            return sorted(Path(filename) for filename in filenames)
+
+        now = time.time()
+        ready = []
+        seen = {}
+
+        with self.lock:
+            closed = dict(self.closed)
+
+        found = {}
+
+        for filename in filenames:
+            try:
+                info = os.stat(filename)
+            except OSError:
+                continue
+
+            key = (info.st_size, info.st_mtime_ns)
+            seen[filename] = key
+            found[os.path.abspath(filename)] = key
+
+            settled = now - info.st_mtime >= self.settle
+            settled = settled and self.seen.get(filename) == key
+
+            # A closed file only counts until it changes again
+
+            if settled or closed.get(os.path.abspath(filename)) == key:
+                ready.append(filename)
+
+        self.seen = seen
+
+        # Forget closed files that are gone (posted or removed) or
+        # have changed since they were closed. Marks made during the
+        # scan are kept.
+
+        with self.lock:
+            self.closed = {
+                name: key
+                for name, key in self.closed.items()
+                if found.get(name) == key or closed.get(name) != key
+            }
+
+        return sorted(Path(filename) for filename in ready)
@@ -28,6 +28,12 @@
 #       watchfiles  - String, list of file names to look for. If multiple
 #                     names are listed, they should be separated by spaces.
 #                     The name can include normal shell wildcards.
+#       watch.batch.files  - max number of files per article (0 = no limit)
+#       watch.batch.bytes  - max bytes per article (0 = no limit)
+#       watch.batch.linger - how long to wait for a partial batch to fill
+#       watch.settle - only post files that have not changed for this
+#                      long and between two checks (default: post
+#                      files as soon as they are found)
 #
 #   1.0.0   2000-??-??  TAV
 #           Initial implementation.
@@ -82,12 +88,23 @@
 #   2023-07026  Todd Valentic
 #               Use new config interface
 #
+#   2026-10-19  Todd Valentic
+#               Batch small files into multi-attachment articles
+#                   (watch.batch.files, watch.batch.bytes,
+#                   watch.batch.linger)
+#               Scan with os.scandir, only listing directories again
+#                   when they change. Optionally wait for files to
+#                   settle before posting them (watch.settle)
+#
 ##########################################################################
 
 import sys
 
 from datatransport import ProcessClient
 from datatransport import NewsPoster
+from datatransport import clock
+from datatransport.apps.filebatch import FileBatcher
+from datatransport.apps.filescanner import GlobScanner
 from datatransport.utilities import remove_file
 
 
@@ -103,26 +120,34 @@ class FileWatch(ProcessClient):
         self.remove_files = self.config.get_boolean("watch.removefiles", True)
         self.group_files = self.config.get_boolean("watch.groupfiles", False)
 
+        self.batcher = FileBatcher(
+            self.config.get_int("watch.batch.files", 0),
+            self.config.get_bytes("watch.batch.bytes", 0),
+            self.config.get_timedelta("watch.batch.linger", 0).total_seconds(),
+        )
+
         self.watchpath = self.config.get_path("watch.path", ".")
         self.filespecs = self.config.get_list("watch.files")
 
         if not self.filespecs:
             self.abort("No watch files listed in the config file.")
 
+        settle = self.config.get_timedelta("watch.settle", None)
+        settle = settle.total_seconds() if settle is not None else None
+
+        self.scanner = GlobScanner(self.watchpath, self.filespecs, settle)
+
         self.log.info("Posting to %s", self.config.get("post.newsgroup"))
         self.log.info("Watching path: %s", self.watchpath)
         self.log.info("Watching for: %s", self.filespecs)
 
+        if settle is not None:
+            self.log.info("Settle time: %ss", settle)
+
     def find_files(self):
         """Find files to post"""
 
-        readyfiles = []
-
-        for filespec in self.filespecs:
-            files = [f for f in self.watchpath.glob(filespec) if f.is_file()]
-            readyfiles.extend(files)
-
-        return sorted(readyfiles)
+        return self.scanner.scan()
 
     def process(self):
         """Process files ready to post"""
@@ -135,6 +160,8 @@ class FileWatch(ProcessClient):
 
         if self.group_files:
             files = [files]
+        elif self.batcher.enabled:
+            files = self.batcher.ready(files, clock.time())
 
         for filegroup in files:
             try:
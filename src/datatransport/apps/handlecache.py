@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Open file handle cache"""
+
+##############################################################################
+#
+#   Open file handle cache
+#
+#   LRU cache of files held open for appending. ArchiveGroups uses this
+#   when concatenating messages (output.max_messages != 1) so that each
+#   message does not have to open and close the output file again.
+#
+#   Handles are closed when the cache is full (least recently used
+#   first), when they have been idle longer than the idle time, or
+#   explicitly when the time span for a file ends.
+#
+#   The fsync policy controls durability:
+#
+#       never   - leave it to the kernel (default)
+#       close   - fsync when the handle is closed
+#       write   - fsync after every append
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#
+##############################################################################
+
+import collections
+import os
+import threading
+import time
+
+FSYNC_POLICIES = ("never", "close", "write")
+
+
+class HandleCache:
+    """LRU cache of open append handles"""
+
+    def __init__(self, size=16, idle=60, fsync="never", log=None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+
+        self.size = size
+        self.idle = idle
+        self.fsync = fsync
+        self.log = log
+
+        self.handles = collections.OrderedDict()
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.handles)
+
+    def __contains__(self, filename):
+        return os.path.abspath(filename) in self.handles
+
+    def get(self, filename):
+        """Return an open handle positioned at the end of the file"""
+
+        key = os.path.abspath(filename)
+
+        with self.lock:
+            if key in self.handles:
+                handle, _last_used = self.handles.pop(key)
+            else:
+                # Not O_APPEND since copy_file_range() does not allow it
+                handle = open(key, "r+b")  # pylint: disable=consider-using-with
+
+                while len(self.handles) >= max(self.size, 1):
+                    oldest = next(iter(self.handles))
+                    self.close(oldest)
+
+            handle.seek(0, os.SEEK_END)
+            self.handles[key] = (handle, time.monotonic())
+
+        return handle
+
+    def written(self, handle):
+        """Called after data has been appended"""
+
+        handle.flush()
+
+        if self.fsync == "write":
+            os.fsync(handle.fileno())
+
+    def close(self, filename):
+        """Close the handle for a file if open"""
+
+        key = os.path.abspath(filename)
+
+        with self.lock:
+            entry = self.handles.pop(key, None)
+
+        if entry is None:
+            return
+
+        handle, _last_used = entry
+
+        try:
+            handle.flush()
+            if self.fsync != "never":
+                os.fsync(handle.fileno())
+        finally:
+            handle.close()
+
+        if self.log:
+            self.log.debug("  closed %s", key)
+
+    def close_idle(self):
+        """Close handles that have not been used recently"""
+
+        cutoff = time.monotonic() - self.idle
+
+        with self.lock:
+            stale = [k for k, (_h, used) in self.handles.items() if used < cutoff]
+
+        for filename in stale:
+            self.close(filename)
+
+    def close_all(self):
+        """Close all handles"""
+
+        with self.lock:
+            filenames = list(self.handles)
+
+        for filename in filenames:
+            self.close(filename)
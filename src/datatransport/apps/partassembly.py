@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""Split file reassembly"""
+
+##############################################################################
+#
+#   Split file reassembly
+#
+#   PostDataFiles splits large files into parts that are posted as
+#   separate messages (X-Transport-Part: <part>/<total>). ArchiveGroups
+#   uses this class to join them back together.
+#
+#   Parts are appended to the output file as soon as the next one in
+#   sequence arrives, and the MD5 checksum is updated as the data is
+#   copied, so the file is only read once and never held in memory.
+#   Parts that arrive early are held in a directory until the gap is
+#   filled.
+#
+#   The progress of each assembly (next part, bytes written) and the
+#   held parts are kept in tables in the checkpoint store, so they are
+#   committed together with the newsgroup watermarks. If the program
+#   stops before a commit, the output file is truncated back to the
+#   recorded size when the assembly is resumed and the messages that
+#   follow are simply read again. Held part files are only removed
+#   after the store commits, and a held part whose file is missing is
+#   forgotten so a re-delivered copy is accepted.
+#
+#   Assemblies that have not received a part within max_age are
+#   removed by collect().
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#               Remove appended held parts after the store commit,
+#                   forget held parts whose file is missing
+#
+##############################################################################
+
+import hashlib
+import os
+import shutil
+
+from datetime import datetime
+from pathlib import Path
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS assemblies (
+        newsgroup       TEXT,
+        filename        TEXT,
+        total           INTEGER,
+        next_part       INTEGER,
+        size            INTEGER,
+        updated         TEXT,
+        PRIMARY KEY (newsgroup, filename)
+    );
+
+    CREATE TABLE IF NOT EXISTS parts (
+        newsgroup       TEXT,
+        filename        TEXT,
+        part            INTEGER,
+        PRIMARY KEY (newsgroup, filename, part)
+    );
+"""
+
+BLOCKSIZE = 1024 * 1024
+
+
+class Assembly:
+    """Progress of one split file"""
+
+    def __init__(self, total, next_part=0, size=0):
+        self.total = total
+        self.next_part = next_part
+        self.size = size
+        self.digest = None
+
+
+class PartAssembler:
+    """Join split file parts as they arrive"""
+
+    def __init__(self, store, path, log):
+        self.store = store
+        self.path = Path(path)
+        self.log = log
+
+        # Running checksums, rebuilt from the output file after a restart
+
+        self.digests = {}
+
+        with self.store.lock:
+            self.store.conn.executescript(SCHEMA)
+            self.store.conn.commit()
+
+    def workdir(self, newsgroup, filename):
+        """Directory for an assembly"""
+        return self.path / newsgroup / filename
+
+    def load(self, newsgroup, filename):
+        """Return the stored assembly or None"""
+
+        row = self.store.conn.execute(
+            "SELECT total, next_part, size FROM assemblies "
+            "WHERE newsgroup=? AND filename=?",
+            (newsgroup, filename),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        assembly = Assembly(*row)
+        assembly.digest = self.digests.get((newsgroup, filename))
+
+        return assembly
+
+    def held(self, newsgroup, filename):
+        """Part numbers waiting for an earlier part"""
+
+        workdir = self.workdir(newsgroup, filename)
+
+        rows = self.store.conn.execute(
+            "SELECT part FROM parts WHERE newsgroup=? AND filename=?",
+            (newsgroup, filename),
+        )
+
+        held = set()
+
+        for (part,) in rows.fetchall():
+            if workdir.joinpath(f"part.{part}").exists():
+                held.add(part)
+                continue
+
+            self.log.info("Lost held part %d of %s", part, filename)
+            self.store.conn.execute(
+                "DELETE FROM parts WHERE newsgroup=? AND filename=? AND part=?",
+                (newsgroup, filename, part),
+            )
+
+        return held
+
+    def resume(self, assembly, output):
+        """Rebuild the checksum of the parts already written"""
+
+        if not output.exists() or output.stat().st_size < assembly.size:
+            return False
+
+        with output.open("r+b") as f:
+            f.truncate(assembly.size)
+            assembly.digest = hashlib.file_digest(f, "md5")
+
+        return True
+
+    def append(self, assembly, source, output):
+        """Append a part to the output and update the checksum"""
+
+        with open(source, "rb") as src, output.open("ab") as dest:
+            while block := src.read(BLOCKSIZE):
+                assembly.digest.update(block)
+                dest.write(block)
+
+        assembly.size = output.stat().st_size
+        assembly.next_part += 1
+
+    # pylint: disable=too-many-arguments
+    def add(self, newsgroup, filename, part, total, source, dest, timestamp):
+        """
+        Add a received part. The part file is consumed. Once all of the
+        parts are in, the joined file is moved to dest and its MD5
+        hexdigest is returned, otherwise None.
+        """
+
+        key = (newsgroup, filename)
+        workdir = self.workdir(newsgroup, filename)
+        output = workdir / "output"
+
+        with self.store.lock:
+            assembly = self.load(newsgroup, filename)
+
+            if assembly and assembly.digest is None:
+                if not self.resume(assembly, output):
+                    self.log.info("Lost partial output for %s", filename)
+                    assembly = None
+
+            if assembly is None or assembly.total != total:
+                if assembly is not None:
+                    self.log.info("Restarting assembly of %s", filename)
+                self.discard(newsgroup, filename)
+                assembly = Assembly(total)
+                workdir.mkdir(parents=True, exist_ok=True)
+                output.touch()
+                assembly.digest = hashlib.md5()
+
+            held = self.held(newsgroup, filename)
+
+            if part < assembly.next_part or part in held or part >= total:
+                self.log.debug("Ignoring duplicate part %d of %s", part, filename)
+                os.remove(source)
+
+            elif part > assembly.next_part:
+                shutil.move(source, workdir / f"part.{part}")
+                self.store.conn.execute(
+                    "INSERT OR REPLACE INTO parts VALUES (?, ?, ?)",
+                    (newsgroup, filename, part),
+                )
+
+            else:
+                self.append(assembly, source, output)
+                os.remove(source)
+
+                while assembly.next_part in held:
+                    partname = workdir / f"part.{assembly.next_part}"
+                    self.store.conn.execute(
+                        "DELETE FROM parts WHERE newsgroup=? AND filename=? "
+                        "AND part=?",
+                        (newsgroup, filename, assembly.next_part),
+                    )
+                    self.append(assembly, partname, output)
+                    self.store.remove_after_commit(partname)
+
+            self.digests[key] = assembly.digest
+
+            if assembly.next_part < total:
+                self.store.conn.execute(
+                    "INSERT OR REPLACE INTO assemblies VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        newsgroup,
+                        filename,
+                        total,
+                        assembly.next_part,
+                        assembly.size,
+                        timestamp.isoformat(),
+                    ),
+                )
+                return None
+
+            os.replace(output, dest)
+            checksum = assembly.digest.hexdigest()
+
+            self.discard(newsgroup, filename)
+
+            return checksum
+
+    def forget(self, newsgroup, filename):
+        """Remove the stored state of an assembly"""
+
+        self.digests.pop((newsgroup, filename), None)
+
+        self.store.conn.execute(
+            "DELETE FROM assemblies WHERE newsgroup=? AND filename=?",
+            (newsgroup, filename),
+        )
+        self.store.conn.execute(
+            "DELETE FROM parts WHERE newsgroup=? AND filename=?",
+            (newsgroup, filename),
+        )
+
+    def discard(self, newsgroup, filename):
+        """Remove an assembly and its files"""
+
+        self.forget(newsgroup, filename)
+        shutil.rmtree(self.workdir(newsgroup, filename), ignore_errors=True)
+
+    def collect(self, cutoff):
+        """Remove assemblies not updated since cutoff"""
+
+        with self.store.lock:
+            rows = self.store.conn.execute(
+                "SELECT newsgroup, filename, next_part, total, updated "
+                "FROM assemblies"
+            ).fetchall()
+
+            for newsgroup, filename, next_part, total, updated in rows:
+                if datetime.fromisoformat(updated) >= cutoff:
+                    continue
+
+                self.log.info(
+                    "Removing stale assembly %s (%s, %d of %d parts)",
+                    filename,
+                    newsgroup,
+                    next_part,
+                    total,
+                )
+                self.discard(newsgroup, filename)
+
+            self.store.commit()
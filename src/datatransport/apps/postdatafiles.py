@@ -138,14 +138,40 @@
 #   2023-07-26  Todd Valentic
 #               Updated for transport3 / python3
 #
+#   2026-10-19  Todd Valentic
+#               Add input.scanner: watch - keep a persistent queue of new
+#                   files from filesystem events (FileScanner) instead
+#                   of running find over the input tree every poll.
+#                   New files are posted as soon as they are closed.
+#                   Files not reported closed are posted once they have
+#                   not changed for input.settle (10s).
+#               Stop at a posting failure and retry the file next time.
+#               Fix exit_on_error -> exit_on_failure in main()
+#               Overlap compression and posting. A pool of
+#                   compress.workers threads compresses the next files
+#                   (up to pipeline.depth) while the current one is
+#                   posted, in order. The checksum is computed while
+#                   compressing and split parts are read straight from
+#                   the file instead of being written to chunk.NNN.
+#               Resume split uploads at the first part not posted. The
+#                   parts, checksum and message ids (set on each part)
+#                   are kept in uploads.json until the file is done.
+#               Optionally adapt the part size to the measured posting
+#                   rate (max_size.adaptive, max_size.min/max/target).
+#                   Files larger than the current part size are split.
+#
 ############################################################################
 
 import bz2
+import collections
+import concurrent.futures
+import email.utils
 import hashlib
+import json
 import math
 import nntplib
 import os
-import shutil
+import socket
 import subprocess
 import sys
 import time
@@ -154,8 +180,93 @@ from pathlib import Path
 
 from datatransport import ProcessClient
 from datatransport import NewsPoster
+from datatransport.apps.filescanner import FileScanner
 from datatransport.utilities import size_desc
 
+BZIP_EXT = ".bz2"
+BLOCKSIZE = 1024 * 1024
+
+
+def compress_file(filename, zipname, level=9):
+    """bzip2 compress filename into zipname, returns the MD5 of zipname"""
+
+    digest = hashlib.md5()
+    compressor = bz2.BZ2Compressor(level)
+
+    with filename.open("rb") as infile, zipname.open("wb") as outfile:
+        while data := infile.read(BLOCKSIZE):
+            data = compressor.compress(data)
+            digest.update(data)
+            outfile.write(data)
+
+        data = compressor.flush()
+        digest.update(data)
+        outfile.write(data)
+
+    return digest.hexdigest()
+
+
+class PreparedFile:
+    """A file on its way through the posting pipeline"""
+
+    def __init__(self, filename, timestamp):
+        self.filename = filename
+        self.timestamp = timestamp
+        self.postfile = filename
+        self.checksum = None
+
+
+class Uploads:
+    """
+    Progress of split uploads, kept in a JSON file so that a retry
+    continues with the first part that was not posted
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+        try:
+            self.state = json.loads(self.path.read_text("utf-8"))
+        except (OSError, ValueError):
+            self.state = {}
+
+    def save(self):
+        """Write the state file"""
+
+        tmpname = self.path.with_name(f".{self.path.name}.tmp")
+        tmpname.write_text(json.dumps(self.state, indent=4), "utf-8")
+        os.replace(tmpname, self.path)
+
+    def start(self, filename, checksum, chunks):
+        """
+        Return the upload for a file, resuming the previous one if the
+        file is unchanged. chunks is only used for a new upload.
+        """
+
+        key = str(filename)
+        upload = self.state.get(key)
+
+        # Files are posted one at a time, anything else was abandoned
+
+        if upload is None or upload["checksum"] != checksum:
+            upload = {"checksum": checksum, "chunks": chunks, "posted": []}
+            self.state = {key: upload}
+            self.save()
+
+        return upload
+
+    def posted(self, filename, message_id):
+        """Record that the next part was posted"""
+
+        self.state[str(filename)]["posted"].append(message_id)
+        self.save()
+
+    def finish(self, filename):
+        """Forget a completed upload"""
+
+        if self.state.pop(str(filename), None) is not None:
+            self.save()
+
 
 class PostDataFiles(ProcessClient):
     """Process Client"""
@@ -174,14 +285,31 @@ class PostDataFiles(ProcessClient):
         self.remove_files = self.config.get_boolean("remove_files", False)
         self.max_files = self.config.get_int("max_files")
         self.max_size = self.config.get_bytes("max_size", "20Mb")
+        self.adaptive = self.config.get_boolean("max_size.adaptive", False)
+        self.min_chunk = self.config.get_bytes("max_size.min", "1Mb")
+        self.max_chunk = self.config.get_bytes("max_size.max", self.max_size)
+        self.target_secs = self.config.get_timedelta(
+            "max_size.target", 60
+        ).total_seconds()
         self.check_index = self.config.get_boolean("check_index", True)
         self.check_size = self.config.get_boolean("check_size", True)
+        self.scanner_type = self.config.get("input.scanner", "find")
+        self.settle = self.config.get_timedelta("input.settle", 10).total_seconds()
+        self.compress_workers = self.config.get_int("compress.workers", 1)
+        self.pipeline_depth = self.config.get_int(
+            "pipeline.depth", self.compress_workers + 1
+        )
 
         self.pollrate = self.config.get_rate("pollrate", 60)
         self.filedate = self.config.get_callback("filedate", self.filedate_callback)
 
         self.timefile = Path("timestamp")
         self.indexfile = Path("index")
+        self.queuefile = Path("queue.sqlite")
+        self.scanner = None
+        self.uploads = Uploads("uploads.json")
+        self.chunk_size = self.max_size
+        self.domain = socket.getfqdn()
 
         if not self.timefile.exists():
             # Default to sometime long ago
@@ -192,35 +320,51 @@ class PostDataFiles(ProcessClient):
         if self.config.get_boolean("start_current", False):
             os.utime(self.timefile, None)
 
+        if self.scanner_type not in ("find", "watch"):
+            self.abort(f"Unknown input.scanner: {self.scanner_type}")
+
         self.log.info("Input path: %s", self.input_path)
         self.log.info("Input name: %s", self.input_name)
+        self.log.info("Scanner: %s", self.scanner_type)
 
     def filedate_callback(self, _filename):
         """Extract timestamp from file"""
 
         return None
 
-    def split(self, filename):
-        """Split file into chunks"""
+    def chunks(self, filesize):
+        """Split a file into [offset, size] chunks"""
 
-        filesize = filename.stat().st_size
+        chunk_size = self.chunk_size if self.adaptive else self.max_size
 
-        if not self.check_size or filesize <= self.max_size:
-            return [filename]
+        if not self.check_size or filesize <= chunk_size:
+            return [[0, filesize]]
 
-        num_chunks = math.ceil(filesize / self.max_size)
-        chunks = []
+        num_chunks = math.ceil(filesize / chunk_size)
 
-        with filename.open("rb") as f:
-            for chunk in range(num_chunks):
-                data = f.read(self.max_size)
-                chunkname = Path(f"chunk.{chunk:03d}")
-                chunkname.write_bytes(data)
-                chunks.append(chunkname)
+        return [[chunk * chunk_size, chunk_size] for chunk in range(num_chunks)]
+
+    def adapt_chunk_size(self, numbytes, elapsed, failed=False):
+        """
+        Move the chunk size towards what can be posted in the target
+        time at the measured rate, halve it after a failure
+        """
+
+        if not self.adaptive:
+            return
+
+        if failed:
+            size = self.chunk_size // 2
+        else:
+            rate = numbytes / max(elapsed, 0.001)
+            size = (self.chunk_size + rate * self.target_secs) // 2
 
-            self.log.info("  - split into %d parts", num_chunks)
+        size = int(min(max(size, self.min_chunk), self.max_chunk))
 
-        return chunks
+        if size != self.chunk_size:
+            self.log.debug("  - chunk size %s", size_desc(size))
+
+        self.chunk_size = size
 
     def compute_checksum(self, filename):
         """Compute checksum"""
@@ -230,28 +374,83 @@ class PostDataFiles(ProcessClient):
 
         return digest.hexdigest()
 
-    def post(self, filename, timestamp):
+    def post(self, filename, timestamp, checksum=None):
         """Post file to newsgroup"""
 
-        filenames = self.split(filename)
-        numparts = len(filenames)
-        checksum = self.compute_checksum(filename)
+        chunks = self.chunks(filename.stat().st_size)
+        numparts = len(chunks)
+
+        if checksum is None:
+            checksum = self.compute_checksum(filename)
+
+        if numparts == 1:
+            headers = {"X-Transport-md5": checksum}
+            filesize = filename.stat().st_size
+            self.log.debug("  - posting %s (%s)", filename, size_desc(filesize))
+
+            starttime = time.monotonic()
+
+            try:
+                self.news_poster.post([filename], date=timestamp, headers=headers)
+            except (nntplib.NNTPError, OSError):
+                self.adapt_chunk_size(filesize, 0, failed=True)
+                raise
+
+            # Small posts mostly measure the latency, not the rate
 
-        for part, filepart in enumerate(filenames):
-            headers = {}
-            if numparts > 1:
+            if filesize >= self.min_chunk:
+                self.adapt_chunk_size(filesize, time.monotonic() - starttime)
+
+            return
+
+        # Split uploads are resumed at the first part not posted
+
+        upload = self.uploads.start(filename, checksum, chunks)
+        chunks = upload["chunks"]
+        numparts = len(chunks)
+        first = len(upload["posted"])
+
+        if first:
+            self.log.info("  - resuming at part %d of %d", first + 1, numparts)
+        else:
+            self.log.info("  - split into %d parts", numparts)
+
+        # The parts are read straight from the file
+
+        with filename.open("rb") as f:
+            for part in range(first, numparts):
+                offset, size = chunks[part]
+
+                headers = {}
                 headers["X-Transport-Part"] = f"{part}/{numparts}"
                 headers["X-Transport-Filename"] = filename.stem
 
-            # Note - checksum of the *entire* file, not part
-            headers["X-Transport-md5"] = checksum
+                # Note - checksum of the *entire* file, not part
+                headers["X-Transport-md5"] = checksum
+
+                # Our own id, the post response does not include one
+                headers["Message-ID"] = email.utils.make_msgid(domain=self.domain)
+
+                f.seek(offset)
+                data = f.read(size)
+
+                partname = f"chunk.{part:03d}"
+                self.log.debug("  - posting %s (%s)", partname, size_desc(len(data)))
+
+                starttime = time.monotonic()
 
-            filesize = filepart.stat().st_size
-            self.log.debug("  - posting %s (%s)", filepart, size_desc(filesize))
-            self.news_poster.post([filepart], date=timestamp, headers=headers)
+                try:
+                    self.news_poster.post_data(
+                        data, partname, date=timestamp, headers=headers
+                    )
+                except (nntplib.NNTPError, OSError):
+                    self.adapt_chunk_size(len(data), 0, failed=True)
+                    raise
 
-            if numparts > 1:
-                os.remove(filepart)
+                self.adapt_chunk_size(len(data), time.monotonic() - starttime)
+                self.uploads.posted(filename, headers["Message-ID"])
+
+        self.uploads.finish(filename)
 
     def valid_index(self, filename):
         """Check file is larger than last index"""
@@ -271,15 +470,15 @@ class PostDataFiles(ProcessClient):
 
         return False
 
-    def process_file(self, filename):
-        """Process file (compress, split, post)"""
+    def start_file(self, filename):
+        """Check a file and get its timestamp, returns None to skip it"""
 
         self.log.info("Processing %s", filename)
 
         # Check if we have seen this file before
 
         if not self.valid_index(filename):
-            return
+            return None
 
         # Get timestamp from file
 
@@ -289,23 +488,24 @@ class PostDataFiles(ProcessClient):
                 self.log.debug("  - file timestamp %s", timestamp)
         except Exception:  # pylint: disable=broad-exception-caught
             self.log.exception("Error calling routine to determine file timestamp")
-            return
+            return None
+
+        return PreparedFile(filename, timestamp)
 
-        # Compress the file
+    def prepare_file(self, item):
+        """Compress the file and compute the checksum (worker thread)"""
 
-        bzipext = ".bz2"
-        zipname = filename.with_suffix(filename.suffix + bzipext)
+        filename = item.filename
 
-        if self.compress and filename.suffix != bzipext:
+        if self.compress and filename.suffix != BZIP_EXT:
             starttime = self.now()
 
-            self.log.debug("  - compressing file")
-            with filename.open("rb") as infile:
-                with bz2.BZ2File(zipname, "wb", compresslevel=9) as outfile:
-                    shutil.copyfileobj(infile, outfile)
+            self.log.debug("  - compressing %s", filename.name)
+            item.postfile = filename.with_suffix(filename.suffix + BZIP_EXT)
+            item.checksum = compress_file(filename, item.postfile)
 
             orgsize = filename.stat().st_size
-            zipsize = zipname.stat().st_size
+            zipsize = item.postfile.stat().st_size
 
             if orgsize > 0:
                 zippct = (zipsize / orgsize) * 100
@@ -314,30 +514,36 @@ class PostDataFiles(ProcessClient):
 
             totaltime = self.now() - starttime
             self.log.info(
-                "  - %s -> %s (%d%%) %s",
+                "  - %s %s -> %s (%d%%) %s",
+                filename.name,
                 size_desc(orgsize),
                 size_desc(zipsize),
                 zippct,
                 totaltime,
             )
 
-            postfile = zipname
-
         else:
-            postfile = filename
+            item.checksum = self.compute_checksum(filename)
+
+        return item
+
+    def post_file(self, item):
+        """Post a prepared file and clean up, returns False on failure"""
+
+        filename = item.filename
 
         # Post file to news server
 
         try:
-            self.post(postfile, timestamp)
+            self.post(item.postfile, item.timestamp, item.checksum)
         except nntplib.NNTPError as err:
             self.log.error("Problem posting file: %s", err)
-            return
+            self.discard_file(item)
+            return False
 
         # Cleanup files
 
-        if zipname.exists():
-            zipname.unlink()
+        self.discard_file(item)
 
         if self.remove_files:
             try:
@@ -351,8 +557,26 @@ class PostDataFiles(ProcessClient):
         if self.check_index:
             self.indexfile.write_text(filename.stem, "utf-8")
 
-    def poll(self):
-        """Poll for new files"""
+        return True
+
+    def discard_file(self, item):
+        """Remove the compressed copy of a file"""
+
+        if item.postfile != item.filename:
+            item.postfile.unlink(missing_ok=True)
+
+    def process_file(self, filename):
+        """Process file (compress, split, post)"""
+
+        item = self.start_file(filename)
+
+        if item is None:
+            return None
+
+        return self.post_file(self.prepare_file(item))
+
+    def find_files(self):
+        """Find files newer than the timestamp file"""
 
         # pylint: disable=consider-using-f-string
 
@@ -371,7 +595,15 @@ class PostDataFiles(ProcessClient):
             self.log.debug("output: %s", output)
             return []
 
-        filelist = sorted(output.split("\n"))
+        return sorted(output.split("\n"))
+
+    def poll(self):
+        """Poll for new files"""
+
+        if self.scanner:
+            filelist = [str(filename) for filename in self.scanner.files()]
+        else:
+            filelist = self.find_files()
 
         if not self.include_current:
             # exclude the current file
@@ -379,10 +611,34 @@ class PostDataFiles(ProcessClient):
 
         if self.max_files:
             # only keep the last N files
+            if self.scanner:
+                for filename in filelist[: -self.max_files]:
+                    self.scanner.remove(filename)
             filelist = filelist[-self.max_files :]
 
         return [Path(filename) for filename in filelist]
 
+    def setup_scanner(self):
+        """Queue files found since the last run and start watching"""
+
+        self.scanner = FileScanner(
+            self.input_path, self.input_name, self.queuefile, self.log, self.settle
+        )
+
+        try:
+            self.scanner.start()
+        except OSError:
+            self.log.exception("Problem watching %s", self.input_path)
+            self.scanner.stop()
+            self.scanner = None
+            return False
+
+        # Start watching first so nothing is missed during the scan
+
+        self.scanner.scan(self.timefile.stat().st_mtime)
+
+        return True
+
     def process(self):
         """Post any new files"""
 
@@ -390,25 +646,87 @@ class PostDataFiles(ProcessClient):
 
         self.log.debug("Polling - found %d new files.", len(filenames))
 
-        for filename in filenames:
-            timestamp = filename.stat().st_mtime
-            self.process_file(filename)
-            os.utime(self.timefile, (timestamp, timestamp))
+        # Files are compressed by the workers ahead of the poster. At most
+        # pipeline.depth files are waiting and they are posted in order.
+
+        pending = collections.deque()
+        filenames = iter(filenames)
+
+        executor = concurrent.futures.ThreadPoolExecutor(
+            self.compress_workers, thread_name_prefix="Compress"
+        )
+
+        try:
+            while True:
+                while len(pending) < self.pipeline_depth:
+                    filename = next(filenames, None)
+                    if filename is None:
+                        break
+                    timestamp = filename.stat().st_mtime
+                    item = self.start_file(filename)
+                    if item:
+                        item = executor.submit(self.prepare_file, item)
+                    pending.append((filename, timestamp, item))
+
+                if not pending:
+                    break
+
+                filename, timestamp, item = pending.popleft()
+
+                result = self.post_file(item.result()) if item else None
+
+                if result is False:
+                    # Keep the order and the timestamp, try again on
+                    # the next pass
+                    return
 
-            if self.is_stopped():
-                return
+                if self.scanner:
+                    self.scanner.remove(filename)
+
+                os.utime(self.timefile, (timestamp, timestamp))
+
+                if self.is_stopped():
+                    return
+
+        finally:
+            for _filename, _timestamp, item in pending:
+                if item:
+                    item.cancel()
+
+            executor.shutdown(wait=True)
+
+            for _filename, _timestamp, item in pending:
+                if item and not item.cancelled() and not item.exception():
+                    self.discard_file(item.result())
+
+    def wait_files(self):
+        """Wait for the next poll or for new files to arrive"""
+
+        if not self.scanner:
+            return self.wait(self.pollrate)
+
+        self.scanner.wait(self.exit_event, self.pollrate.period.total_seconds())
+
+        return self.is_running()
 
     def main(self):
         """Main application"""
 
-        while self.wait(self.pollrate):
-            try:
-                self.process()
-            except Exception as err:  # pylint: disable=broad-exception-caught
-                if self.exit_on_error:
-                    self.log.exception("Problem processing")
-                    return
-                self.log.error("Problem processing: %s", err)
+        if self.scanner_type == "watch" and not self.setup_scanner():
+            self.log.warning("Falling back to polling with find")
+
+        try:
+            while self.wait_files():
+                try:
+                    self.process()
+                except Exception as err:  # pylint: disable=broad-exception-caught
+                    if self.exit_on_failure:
+                        self.log.exception("Problem processing")
+                        return
+                    self.log.error("Problem processing: %s", err)
+        finally:
+            if self.scanner:
+                self.scanner.stop()
 
 
 def main():
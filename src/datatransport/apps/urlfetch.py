@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""HTTP fetching with connection reuse"""
+
+##############################################################################
+#
+#   HTTP fetching with connection reuse
+#
+#   Used by WatchURL to check and download a page and its images. The
+#   connections to each host are kept open (HTTP keep-alive) and reused
+#   for the following requests instead of connecting for every URL.
+#   Several URLs can be fetched at once from a bounded pool of threads.
+#
+#   Headers are checked with HEAD (falling back to GET when a server
+#   does not allow HEAD). Downloads can be conditional: given the ETag
+#   and/or Last-Modified from a previous download, the server answers
+#   304 Not Modified without sending the content again. The content is
+#   streamed to disk while its checksum is computed, so large files are
+#   never held in memory.
+#
+#   Other schemes (file, ftp) and proxied requests are handled with
+#   urllib, without connection reuse or conditional requests.
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#
+##############################################################################
+
+import concurrent.futures
+import hashlib
+import http.client
+import os
+import threading
+import urllib.error
+import urllib.request
+from urllib.parse import urljoin, urlsplit
+
+BLOCKSIZE = 64 * 1024
+MAX_REDIRECTS = 5
+REDIRECTS = (301, 302, 303, 307, 308)
+
+# Errors from reusing a connection the server has already closed
+
+STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class FetchResult:
+    """Outcome of a download"""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, url, filename, status, headers):
+        self.url = url
+        self.filename = filename
+        self.status = status
+        self.headers = headers
+        self.size = 0
+        self.checksum = None
+
+    @property
+    def modified(self):
+        """False if the server reported the content was not modified"""
+        return self.status != 304
+
+    @property
+    def etag(self):
+        """ETag header (None if not given)"""
+        return self.headers.get("ETag") if self.headers else None
+
+    @property
+    def last_modified(self):
+        """Last-Modified header (None if not given)"""
+        return self.headers.get("Last-Modified") if self.headers else None
+
+
+class URLFetcher:
+    """Fetch URLs over reused connections"""
+
+    def __init__(self, timeout=60, workers=4):
+        self.timeout = timeout
+        self.workers = max(workers, 1)
+
+        # (scheme, host) -> idle connections
+        self.idle = {}
+        self.lock = threading.Lock()
+
+        self.proxies = urllib.request.getproxies()
+        self.executor = None
+
+    # Connections ------------------------------------------------------------
+
+    def connect(self, key, fresh=False):
+        """An idle connection to the host or a new one, (conn, reused)"""
+
+        with self.lock:
+            idle = self.idle.get(key)
+            if idle and not fresh:
+                return idle.pop(), True
+
+        scheme, host = key
+
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(host, timeout=self.timeout)
+        else:
+            conn = http.client.HTTPConnection(host, timeout=self.timeout)
+
+        return conn, False
+
+    def release(self, key, conn, response):
+        """Keep the connection for the next request if possible"""
+
+        if response.will_close:
+            conn.close()
+            return
+
+        with self.lock:
+            self.idle.setdefault(key, []).append(conn)
+
+    def close(self):
+        """Close the idle connections and the thread pool"""
+
+        with self.lock:
+            for conns in self.idle.values():
+                for conn in conns:
+                    conn.close()
+            self.idle = {}
+
+        if self.executor:
+            self.executor.shutdown()
+            self.executor = None
+
+    def use_urllib(self, url):
+        """True if the URL is not handled with http.client"""
+
+        scheme = urlsplit(url).scheme
+        return scheme not in ("http", "https") or scheme in self.proxies
+
+    # Requests ---------------------------------------------------------------
+
+    def send(self, key, method, target, headers):
+        """Send a request on a connection to the host, (conn, response)"""
+
+        conn, reused = self.connect(key)
+
+        for retry in (False, True):
+            if retry:
+                # The server closed the kept connection, use a new one
+                conn, reused = self.connect(key, fresh=True)
+
+            try:
+                conn.request(method, target, headers=headers)
+                return conn, conn.getresponse()
+            except STALE_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+            except Exception:
+                conn.close()
+                raise
+
+        raise http.client.RemoteDisconnected("Connection closed")
+
+    def open(self, method, url, headers=None):
+        """
+        Send a request, following redirects. Returns (key, conn, response)
+        with the response body not yet read.
+        """
+
+        headers = dict(headers or {})
+
+        for _redirect in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            key = (parts.scheme, parts.netloc)
+            target = parts.path or "/"
+
+            if parts.query:
+                target = f"{target}?{parts.query}"
+
+            conn, response = self.send(key, method, target, headers)
+
+            location = response.getheader("Location")
+
+            if response.status not in REDIRECTS or not location:
+                return key, conn, response
+
+            response.read()
+            self.release(key, conn, response)
+
+            url = urljoin(url, location)
+
+            if response.status == 303:
+                method = "GET"
+
+        raise urllib.error.HTTPError(
+            url, response.status, "Too many redirects", response.headers, None
+        )
+
+    def check_status(self, url, key, conn, response):
+        """Raise HTTPError for error responses"""
+
+        if response.status < 400:
+            return
+
+        response.read()
+        self.release(key, conn, response)
+
+        raise urllib.error.HTTPError(
+            url, response.status, response.reason, response.headers, None
+        )
+
+    def head(self, url):
+        """Response headers for a URL"""
+
+        if self.use_urllib(url):
+            with urllib.request.urlopen(url) as response:
+                return response.info()
+
+        key, conn, response = self.open("HEAD", url)
+
+        if response.status in (405, 501):
+            # HEAD not allowed, just read the headers of a GET
+            response.read()
+            self.release(key, conn, response)
+            key, conn, response = self.open("GET", url)
+            self.check_status(url, key, conn, response)
+            conn.close()
+            return response.headers
+
+        self.check_status(url, key, conn, response)
+        response.read()
+        self.release(key, conn, response)
+
+        return response.headers
+
+    def read(self, url):
+        """Contents of a URL"""
+
+        if self.use_urllib(url):
+            with urllib.request.urlopen(url) as response:
+                return response.read()
+
+        key, conn, response = self.open("GET", url)
+        self.check_status(url, key, conn, response)
+
+        try:
+            contents = response.read()
+        except Exception:
+            conn.close()
+            raise
+
+        self.release(key, conn, response)
+
+        return contents
+
+    def fetch(self, url, filename, etag=None, last_modified=None):
+        """
+        Download a URL into filename, computing its MD5 checksum.
+        With etag and/or last_modified, the file is only downloaded
+        if it changed (result.modified).
+        """
+
+        if self.use_urllib(url):
+            with urllib.request.urlopen(url) as response:
+                result = FetchResult(url, filename, 200, response.info())
+                self.save(response, result)
+            return result
+
+        headers = {}
+
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        key, conn, response = self.open("GET", url, headers)
+        self.check_status(url, key, conn, response)
+
+        result = FetchResult(url, filename, response.status, response.headers)
+
+        try:
+            if result.modified:
+                self.save(response, result)
+            else:
+                response.read()
+        except Exception:
+            conn.close()
+            raise
+
+        self.release(key, conn, response)
+
+        return result
+
+    def save(self, response, result):
+        """Stream the response to the result file"""
+
+        checksum = hashlib.md5()
+        partname = f"{result.filename}.part"
+
+        try:
+            with open(partname, "wb") as output:
+                while data := response.read(BLOCKSIZE):
+                    checksum.update(data)
+                    output.write(data)
+                    result.size += len(data)
+            os.replace(partname, result.filename)
+        except BaseException:
+            if os.path.exists(partname):
+                os.remove(partname)
+            raise
+
+        result.checksum = checksum.hexdigest()
+
+    # Concurrency ------------------------------------------------------------
+
+    def map(self, func, *iterables):
+        """
+        Call func over the iterables on the thread pool. Returns a list
+        of (result, exception) in the same order.
+        """
+
+        if self.executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="fetch"
+            )
+
+        futures = [self.executor.submit(func, *args) for args in zip(*iterables)]
+
+        results = []
+
+        for future in futures:
+            try:
+                results.append((future.result(), None))
+            except Exception as err:  # pylint: disable=broad-exception-caught
+                results.append((None, err))
+
+        return results
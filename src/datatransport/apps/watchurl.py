@@ -73,10 +73,26 @@
 #   2023-07-26  Todd Valentic
 #               Updated for transport3 / python3
 #
+#   2026-10-19  Todd Valentic
+#               Fetch with URLFetcher: reuse connections (keep-alive),
+#                   check headers with HEAD, conditional GETs using the
+#                   ETag/Last-Modified from the last download
+#                   (conditional), fetch the URLs concurrently (workers)
+#                   and stream them to disk while computing the checksum.
+#                   URLs with the same file name get unique local names.
+#               Keep the state of each URL (validators, size, checksum,
+#                   last posted) in urlstate.json and only download and
+#                   post the URLs that changed, replacing the whole set
+#                   checksums (checksum.files, checksum.headers).
+#                   The first run after upgrading seeds the state from
+#                   checksum.files when the contents match, so they are
+#                   not posted again.
+#
 #####################################################################
 
 import fnmatch
 import hashlib
+import json
 import nntplib
 import os
 import pathlib
@@ -91,6 +107,7 @@ from urllib.parse import urlparse, urljoin
 
 from datatransport import ProcessClient
 from datatransport import NewsPoster
+from datatransport.apps.urlfetch import BLOCKSIZE, URLFetcher
 from datatransport.utilities import remove_file
 
 
@@ -103,14 +120,15 @@ class Parser(HTMLParser):
         self.include_patters = include_names
         self.exclude_patterns = exclude_names
 
-    def get_images(self, url):
-        """Get image URLS on page"""
+    def get_images(self, url, contents=None):
+        """Get image URLS on page (contents if already fetched)"""
 
         self.urls = []
         self.base = url
 
-        with urllib.request.urlopen(url) as response:
-            contents = response.read()
+        if contents is None:
+            with urllib.request.urlopen(url) as response:
+                contents = response.read()
 
         self.reset()
         self.feed(contents.decode("utf-8"))
@@ -157,6 +175,46 @@ class Parser(HTMLParser):
             self.urls.append(urljoin(self.base, href))
 
 
+class URLState:
+    """
+    What is known about each URL (validators, size, checksum and when
+    it was last posted), kept in a JSON file
+    """
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+
+        try:
+            self.state = json.loads(self.path.read_text("utf-8"))
+        except (OSError, ValueError):
+            self.state = {}
+
+    def save(self):
+        """Write the state file"""
+
+        tmpname = self.path.with_name(f".{self.path.name}.tmp")
+        tmpname.write_text(json.dumps(self.state, indent=4), "utf-8")
+        os.replace(tmpname, self.path)
+
+    def get(self, url):
+        """State of a URL (empty if not seen before)"""
+
+        return self.state.get(url, {})
+
+    def update(self, url, **values):
+        """Update the state of a URL"""
+
+        self.state.setdefault(url, {}).update(values)
+
+    def prune(self, urls):
+        """Forget URLs that are no longer watched"""
+
+        urls = set(urls)
+
+        for url in [url for url in self.state if url not in urls]:
+            del self.state[url]
+
+
 class WatchURL(ProcessClient):
     """Process Client"""
 
@@ -183,9 +241,11 @@ class WatchURL(ProcessClient):
         )
         self.thumbnail_exts = self.config.get_list("thumbnails.ext", ".jpg .png .gif")
         self.thumbnail_name = self.config.get("thumbnails.name", "%s-thumbnail.jpg")
+        self.workers = self.config.get_int("workers", 4)
+        self.conditional = self.config.get_boolean("conditional", True)
 
-        self.checksum_files = pathlib.Path("checksum.files")
-        self.checksum_headers = pathlib.Path("checksum.headers")
+        self.state = URLState("urlstate.json")
+        self.legacy_checksum = self.load_legacy_checksum()
 
         socket.setdefaulttimeout(self.timeout.total_seconds())
 
@@ -205,6 +265,47 @@ class WatchURL(ProcessClient):
 
         self.parser = Parser(self.include_names, self.exclude_names)
 
+        self.fetcher = URLFetcher(self.timeout.total_seconds(), self.workers)
+
+    def load_legacy_checksum(self):
+        """Whole set checksum of an earlier version, if not yet seeded"""
+
+        if self.state.path.exists():
+            return None
+
+        try:
+            return pathlib.Path("checksum.files").read_text("utf-8").strip()
+        except OSError:
+            return None
+
+    def seed_state(self, changed, headers):
+        """
+        First run after upgrading: if the contents match the checksum
+        of the whole set kept by the earlier version, they have already
+        been posted and are only recorded in the state. Returns the
+        files still to post.
+        """
+
+        legacy, self.legacy_checksum = self.legacy_checksum, None
+
+        checksum = hashlib.md5()
+
+        for _url, result in changed:
+            with open(result.filename, "rb") as f:
+                while data := f.read(BLOCKSIZE):
+                    checksum.update(data)
+
+        remove_file(["checksum.files", "checksum.headers"])
+
+        if checksum.hexdigest() != legacy:
+            return changed
+
+        self.log.info("Contents match checksum.files, seeding the state")
+        self.update_state(changed, headers)
+        remove_file([result.filename for _url, result in changed])
+
+        return []
+
     def gather_urls(self, src_url):
         """Find URLs on the page"""
 
@@ -214,7 +315,8 @@ class WatchURL(ProcessClient):
             urls.append(src_url)
 
         if self.save_images:
-            urls.extend(self.parser.get_images(src_url))
+            contents = self.fetcher.read(src_url)
+            urls.extend(self.parser.get_images(src_url, contents))
 
         self.log.debug("Checking these URLs:")
         for url in urls:
@@ -227,8 +329,7 @@ class WatchURL(ProcessClient):
 
         self.log.debug("  getting headers from %s", url)
 
-        with urllib.request.urlopen(url) as response:
-            headers = response.info()
+        headers = self.fetcher.head(url)
 
         keepers = []
 
@@ -242,52 +343,32 @@ class WatchURL(ProcessClient):
         return "\n".join(keepers).encode("utf-8")
 
     def headers_changed(self, urls):
-        """Check if headers have changed"""
+        """
+        URLs with changed headers, {url: headers checksum}. Raises the
+        error if none of the headers could be checked.
+        """
 
         self.log.debug("Checking headers")
 
-        try:
-            prev_checksum = self.checksum_headers.read_text("utf-8")
-        except OSError:
-            prev_checksum = 0
+        changed = {}
+        errors = []
 
-        checksum = hashlib.md5()
-
-        for url in urls:
-            checksum.update(self.get_headers(url))
-
-        checksum = checksum.hexdigest()
-
-        self.log.debug("  prev checksum: %s", prev_checksum)
-        self.log.debug("  new  checksum: %s", checksum)
-
-        if checksum != prev_checksum:
-            self.log.debug("  header change detected")
-            self.checksum_headers.write_text(checksum, "utf-8")
-            return True
-
-        return False
+        for url, (headers, err) in zip(urls, self.fetcher.map(self.get_headers, urls)):
+            if err:
+                self.log.error("Problem checking headers for %s: %s", url, err)
+                errors.append(err)
+                continue
 
-    def files_changed(self, checksum):
-        """Check if files have changed"""
+            checksum = hashlib.md5(headers).hexdigest()
 
-        self.log.debug("Checking file checksum")
+            if checksum != self.state.get(url).get("headers"):
+                self.log.debug("  header change detected: %s", url)
+                changed[url] = checksum
 
-        try:
-            prev_checksum = self.checksum_files.read_text("utf-8")
-        except OSError:
-            prev_checksum = 0
+        if errors and len(errors) == len(urls):
+            raise errors[-1]
 
-        self.log.debug("  prev checksum: %s", prev_checksum)
-        self.log.debug("  new  checksum: %s", checksum)
-
-        if checksum != prev_checksum:
-            self.log.debug("  new files detected")
-            self.checksum_files.write_text(checksum, "utf-8")
-            return True
-
-        self.log.debug("  files are the same")
-        return False
+        return changed
 
     def remap(self, filename):
         """Rename file"""
@@ -298,14 +379,16 @@ class WatchURL(ProcessClient):
 
         return filename
 
-    def retrieve_files(self, urls):
-        """Retrieve files"""
+    def file_names(self, urls):
+        """
+        Local file name for each URL. Names used by an earlier URL get
+        a numbered suffix (logo.png, logo-1.png), since the files are
+        downloaded at the same time.
+        """
 
-        filenames = []
+        filenames = {}
         unknownext = 0
-        checksum = hashlib.md5()
-
-        self.log.debug("Retrieving files:")
+        used = set()
 
         for url in urls:
             path = urlparse(url).path
@@ -315,19 +398,84 @@ class WatchURL(ProcessClient):
                 unknownext = unknownext + 1
 
             filename = self.remap(filename)
+            root, ext = os.path.splitext(filename)
+            count = 0
 
-            try:
-                with urllib.request.urlopen(url) as response:
-                    contents = response.read()
-                checksum.update(contents)
-                with open(filename, "wb") as f:
-                    f.write(contents)
-                filenames.append(filename)
-                self.log.debug("  %s -> %s", url, filename)
-            except Exception as err: # pylint: disable: broad-exception-caught
+            while filename in used:
+                count += 1
+                filename = f"{root}-{count}{ext}"
+
+            used.add(filename)
+            filenames[url] = filename
+
+        return filenames
+
+    def fetch(self, url, filename):
+        """Download a URL, only if changed when conditional"""
+
+        state = self.state.get(url) if self.conditional else {}
+
+        return self.fetcher.fetch(
+            url, filename, state.get("etag"), state.get("last_modified")
+        )
+
+    def retrieve_files(self, urls, filenames, headers):
+        """
+        Download the URLs, returns [(url, result)] for those with new
+        contents. URLs that did not change are only noted in the state.
+        """
+
+        self.log.debug("Retrieving files:")
+
+        filenames = [filenames[url] for url in urls]
+        results = self.fetcher.map(self.fetch, urls, filenames)
+
+        changed = []
+
+        for url, (result, err) in zip(urls, results):
+            if err:
                 self.log.error("Problem retrieving %s: %s", url, err)
+                continue
 
-        return filenames, checksum.hexdigest()
+            if not result.modified:
+                self.log.debug("  %s not modified", url)
+            elif result.checksum == self.state.get(url).get("checksum"):
+                self.log.debug("  %s is the same", url)
+                remove_file(result.filename)
+            else:
+                self.log.debug("  %s -> %s", url, result.filename)
+                changed.append((url, result))
+                continue
+
+            # Unchanged, only remember the latest validators
+
+            if result.modified:
+                self.state.update(
+                    url, etag=result.etag, last_modified=result.last_modified
+                )
+
+            if url in headers:
+                self.state.update(url, headers=headers[url])
+
+        return changed
+
+    def update_state(self, changed, headers):
+        """Record the URLs that were posted"""
+
+        posted = self.now().isoformat()
+
+        for url, result in changed:
+            self.state.update(
+                url,
+                etag=result.etag,
+                last_modified=result.last_modified,
+                size=result.size,
+                checksum=result.checksum,
+                posted=posted,
+            )
+
+            if url in headers:
+                self.state.update(url, headers=headers[url])
 
     def make_thumbnails(self, filenames):
         """Create thumbnails"""
@@ -368,36 +516,54 @@ class WatchURL(ProcessClient):
                 self.wait(self.pollrate)
                 continue
 
-            try:
-                if self.check_headers and not self.headers_changed(urls):
-                    self.log.debug("The headers have not changed")
-                    self.wait(self.pollrate)
+            self.state.prune(urls)
+            filenames = self.file_names(urls)
+            headers = {}
+
+            if self.check_headers:
+                try:
+                    headers = self.headers_changed(urls)
+                except:
+                    self.log.exception("Problem checking headers")
+                    self.wait(self.retryrate)
                     continue
-            except:
-                self.log.exception("Problem checking headers")
-                self.wait(self.retryrate)
+                urls = list(headers)
+
+            if not urls:
+                self.log.debug("The headers have not changed")
+                self.state.save()
+                self.wait(self.pollrate)
                 continue
 
-            filenames, checksum = self.retrieve_files(urls)
+            changed = self.retrieve_files(urls, filenames, headers)
+
+            if self.legacy_checksum is not None and changed:
+                changed = self.seed_state(changed, headers)
+
+            filenames = [result.filename for _url, result in changed]
 
-            if self.files_changed(checksum):
-                if self.save_thumbnails:
-                    try:
-                        filenames.extend(self.make_thumbnails(filenames))
-                    except:
-                        self.log.exception("Problem making thumbnails")
+            if self.save_thumbnails and filenames:
+                try:
+                    filenames.extend(self.make_thumbnails(filenames))
+                except:
+                    self.log.exception("Problem making thumbnails")
 
-                if filenames:
-                    try:
-                        self.news_poster.post(filenames)
-                        self.log.info("New files detected, posting %s", filenames)
-                    except nntplib.NNTPError as err:
-                        self.log.error("Error posting to the news server: %s", err)
+            if filenames:
+                try:
+                    self.news_poster.post(filenames)
+                    self.log.info("New files detected, posting %s", filenames)
+                    self.update_state(changed, headers)
+                except nntplib.NNTPError as err:
+                    self.log.error("Error posting to the news server: %s", err)
+
+            self.state.save()
 
             remove_file(filenames)
 
             self.wait(self.pollrate)
 
+        self.fetcher.close()
+
 
 def main():
     """Script entry point"""
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""Clock"""
+
+##########################################################################
+#
+#   Clock
+#
+#   Source of time for the transport clients. Normally this is just the
+#   system clock, but a VirtualClock can be installed so that the same
+#   code runs against simulated time. The virtual clock is a scaled
+#   copy of the wall clock:
+#
+#       virtual = start + (time.time() - epoch) * speed
+#
+#   so independent processes agree on the current virtual time as long
+#   as they share the same start, epoch and speed. Waits are shortened
+#   by the same factor, letting days of traffic replay in minutes.
+#
+#   Code that needs the current time should call clock.now() or
+#   clock.time() (or ProcessClient.now()) rather than the time and
+#   datetime modules directly.
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#
+##########################################################################
+
+import datetime
+import time as _time
+
+
+class SystemClock:
+    """Wall clock time"""
+
+    speed = 1
+
+    def time(self):
+        """Current time in seconds since the epoch"""
+        return _time.time()
+
+    def now(self):
+        """Current time as datetime with UTC timezone"""
+        return datetime.datetime.now(datetime.UTC)
+
+    def sleep(self, secs):
+        """Sleep for a number of seconds"""
+        _time.sleep(secs)
+
+    def wait(self, event, secs):
+        """Wait on an event for up to a number of seconds"""
+        return event.wait(secs)
+
+
+class VirtualClock(SystemClock):
+    """Scaled simulation time"""
+
+    def __init__(self, start=None, speed=1000, epoch=None):
+        if isinstance(start, datetime.datetime):
+            if start.tzinfo is None:
+                start = start.replace(tzinfo=datetime.UTC)
+            start = start.timestamp()
+
+        if epoch is None:
+            epoch = _time.time()
+
+        if start is None:
+            start = epoch
+
+        if speed <= 0:
+            raise ValueError(f"Clock speed must be positive: {speed}")
+
+        self.start = float(start)
+        self.epoch = float(epoch)
+        self.speed = float(speed)
+
+    def __repr__(self):
+        start = datetime.datetime.fromtimestamp(self.start, datetime.UTC)
+        return f"<VirtualClock start={start} speed={self.speed}x>"
+
+    def time(self):
+        return self.start + (_time.time() - self.epoch) * self.speed
+
+    def now(self):
+        return datetime.datetime.fromtimestamp(self.time(), datetime.UTC)
+
+    def sleep(self, secs):
+        _time.sleep(secs / self.speed)
+
+    def wait(self, event, secs):
+        return event.wait(secs / self.speed)
+
+
+_clock = SystemClock()
+
+
+def get_clock():
+    """Return the installed clock"""
+    return _clock
+
+
+def set_clock(clock):
+    """Install a new clock, returning the previous one"""
+
+    global _clock  # pylint: disable=global-statement
+
+    previous = _clock
+    _clock = clock if clock is not None else SystemClock()
+
+    return previous
+
+
+def time():
+    """Current time in seconds from the installed clock"""
+    return _clock.time()
+
+
+def now():
+    """Current datetime (UTC) from the installed clock"""
+    return _clock.now()
+
+
+def sleep(secs):
+    """Sleep using the installed clock"""
+    _clock.sleep(secs)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Query the ArchiveGroups file catalog"""
+
+#####################################################################
+#
+#   Query the ArchiveGroups file catalog
+#
+#   List the archived files for a newsgroup and time range, show
+#   per-newsgroup totals, or rebuild the catalog from the checkpoint
+#   store. The history options must match the ArchiveGroups config
+#   (output.history, output.history.mode) to get the right file names.
+#   Other files under the archive directory can be listed as well, but
+#   are never expired.
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#
+#####################################################################
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+import dateutil.parser
+import dateutil.tz
+
+from datatransport.apps.archivecatalog import (
+    ArchiveCatalog,
+    checkpoint_files,
+    history_naming,
+)
+from datatransport.utilities import size_desc
+
+VERSION = "1.0"
+
+
+def parse_time(text):
+    """Parse a time argument (UTC if no timezone given)"""
+
+    value = dateutil.parser.parse(text)
+
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dateutil.tz.UTC)
+
+    return value
+
+
+def query(catalog, args):
+    """List files"""
+
+    start = parse_time(args.start) if args.start else None
+    stop = parse_time(args.stop) if args.stop else None
+
+    results = catalog.query(args.newsgroup, start, stop)
+
+    if args.md5:
+        for entry in results:
+            entry["md5"] = catalog.checksum(entry["path"])
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+        return
+
+    for entry in results:
+        print(
+            f"{entry['start_time'][:19]}  {entry['end_time'][:19]}  "
+            f"{size_desc(entry['size']):>10}  {entry['newsgroup'] or '-'}  "
+            f"{entry['path']}" + (f"  {entry['md5']}" if args.md5 else "")
+        )
+
+
+def stats(catalog, args):
+    """Totals per newsgroup"""
+
+    results = catalog.stats()
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+        return
+
+    for entry in results:
+        print(
+            f"{entry['newsgroup'] or '-':40} {entry['files']:8d} "
+            f"{size_desc(entry['bytes'] or 0):>10}  "
+            f"{entry['start_time'][:19]} - {entry['end_time'][:19]}"
+        )
+
+
+def rebuild(catalog, args):
+    """Rebuild the catalog from disk"""
+
+    known = {}
+
+    if args.checkpoint:
+        # pylint: disable=import-outside-toplevel
+        from datatransport.apps.archivegroups import Checkpoint
+        from datatransport.apps.archivestore import CheckpointStore
+
+        path = os.path.abspath(args.checkpoint)
+
+        if not os.path.exists(path):
+            sys.exit(f"Checkpoint store not found: {path}")
+
+        # The history file names are relative to the client directory
+
+        cwd = os.getcwd()
+        os.chdir(os.path.dirname(path))
+
+        try:
+            store = CheckpointStore(path, Checkpoint)
+            span_name, history_name = history_naming(args.history, args.history_mode)
+            known = checkpoint_files(
+                (checkpoint for _key, checkpoint in store.items()),
+                span_name,
+                history_name,
+            )
+            store.close()
+        finally:
+            os.chdir(cwd)
+
+    if not known and not args.root:
+        sys.exit("Need a checkpoint store and/or archive directory")
+
+    catalog.rebuild(known, args.root)
+
+
+def main():
+    """Script entry point"""
+
+    desc = "Query the ArchiveGroups file catalog"
+    parser = argparse.ArgumentParser(description=desc)
+
+    parser.add_argument("-V", "--version", action="version", version=VERSION)
+    parser.add_argument(
+        "-c",
+        "--catalog",
+        default="catalog.sqlite",
+        help="Catalog database (default: catalog.sqlite)",
+    )
+    parser.add_argument("-j", "--json", action="store_true", help="JSON output")
+
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser("query", help="List archived files")
+    cmd.add_argument("-g", "--newsgroup", help="Newsgroup (glob pattern)")
+    cmd.add_argument("-s", "--start", help="Start time")
+    cmd.add_argument("-e", "--stop", help="Stop time")
+    cmd.add_argument("--md5", action="store_true", help="Show MD5 checksums")
+    cmd.set_defaults(func=query)
+
+    cmd = commands.add_parser("stats", help="Totals per newsgroup")
+    cmd.set_defaults(func=stats)
+
+    cmd = commands.add_parser("rebuild", help="Rebuild from the checkpoint store")
+    cmd.add_argument("root", nargs="?", help="Archive directory (list other files)")
+    cmd.add_argument("-k", "--checkpoint", help="ArchiveGroups checkpoint store")
+    cmd.add_argument(
+        "-H", "--history", type=int, default=0, help="output.history (default: 0)"
+    )
+    cmd.add_argument(
+        "-m",
+        "--history-mode",
+        choices=["rename", "slots"],
+        default="rename",
+        help="output.history.mode (default: rename)",
+    )
+    cmd.set_defaults(func=rebuild)
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    catalog = ArchiveCatalog(args.catalog, logging.getLogger("catalog"))
+
+    try:
+        args.func(catalog, args)
+    finally:
+        catalog.close()
+
+    sys.exit(0)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""List and extract ArchiveGroups container files"""
+
+#####################################################################
+#
+#   List and extract ArchiveGroups container files
+#
+#   Containers (output.container: tar) are plain tar files with a
+#   sidecar index. This uses the index to list or pull out members
+#   by name and/or time without scanning the whole tar file.
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#
+#####################################################################
+
+import argparse
+import json
+import sys
+
+from datetime import datetime, UTC
+
+import dateutil.parser
+import dateutil.tz
+
+from datatransport.apps import container
+from datatransport.utilities import size_desc
+
+VERSION = "1.0"
+
+
+def parse_time(text):
+    """Parse a time argument (UTC if no timezone given)"""
+
+    value = dateutil.parser.parse(text)
+
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dateutil.tz.UTC)
+
+    return value
+
+
+def find(args):
+    """Index entries selected by the arguments"""
+
+    start = parse_time(args.start) if args.start else None
+    stop = parse_time(args.stop) if args.stop else None
+
+    return container.find_members(args.container, args.name, start, stop)
+
+
+def list_members(args):
+    """List members"""
+
+    entries = find(args)
+
+    if args.json:
+        print(json.dumps(entries, indent=4))
+        return
+
+    for entry in entries:
+        mtime = datetime.fromtimestamp(entry["mtime"], UTC)
+        print(
+            f"{mtime:%Y-%m-%d %H:%M:%S}  {size_desc(entry['size']):>10}  {entry['name']}"
+        )
+
+
+def extract(args):
+    """Extract members"""
+
+    start = parse_time(args.start) if args.start else None
+    stop = parse_time(args.stop) if args.stop else None
+
+    paths = container.extract(args.container, args.dest, args.name, start, stop)
+
+    for path in paths:
+        print(path)
+
+    if not paths:
+        sys.exit("No matching members")
+
+
+def rebuild(args):
+    """Rebuild the index"""
+
+    entries = container.rebuild_index(args.container)
+    print(f"Indexed {len(entries)} members")
+
+
+def add_selection(cmd):
+    """Member selection arguments"""
+
+    cmd.add_argument("-n", "--name", help="Member name")
+    cmd.add_argument("-s", "--start", help="Start time")
+    cmd.add_argument("-e", "--stop", help="Stop time")
+
+
+def main():
+    """Script entry point"""
+
+    desc = "List and extract ArchiveGroups container files"
+    parser = argparse.ArgumentParser(description=desc)
+
+    parser.add_argument("-V", "--version", action="version", version=VERSION)
+    parser.add_argument("-j", "--json", action="store_true", help="JSON output")
+
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser("list", help="List members")
+    cmd.add_argument("container", help="Container file")
+    add_selection(cmd)
+    cmd.set_defaults(func=list_members)
+
+    cmd = commands.add_parser("extract", help="Extract members")
+    cmd.add_argument("container", help="Container file")
+    cmd.add_argument("-d", "--dest", default=".", help="Output directory")
+    add_selection(cmd)
+    cmd.set_defaults(func=extract)
+
+    cmd = commands.add_parser("rebuild", help="Rebuild the sidecar index")
+    cmd.add_argument("container", help="Container file")
+    cmd.set_defaults(func=rebuild)
+
+    args = parser.parse_args()
+    args.func(args)
+
+    sys.exit(0)
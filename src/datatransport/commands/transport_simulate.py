@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Replay spooled messages through a simulated news server"""
+
+#####################################################################
+#
+#   Replay spooled messages through a simulated news server
+#
+#   Starts an in-memory NNTP server and posts the spooled messages
+#   when the virtual clock reaches their timestamps. Point the
+#   process group at the server and add the printed simulation.*
+#   settings to its config so the clients share the same clock.
+#   Throughput and latency are reported on exit.
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#
+#####################################################################
+
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+
+from datetime import datetime, UTC
+
+import dateutil.parser
+
+from datatransport import clock
+from datatransport import simulation
+
+VERSION = "1.0"
+
+
+def main():
+    """Script entry point"""
+
+    desc = "Replay spooled messages through a simulated news server"
+    parser = argparse.ArgumentParser(description=desc)
+
+    parser.add_argument("-V", "--version", action="version", version=VERSION)
+
+    parser.add_argument(
+        "-p", "--port", default=1119, type=int, help="Server port (default: 1119)"
+    )
+    parser.add_argument(
+        "-s",
+        "--speed",
+        default=1000,
+        type=float,
+        help="Virtual seconds per real second (default: 1000)",
+    )
+    parser.add_argument(
+        "-t", "--start", help="Virtual start time (default: first message)"
+    )
+    parser.add_argument(
+        "-l",
+        "--linger",
+        default=60,
+        type=float,
+        help="Real seconds to run after the last message (default: 60)",
+    )
+    parser.add_argument(
+        "-g",
+        "--newsgroup",
+        action="append",
+        default=[],
+        help="Create an empty newsgroup (repeatable)",
+    )
+    parser.add_argument("-j", "--json", action="store_true", help="JSON report")
+    parser.add_argument("paths", nargs="+", metavar="path", help="Spool files/dirs")
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    log = logging.getLogger("simulate")
+
+    # Load the spool first so the clock can start at the first message
+
+    replay = simulation.Replay(None, args.paths, log)
+
+    if args.start:
+        start = dateutil.parser.parse(args.start)
+    else:
+        start = replay.first_time()
+
+    virtual = clock.VirtualClock(start, args.speed)
+    clock.set_clock(virtual)
+
+    store = simulation.NewsStore()
+    replay.store = store
+
+    for newsgroup in args.newsgroup:
+        store.add_group(newsgroup)
+
+    # The start of the clock (at the epoch), not the time now
+
+    start_time = datetime.fromtimestamp(virtual.start, UTC)
+
+    server = simulation.NewsServer(store, port=args.port)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    print(f"Serving {len(replay.messages)} messages on port {args.port}")
+    print("Client settings:")
+    print("    simulation.enable:    true")
+    print(f"    simulation.start:     {start_time.isoformat()}")
+    print(f"    simulation.epoch:     {virtual.epoch:.3f}")
+    print(f"    simulation.speed:     {virtual.speed:g}")
+    print(f"    post.newsserver.port: {args.port}")
+    print(f"    poll.newsserver.port: {args.port}")
+    sys.stdout.flush()
+
+    replay.start()
+
+    try:
+        replay.join()
+        time.sleep(args.linger)
+    except KeyboardInterrupt:
+        replay.stop()
+
+    server.shutdown()
+
+    report = store.report()
+
+    if args.json:
+        print(json.dumps(report, indent=4))
+    else:
+        print(f"Replayed {report['posted']} messages in {report['elapsed']:.1f}s")
+        print(f"    virtual elapsed : {report['virtual_elapsed']:.0f}s")
+        print(f"    posted/hour     : {report['posted_per_hour']:.1f}")
+        print(f"    read/hour       : {report['read_per_hour']:.1f}")
+        print(f"    unread          : {report['unread']}")
+        for key, value in report.get("latency", {}).items():
+            print(f"    latency {key:8}: {value:.1f}s")
+
+    sys.exit(0)
@@ -55,6 +55,11 @@
 #   2023-08-29  Todd Valentic
 #               Missing f-string in list clients
 #
+#   2026-10-19  Todd Valentic
+#               Add profile and snapshot commands
+#               Add top command
+#               Add wakeups command
+#
 ############################################################################
 
 import json
@@ -68,6 +73,7 @@ import xmlrpc.client
 from pathlib import Path
 
 from datatransport import TransportConfig
+from datatransport.utilities import size_desc
 
 
 class TransportControl:
@@ -86,6 +92,10 @@ class TransportControl:
             "start": self.start,
             "stop": self.stop,
             "server": self.server_control,
+            "profile": self.profile,
+            "snapshot": self.snapshot,
+            "top": self.top,
+            "wakeups": self.wakeups,
         }
 
     def help(self):
@@ -97,6 +107,8 @@ class TransportControl:
         print("-" * 70)
         print("\thelp                     - Show this page")
         print("\tstatus                   - Transport server status")
+        print("\ttop [group]              - Client resource usage")
+        print("\twakeups [secs]           - Distribution of synced wakeups")
         print("\tloglevel                 - Set log level on group or server")
         print("\treload <group>           - Reload group's config file")
         print("\treload server            - Reload process groups")
@@ -111,6 +123,8 @@ class TransportControl:
         print("\tserver stop              - Stop the transport server")
         print("\tstart <group> <client>   - Start the client in group")
         print("\tstop <group> <client>    - Stop the client in group")
+        print("\tprofile <group> <client> - Profile client [secs] [cprofile|sample]")
+        print("\tsnapshot <group> <client> - Memory snapshot of a client")
         print("\tcleanup                  - Remove processes after crash")
         print("-" * 70)
         print()
@@ -192,6 +206,78 @@ class TransportControl:
 
         return 0
 
+    def top(self, arg):
+        """Show client resource usage, busiest first"""
+
+        try:
+            stats = self.server.clientstats()
+        except xmlrpc.client.Error as err:
+            print(f"Problem getting client stats: {err}")
+            return 1
+
+        if arg:
+            group = arg[0].rstrip("/") + "/"
+            stats = {k: v for k, v in stats.items() if k.startswith(group)}
+
+        if not stats:
+            print("No client resource samples available")
+            return 0
+
+        width = max(len(name) for name in stats)
+
+        print(
+            f"{'CLIENT':{width}} {'PID':>7} {'CPU%':>6} {'RSS':>10} "
+            f"{'READ/s':>10} {'WRITE/s':>10} {'FDS':>5}"
+        )
+
+        ranked = sorted(stats.items(), key=lambda s: s[1]["cpu"], reverse=True)
+
+        for name, info in ranked:
+            print(
+                f"{name:{width}} {info['pid']:>7} {info['cpu']:>6.1f} "
+                f"{size_desc(info['rss']):>10} "
+                f"{size_desc(info['read_rate']):>10} "
+                f"{size_desc(info['write_rate']):>10} "
+                f"{info['open_files']:>5}"
+            )
+
+        return 0
+
+    def wakeups(self, arg):
+        """Histogram of client wakeup offsets"""
+
+        try:
+            bucket = float(arg[0]) if arg else 1
+            if bucket <= 0:
+                raise ValueError
+        except ValueError:
+            print(f"Bad bucket size: {arg[0]}")
+            return 1
+
+        try:
+            offsets = self.server.wakeups()
+        except xmlrpc.client.Error as err:
+            print(f"Problem getting wakeup offsets: {err}")
+            return 1
+
+        if not offsets:
+            print("No clients are registered")
+            return 0
+
+        counts = {}
+
+        for offset in offsets.values():
+            index = int(offset // bucket)
+            counts[index] = counts.get(index, 0) + 1
+
+        print(f"Wakeup offsets for {len(offsets)} clients ({bucket}s buckets):")
+
+        for index in sorted(counts):
+            start = index * bucket
+            print(f"  {start:8.1f}s {counts[index]:5d} {'#' * counts[index]}")
+
+        return 0
+
     def reload(self, arg):
         """Reload a process group or server"""
 
@@ -413,6 +499,65 @@ class TransportControl:
         self.stop(arg)
         self.start(arg)
 
+    def profile(self, arg):
+        """Profile a running client"""
+
+        if len(arg) < 2:
+            print("You need to specify a group and client name")
+            return 1
+
+        group, client = arg[0:2]
+
+        try:
+            seconds = float(arg[2]) if len(arg) > 2 else 0
+        except ValueError:
+            print(f"Bad number of seconds: {arg[2]}")
+            return 1
+
+        mode = arg[3] if len(arg) > 3 else ""
+
+        self.has_client_or_exit(group, client)
+
+        try:
+            started = self.server.profileclient(group, client, seconds, mode)
+        except xmlrpc.client.Error as err:
+            print(f"Problem profiling client: {err}")
+            return 1
+
+        if not started:
+            print(f"Unable to profile {client}, is it running?")
+            return 1
+
+        print(f"Profiling {group} {client}, results in the working directory")
+
+        return 0
+
+    def snapshot(self, arg):
+        """Take a memory snapshot of a running client"""
+
+        if len(arg) != 2:
+            print("You need to specify a group and client name")
+            return 1
+
+        group, client = arg
+
+        self.has_client_or_exit(group, client)
+
+        try:
+            started = self.server.snapshotclient(group, client)
+        except xmlrpc.client.Error as err:
+            print(f"Problem taking snapshot: {err}")
+            return 1
+
+        if not started:
+            print(f"Unable to snapshot {client}, is it running?")
+            return 1
+
+        print(f"Memory snapshot requested for {group} {client}")
+        print("  The first request starts tracing, later requests write snapshots")
+
+        return 0
+
     def cleanup(self):
         """Stop any transport clients"""
 
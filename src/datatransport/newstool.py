@@ -360,6 +360,13 @@
 #   2026-03-07  Todd Vaelntic
 #               Use datetime.UTC
 #
+#   2026-10-19  Todd Valentic
+#               Add set_server_factory() so open_server() can return
+#                   a stand-in server (see simulation.py)
+#               Use the installed clock for time calls
+#               Add NewsPoster.post_data() to post a block of bytes as
+#                   an attachment without writing it to a file first
+#
 ###########################################################################
 
 import collections
@@ -369,7 +376,6 @@ import logging
 import mimetypes
 import nntplib
 import pathlib
-import time
 
 from email import encoders
 from email.mime.audio import MIMEAudio
@@ -381,6 +387,7 @@ from fnmatch import fnmatch
 
 from dateutil import parser
 from datatransport.utilities import datefunc, make_path
+from datatransport import clock
 import sapphire_config as sapphire
 
 ###### Exception Class ###################################################
@@ -401,6 +408,19 @@ class ProcessRetry(Exception):
 ##########################################################################
 
 
+# Called as factory(host, port, timeout) by open_server() when set
+
+_server_factory = None
+
+
+def set_server_factory(factory):
+    """Replace nntplib.NNTP connections (None restores the default)"""
+
+    global _server_factory  # pylint: disable=global-statement
+
+    _server_factory = factory
+
+
 def get_contents(message):
     """Return body and/or contents of each attachment in a list"""
 
@@ -476,7 +496,7 @@ def message_date(message):
                 timestamp = timestamp.replace(tzinfo=datetime.UTC)
             return timestamp
 
-    return datetime.datetime.now(datetime.UTC)
+    return clock.now()
 
 
 def as_config(message):
@@ -538,6 +558,9 @@ class NewsTool:
         if host:
             self.set_server(host, port)
 
+        if _server_factory:
+            return _server_factory(self.server_host, self.server_port, self.timeout)
+
         return nntplib.NNTP(self.server_host, 
                             port=self.server_port, 
                             readermode=True, 
@@ -742,6 +765,23 @@ class NewsPoster(NewsTool):
 
         return self.post_raw(msg)
 
+    # pylint: disable=too-many-arguments
+    def post_data(self, data, filename, comment=None, date=None, headers=None):
+        """Post a block of bytes as a file attachment named filename"""
+
+        msg = MIMEMultipart()
+        msg.preable = comment
+
+        part = MIMEBase("application", "octet-stream")
+        part.set_payload(data)
+        encoders.encode_base64(part)
+        part.add_header("Content-Disposition", "attachment", filename=filename)
+        msg.attach(part)
+
+        self.add_headers(msg, date=date, extra=headers)
+
+        return self.post_raw(msg)
+
     def post_files(self, *pos, **kw):
         """Post files to newsgroup (alias for post)"""
 
@@ -955,7 +995,7 @@ class NewsPoller(NewsTool):
                 self.mark_message_read(message)
                 return
             except ProcessRetry:
-                time.sleep(self.retry_wait)
+                clock.sleep(self.retry_wait)
 
             # FIX ME - should pass in/use wait
 
@@ -180,6 +180,13 @@
 #               No longer require argv to be passed into constructor,
 #                   take directly from sys.argv
 #
+#   2026-10-19  Todd Valentic
+#               Add on-demand profiling (SIGUSR1) and memory
+#                   snapshots (SIGUSR2)
+#               Add wait.spread and wait.jitter to stagger wakeups
+#               now() and wait() use the installed clock, which can be
+#                   a virtual clock (simulation.*) for replay testing
+#
 ###########################################################################
 
 import atexit
@@ -188,10 +195,10 @@ import fnmatch
 import glob
 import logging
 import os
+import random
 import signal
 import sys
 import threading
-import time
 import xmlrpc.client
 
 from functools import partial
@@ -203,6 +210,9 @@ import sapphire_config as sapphire
 from . import Root
 from . import TransportConfig
 from . import transportlogger
+from . import clock
+from .profiler import Profiler
+from .utilities import phase_offset
 
 # For the get methods forwarded to the config
 # pylint: disable=no-member
@@ -228,8 +238,10 @@ class ProcessClient(Root):
 
         self.setup_signals()
         self.setup_log()
+        self.setup_clock()
         self.setup_environment()
         self.setup_working_dir()
+        self.setup_profiler()
 
         self.server.loginclient(self.groupname, self.name, os.getpid())
 
@@ -276,6 +288,26 @@ class ProcessClient(Root):
                 if proc.poll() is None:
                     proc.send_signal(signum)
 
+    def setup_profiler(self):
+        """Install the on-demand profiling signal handlers"""
+
+        self.profiler = Profiler(self)
+        self.profiler.install()
+
+    def setup_clock(self):
+        """Install a virtual clock when running a simulation"""
+
+        if not self.config.get_boolean("simulation.enable", False):
+            return
+
+        start = self.config.get_datetime("simulation.start", None)
+        speed = self.config.get_float("simulation.speed", 1000)
+        epoch = self.config.get_float("simulation.epoch", None)
+
+        clock.set_clock(clock.VirtualClock(start, speed, epoch))
+
+        self.log.info("Simulation mode: %s", clock.get_clock())
+
     def setup_log(self):
         """Setup log handlers"""
 
@@ -308,6 +340,12 @@ class ProcessClient(Root):
 
         self.hostname = config.get("DEFAULT", "hostname")
 
+        # Stagger synced wakeups so clients sharing a period do not
+        # all hit the news server at the same instant.
+
+        self.wait_spread = self.config.get_timedelta("wait.spread", 0)
+        self.wait_jitter = self.config.get_timedelta("wait.jitter", 0)
+
         return config_files
 
     def setup_environment(self):
@@ -390,7 +428,13 @@ class ProcessClient(Root):
 
     def now(self):
         """Return current time as datetime with UTC timezone"""
-        return datetime.datetime.now(datetime.UTC)
+        return clock.now()
+
+    def wait_phase(self, secs):
+        """This client's phase (secs) within a synced period of secs"""
+
+        spread = min(self.wait_spread.total_seconds(), secs)
+        return phase_offset(f"{self.groupname}/{self.name}", spread)
 
     def wait(self, pollrate, offset=None, sync=False):
         """Wait for a given time, short circuit if we have stopped running"""
@@ -424,12 +468,15 @@ class ProcessClient(Root):
             offset_secs = float(offset)
 
         if sync:
-            curtime = time.time() - offset_secs
+            curtime = clock.time() - offset_secs - self.wait_phase(secs)
             waittime = max(0, secs - curtime % secs + 0.000)
         else:
             waittime = secs
 
-        self.exit_event.wait(waittime)
+        if self.wait_jitter:
+            waittime += random.uniform(0, self.wait_jitter.total_seconds())
+
+        clock.get_clock().wait(self.exit_event, waittime)
 
         return self.is_running()
 
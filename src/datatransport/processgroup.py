@@ -65,19 +65,29 @@
 #               Remove log handlers when object is deleted
 #               Close handlers when removed
 #
+#   2026-10-19  Todd Valentic
+#               Add profile_client() and snapshot_client()
+#               Pass per-client resource limits to the launcher,
+#                   clamped to the hard limits
+#               Add wakeup_offsets()
+#
 #############################################################################
 
 import configparser
 import copy
 import fnmatch
 import glob
+import json
 import logging
 import os
+import signal
 import sys
 import time
 
 from . import TransportConfig
 from . import transportlogger 
+from .resourcelimits import ResourceLimits
+from .utilities import phase_offset
 
 
 class ClientInfo:
@@ -106,6 +116,17 @@ class ClientInfo:
         except (PermissionError, ProcessLookupError) as err:
             self.group.log.info("PID %d: %s", self.pid, str(err))
 
+    def send_signal(self, signum):
+        """Send a signal to the process"""
+
+        try:
+            os.kill(self.pid, signum)
+        except (PermissionError, ProcessLookupError) as err:
+            self.group.log.info("PID %d: %s", self.pid, str(err))
+            return False
+
+        return True
+
     def kill(self):
         """Stop the process via KILL signal"""
 
@@ -370,10 +391,25 @@ class ProcessGroup:
             args = [cmd, self.name, clientname]
             args.extend(userargs.split())
 
+            try:
+                limits = self.get_limits(clientname)
+            except ValueError as err:
+                self.log.error("Bad resource limits for %s: %s", clientname, err)
+                continue
+
+            limits.clamp(self.log)
+
             if cmd:
                 self.log.info("Starting client %s", clientname)
                 self.log.debug("  %s", " ".join(args))
-                self.queue.put((cmd, args, self.environ))
+                if limits:
+                    self.log.debug("  %s", limits)
+                self.queue.put((cmd, args, self.environ, limits))
+
+    def get_limits(self, name):
+        """Resource limits for a client, defaults from the group"""
+
+        return ResourceLimits(self.config[name], self.config["ProcessGroup"], name)
 
     def stop_clients(self, names):
         """Stop the specificed clients"""
@@ -421,6 +457,52 @@ class ProcessGroup:
         self.check_client(name, "stop")
         return self.stop_clients([name])
 
+    def working_dir(self, name):
+        """Return a client's working directory"""
+
+        return os.path.join(self.config[name].get("group.work"), name)
+
+    def profile_client(self, name, seconds=None, mode=None):
+        """Open a profiling window in a running client"""
+
+        self.check_client(name, "profile")
+
+        client = self.clients[name]
+
+        if not client.alive():
+            self.log.error("Cannot profile %s, not running", name)
+            return False
+
+        request = {}
+        if seconds:
+            request["seconds"] = float(seconds)
+        if mode:
+            request["mode"] = mode
+
+        filename = os.path.join(self.working_dir(name), "profile.request")
+
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(request, f)
+
+        self.log.info("Profiling client %s (%s)", name, request)
+
+        return client.send_signal(signal.SIGUSR1)
+
+    def snapshot_client(self, name):
+        """Start memory tracing or take a snapshot in a running client"""
+
+        self.check_client(name, "snapshot")
+
+        client = self.clients[name]
+
+        if not client.alive():
+            self.log.error("Cannot snapshot %s, not running", name)
+            return False
+
+        self.log.info("Memory snapshot for client %s", name)
+
+        return client.send_signal(signal.SIGUSR2)
+
     def add_client(self, name):
         """Add a new client"""
 
@@ -450,6 +532,26 @@ class ProcessGroup:
         """Stop running clients"""
         return self.stop_clients(list(self.clients))
 
+    def wakeup_offsets(self):
+        """Synced wakeup offset (secs) of each client from wait.spread"""
+
+        results = {}
+
+        for name in self.clients:
+            config = self.config[name]
+            spread = config.get_timedelta("wait.spread", 0).total_seconds()
+
+            # Clamp to the period as ProcessClient.wait() does
+
+            pollrate = config.get_rate("pollrate", None)
+            if pollrate:
+                spread = min(spread, pollrate.period.total_seconds())
+
+            key = f"{self.name}/{name}"
+            results[name] = phase_offset(key, spread)
+
+        return results
+
     def list_clients(self):
         """List available clients"""
 
@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+"""Profiler"""
+
+##########################################################################
+#
+#   Profiler
+#
+#   On-demand profiling for running process clients. Nothing is
+#   enabled until a request arrives, so a client that is never
+#   profiled runs exactly as before.
+#
+#   SIGUSR1 starts a profiling window. The optional request file
+#   (profile.request in the client's working directory, written by
+#   "transportctl profile") sets the duration and mode:
+#
+#       cprofile    - deterministic profile of the main thread
+#       sample      - low overhead stack sampling of all threads
+#
+#   When the window closes (or SIGUSR1 is sent again) the results
+#   are written to the output path:
+#
+#       profile-<timestamp>.pstats  - raw cProfile data
+#       profile-<timestamp>.folded  - sampled stacks (flamegraph format)
+#       profile-<timestamp>.txt     - human readable summary
+#
+#   SIGUSR2 controls tracemalloc. The first signal starts tracing,
+#   each later one writes memory-<timestamp>.txt (top allocations
+#   and the difference from the previous snapshot) along with the
+#   raw snapshot in memory-<timestamp>.tracemalloc.
+#
+#   Config options:
+#
+#       profile.mode            - cprofile or sample (cprofile)
+#       profile.duration        - default window length (60s)
+#       profile.interval        - sampling interval (10ms)
+#       profile.path            - output directory (working dir)
+#       profile.limit           - lines in the text summaries (50)
+#       profile.memory.frames   - tracemalloc frames to keep (10)
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#
+##########################################################################
+
+import collections
+import cProfile
+import io
+import json
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+
+from pathlib import Path
+
+REQUEST_FILE = "profile.request"
+
+MODES = ("cprofile", "sample")
+
+
+class StackSampler(threading.Thread):
+    """Periodically sample the stacks of all other threads"""
+
+    def __init__(self, interval):
+        threading.Thread.__init__(self, name="StackSampler", daemon=True)
+
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.num_samples = 0
+        self.done = threading.Event()
+
+    def sample(self):
+        """Record the current stack of each thread"""
+
+        names = {t.ident: t.name for t in threading.enumerate()}
+
+        # pylint: disable=protected-access
+
+        for ident, frame in sys._current_frames().items():
+            if ident == self.ident:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                frame = frame.f_back
+
+            stack.append(names.get(ident, str(ident)))
+            stack.reverse()
+
+            self.stacks[";".join(stack)] += 1
+
+        self.num_samples += 1
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        """Stop sampling"""
+
+        self.done.set()
+        self.join()
+
+    def write(self, basename, limit):
+        """Write folded stacks and a summary of the hottest functions"""
+
+        with basename.with_suffix(".folded").open("w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        leaf = collections.Counter()
+        for stack, count in self.stacks.items():
+            leaf[stack.rsplit(";", 1)[-1]] += count
+
+        total = max(1, sum(leaf.values()))
+
+        lines = []
+        lines.append(f"Samples: {self.num_samples} (interval {self.interval}s)")
+        lines.append("")
+        lines.append("   pct  samples  function")
+
+        for name, count in leaf.most_common(limit):
+            lines.append(f"{count / total * 100:6.1f} {count:8d}  {name}")
+
+        basename.with_suffix(".txt").write_text("\n".join(lines) + "\n", "utf-8")
+
+
+class Profiler:
+    """Signal driven profiling and memory snapshots"""
+
+    def __init__(self, parent):
+        self.log = parent.log
+        self.config = parent.config
+
+        self.mode = self.config.get("profile.mode", "cprofile")
+        self.duration = self.config.get_timedelta("profile.duration", 60)
+        self.interval = self.config.get_timedelta("profile.interval", 0.01)
+        self.path = self.config.get_path("profile.path", ".")
+        self.limit = self.config.get_int("profile.limit", 50)
+        self.frames = self.config.get_int("profile.memory.frames", 10)
+
+        self.profile = None
+        self.sampler = None
+        self.timer = None
+        self.started = None
+        self.snapshot = None
+
+    def install(self):
+        """Install the signal handlers"""
+
+        signal.signal(signal.SIGUSR1, self.profile_handler)
+        signal.signal(signal.SIGUSR2, self.memory_handler)
+
+    def is_active(self):
+        """Indicate if a profile window is open"""
+
+        return self.profile is not None or self.sampler is not None
+
+    def output_name(self, prefix):
+        """Timestamped output basename"""
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        return self.path.joinpath(f"{prefix}-{timestamp}")
+
+    def read_request(self):
+        """Read and remove the optional request file"""
+
+        request = Path(REQUEST_FILE)
+
+        try:
+            values = json.loads(request.read_text("utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as err:
+            self.log.error("Problem reading profile request: %s", err)
+            values = {}
+
+        request.unlink(missing_ok=True)
+
+        return values
+
+    # -- Profiling ---------------------------------------------------------
+
+    def profile_handler(self, _signum, _frame):
+        """Toggle a profiling window"""
+
+        try:
+            if self.is_active():
+                self.stop()
+            else:
+                self.start(**self.read_request())
+        except Exception:  # pylint: disable=broad-exception-caught
+            self.log.exception("Problem handling profile request")
+
+    def start(self, seconds=None, mode=None):
+        """Open a profiling window"""
+
+        mode = mode or self.mode
+
+        if mode not in MODES:
+            self.log.error("Unknown profile mode: %s", mode)
+            return
+
+        if seconds is None:
+            seconds = self.duration.total_seconds()
+
+        self.log.info("Profiling (%s) for %ss", mode, seconds)
+
+        if mode == "cprofile":
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            self.sampler = StackSampler(self.interval.total_seconds())
+            self.sampler.start()
+
+        self.started = time.time()
+
+        # Signal handlers always run in the main thread, which is the
+        # thread cProfile needs to be disabled from.
+
+        args = (os.getpid(), signal.SIGUSR1)
+        self.timer = threading.Timer(float(seconds), os.kill, args)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def stop(self):
+        """Close the profiling window and write the results"""
+
+        self.timer.cancel()
+
+        elapsed = time.time() - self.started
+
+        if self.profile:
+            self.profile.disable()
+            basename = self.output_name("profile")
+            self.profile.dump_stats(basename.with_suffix(".pstats"))
+
+            output = io.StringIO()
+            stats = pstats.Stats(self.profile, stream=output)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.limit)
+            basename.with_suffix(".txt").write_text(output.getvalue(), "utf-8")
+
+            self.profile = None
+
+        else:
+            self.sampler.stop()
+            basename = self.output_name("profile")
+            self.sampler.write(basename, self.limit)
+            self.sampler = None
+
+        self.log.info("Profile finished after %.1fs: %s", elapsed, basename)
+
+    # -- Memory ------------------------------------------------------------
+
+    def memory_handler(self, _signum, _frame):
+        """Start tracemalloc or write a snapshot"""
+
+        try:
+            if tracemalloc.is_tracing():
+                self.write_snapshot()
+            else:
+                tracemalloc.start(self.frames)
+                self.log.info("Memory tracing started (%d frames)", self.frames)
+        except Exception:  # pylint: disable=broad-exception-caught
+            self.log.exception("Problem handling memory request")
+
+    def write_snapshot(self):
+        """Write top allocations and the change since the last snapshot"""
+
+        snapshot = tracemalloc.take_snapshot()
+        snapshot = snapshot.filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        )
+
+        basename = self.output_name("memory")
+        snapshot.dump(str(basename.with_suffix(".tracemalloc")))
+
+        current, peak = tracemalloc.get_traced_memory()
+
+        lines = []
+        lines.append(f"Traced memory: current={current} peak={peak}")
+        lines.append("")
+        lines.append("Top allocations:")
+
+        for stat in snapshot.statistics("lineno")[: self.limit]:
+            lines.append(f"  {stat}")
+
+        if self.snapshot:
+            lines.append("")
+            lines.append("Change since previous snapshot:")
+
+            for stat in snapshot.compare_to(self.snapshot, "lineno")[: self.limit]:
+                lines.append(f"  {stat}")
+
+        basename.with_suffix(".txt").write_text("\n".join(lines) + "\n", "utf-8")
+
+        self.snapshot = snapshot
+
+        self.log.info("Memory snapshot: %s", basename)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+"""Resource Limits"""
+
+##########################################################################
+#
+#   Resource Limits
+#
+#   Per-client scheduling and resource limits, applied in the child
+#   process after fork and before the client program is exec'd. This
+#   lets bulk data movers (archivers, compressors) run at a lower
+#   priority than the latency sensitive clients on the same host.
+#
+#   The options are read from the client's section, falling back to
+#   the [ProcessGroup] section so a whole group can be set at once:
+#
+#       limits.nice             - scheduling priority (-20..19)
+#       limits.ionice.class     - realtime, best-effort or idle
+#       limits.ionice.level     - priority within the class (0..7, 4)
+#       limits.cpus             - CPU affinity (ie "0 1" or "0-3,6")
+#       limits.memory           - address space limit (RLIMIT_AS)
+#       limits.files            - open file limit (RLIMIT_NOFILE)
+#       limits.cgroup           - cgroup v2 path (relative paths are
+#                                 under /sys/fs/cgroup). The string
+#                                 {client.name} is replaced with the
+#                                 client's name.
+#       limits.cgroup.cpu.max   - written to cpu.max (ie "50000 100000")
+#       limits.cgroup.memory.max- written to memory.max (ie 512M)
+#
+#   The memory and file limits can only be raised up to the server's
+#   own hard limits (raising a hard limit needs privileges). Larger
+#   values are clamped with a warning when the client is started.
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#
+##########################################################################
+
+import ctypes
+import os
+import platform
+import resource
+
+from pathlib import Path
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+IOPRIO_CLASSES = {"realtime": 1, "best-effort": 2, "idle": 3}
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_WHO_PROCESS = 1
+
+# There is no python wrapper for ioprio_set(), so call it directly
+
+SYS_IOPRIO_SET = {
+    "x86_64": 251,
+    "i386": 289,
+    "i686": 289,
+    "aarch64": 30,
+    "armv7l": 314,
+    "ppc64le": 273,
+    "riscv64": 30,
+}
+
+RLIMITS = {"memory": resource.RLIMIT_AS, "files": resource.RLIMIT_NOFILE}
+
+
+def parse_cpus(value):
+    """Parse a CPU list like "0 1" or "0-3,6" into a set"""
+
+    cpus = set()
+
+    for entry in value.replace(",", " ").split():
+        if "-" in entry:
+            first, last = entry.split("-")
+            cpus.update(range(int(first), int(last) + 1))
+        else:
+            cpus.add(int(entry))
+
+    return cpus
+
+
+class ResourceLimits:
+    """Resource limits for a launched client"""
+
+    def __init__(self, config, fallback, name):
+        def get(getter, key):
+            return getattr(config, getter)(key, getattr(fallback, getter)(key))
+
+        self.nice = get("get_int", "limits.nice")
+        self.ionice_class = get("get", "limits.ionice.class")
+        self.ionice_level = get("get_int", "limits.ionice.level")
+        self.cpus = get("get", "limits.cpus")
+        self.memory = get("get_bytes", "limits.memory")
+        self.files = get("get_int", "limits.files")
+        self.cgroup = get("get", "limits.cgroup")
+        self.cpu_max = get("get", "limits.cgroup.cpu.max")
+        self.memory_max = get("get", "limits.cgroup.memory.max")
+
+        if self.ionice_level is None:
+            self.ionice_level = 4
+
+        if self.ionice_class is not None:
+            if self.ionice_class not in IOPRIO_CLASSES:
+                raise ValueError(f"Unknown ionice class: {self.ionice_class}")
+
+        if self.cpus is not None:
+            self.cpus = parse_cpus(self.cpus)
+
+        if self.cgroup is not None:
+            self.cgroup = CGROUP_ROOT.joinpath(
+                self.cgroup.replace("{client.name}", name)
+            )
+
+        self.ioprio_set = None
+
+    def __bool__(self):
+        return any(
+            value is not None
+            for value in (
+                self.nice,
+                self.ionice_class,
+                self.cpus,
+                self.memory,
+                self.files,
+                self.cgroup,
+            )
+        )
+
+    def __repr__(self):
+        values = [f"{k}={v}" for k, v in self.__dict__.items() if v is not None]
+        return f"<ResourceLimits {' '.join(values)}>"
+
+    def prepare(self):
+        """Parent side setup, run before the fork"""
+
+        if self.ionice_class is not None:
+            machine = platform.machine()
+
+            if machine not in SYS_IOPRIO_SET:
+                raise OSError(f"ionice is not supported on {machine}")
+
+            libc = ctypes.CDLL(None, use_errno=True)
+            number = SYS_IOPRIO_SET[machine]
+            self.ioprio_set = lambda *args: libc.syscall(number, *args)
+
+        if self.cgroup is not None:
+            self.cgroup.mkdir(parents=True, exist_ok=True)
+
+            if self.cpu_max:
+                self.cgroup.joinpath("cpu.max").write_text(self.cpu_max)
+
+            if self.memory_max:
+                self.cgroup.joinpath("memory.max").write_text(self.memory_max)
+
+    def clamp(self, log):
+        """Limit the rlimits to the hard limits we can set"""
+
+        for attr, limit in RLIMITS.items():
+            value = getattr(self, attr)
+            _soft, hard = resource.getrlimit(limit)
+
+            if value is None or hard == resource.RLIM_INFINITY or value <= hard:
+                continue
+
+            log.warning(
+                "limits.%s %d is above the hard limit, using %d", attr, value, hard
+            )
+            setattr(self, attr, hard)
+
+    def set_rlimit(self, limit, value):
+        """Set the soft limit, never above the hard limit"""
+
+        _soft, hard = resource.getrlimit(limit)
+
+        if hard != resource.RLIM_INFINITY:
+            value = min(value, hard)
+
+        resource.setrlimit(limit, (value, hard))
+
+    def apply(self):
+        """Child side setup, run after the fork and before exec"""
+
+        if self.cgroup is not None:
+            self.cgroup.joinpath("cgroup.procs").write_text(str(os.getpid()))
+
+        if self.nice is not None:
+            os.setpriority(os.PRIO_PROCESS, 0, self.nice)
+
+        if self.ioprio_set is not None:
+            ioclass = IOPRIO_CLASSES[self.ionice_class]
+            ioprio = (ioclass << IOPRIO_CLASS_SHIFT) | self.ionice_level
+
+            if self.ioprio_set(IOPRIO_WHO_PROCESS, 0, ioprio) != 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, os.strerror(errno))
+
+        if self.cpus is not None:
+            os.sched_setaffinity(0, self.cpus)
+
+        if self.memory is not None:
+            self.set_rlimit(RLIMITS["memory"], self.memory)
+
+        if self.files is not None:
+            self.set_rlimit(RLIMITS["files"], self.files)
@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+"""Resource Sampler"""
+
+##########################################################################
+#
+#   Resource Sampler
+#
+#   Background thread used by the TransportServer to track the
+#   resource usage of each logged in client. At each sample the
+#   /proc/<pid>/stat, statm, io and fd entries are read and the
+#   results kept in a small ring buffer per client:
+#
+#       cpu             - percent of one CPU since the last sample
+#       rss             - resident memory (bytes)
+#       read_bytes      - total bytes read from storage
+#       write_bytes     - total bytes written to storage
+#       read_rate       - bytes/sec read since the last sample
+#       write_rate      - bytes/sec written since the last sample
+#       open_files      - number of open file descriptors
+#
+#   Byte counts are kept as floats so they survive the XML-RPC
+#   integer limits.
+#
+#   Config options ([TransportServer] section):
+#
+#       clientstats.enable      - run the sampler (True)
+#       clientstats.rate        - time between samples (10s)
+#       clientstats.history     - samples kept per client (60)
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#
+##########################################################################
+
+import collections
+import os
+import resource
+import threading
+import time
+
+from pathlib import Path
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = resource.getpagesize()
+
+
+def read_process(pid):
+    """Read the raw counters for a process from /proc"""
+
+    proc = Path("/proc", str(pid))
+
+    # The command name can contain spaces, so split after it
+
+    stat = proc.joinpath("stat").read_text("utf-8")
+    fields = stat[stat.rindex(")") + 2 :].split()
+    cpu_ticks = int(fields[11]) + int(fields[12])
+
+    statm = proc.joinpath("statm").read_text("utf-8").split()
+    rss = int(statm[1]) * PAGE_SIZE
+
+    counters = {}
+
+    try:
+        for line in proc.joinpath("io").read_text("utf-8").splitlines():
+            key, value = line.split(":")
+            counters[key] = int(value)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        open_files = len(os.listdir(proc.joinpath("fd")))
+    except OSError:
+        open_files = 0
+
+    return {
+        "cpu_ticks": cpu_ticks,
+        "rss": float(rss),
+        "read_bytes": float(counters.get("read_bytes", 0)),
+        "write_bytes": float(counters.get("write_bytes", 0)),
+        "open_files": open_files,
+    }
+
+
+class ProcessStats:
+    """Ring buffer of samples for one process"""
+
+    def __init__(self, pid, length):
+        self.pid = pid
+        self.samples = collections.deque(maxlen=length)
+        self.last = None
+
+    def update(self, timestamp):
+        """Take a new sample"""
+
+        counters = read_process(self.pid)
+
+        sample = {
+            "time": timestamp,
+            "cpu": 0.0,
+            "rss": counters["rss"],
+            "read_bytes": counters["read_bytes"],
+            "write_bytes": counters["write_bytes"],
+            "read_rate": 0.0,
+            "write_rate": 0.0,
+            "open_files": counters["open_files"],
+        }
+
+        if self.last:
+            prev_time, prev = self.last
+            elapsed = timestamp - prev_time
+
+            if elapsed > 0:
+                ticks = counters["cpu_ticks"] - prev["cpu_ticks"]
+                read = counters["read_bytes"] - prev["read_bytes"]
+                write = counters["write_bytes"] - prev["write_bytes"]
+
+                sample["cpu"] = ticks / CLOCK_TICKS / elapsed * 100
+                sample["read_rate"] = read / elapsed
+                sample["write_rate"] = write / elapsed
+
+        self.last = (timestamp, counters)
+        self.samples.append(sample)
+
+        return sample
+
+    def latest(self):
+        """Return the most recent sample"""
+
+        return self.samples[-1] if self.samples else None
+
+
+class ResourceSampler(threading.Thread):
+    """Periodically sample client resource usage"""
+
+    def __init__(self, server):
+        threading.Thread.__init__(self, name="ResourceSampler", daemon=True)
+
+        self.server = server
+        self.log = server.log
+
+        self.rate = server.config.get_timedelta("clientstats.rate", 10)
+        self.length = server.config.get_int("clientstats.history", 60)
+
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+
+    def find_pids(self):
+        """Map client names to the pids of logged in clients"""
+
+        pids = {"TransportServer": os.getpid()}
+
+        groups = self.server.groups or {}
+
+        for groupname, group in list(groups.items()):
+            for client in list(group.clients.values()):
+                if client.pid:
+                    pids[f"{groupname}/{client.name}"] = client.pid
+
+        return pids
+
+    def sample(self):
+        """Sample each process, dropping ones that have gone away"""
+
+        timestamp = time.time()
+        stats = {}
+
+        for name, pid in self.find_pids().items():
+            entry = self.stats.get(name)
+
+            if entry is None or entry.pid != pid:
+                entry = ProcessStats(pid, self.length)
+
+            try:
+                entry.update(timestamp)
+            except (OSError, ValueError, IndexError):
+                continue
+
+            stats[name] = entry
+
+        with self.lock:
+            self.stats = stats
+
+    def run(self):
+        self.log.info("Sampling client resources every %s", self.rate)
+
+        while not self.done.is_set():
+            try:
+                self.sample()
+            except Exception:  # pylint: disable=broad-exception-caught
+                self.log.exception("Problem sampling client resources")
+
+            self.done.wait(self.rate.total_seconds())
+
+    def stop(self):
+        """Stop sampling"""
+
+        self.done.set()
+
+    def latest(self, name):
+        """Most recent sample for a name or None"""
+
+        with self.lock:
+            entry = self.stats.get(name)
+
+        return entry.latest() if entry else None
+
+    def report(self, history=False):
+        """Return the latest (and optionally all) samples for each client"""
+
+        with self.lock:
+            stats = dict(self.stats)
+
+        results = {}
+
+        for name, entry in stats.items():
+            result = dict(entry.latest())
+            result["pid"] = entry.pid
+
+            if history:
+                result["history"] = list(entry.samples)
+
+            results[name] = result
+
+        return results
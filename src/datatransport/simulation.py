@@ -0,0 +1,575 @@
+#!/usr/bin/env python
+"""Simulation"""
+
+##########################################################################
+#
+#   Simulation
+#
+#   Support for replaying recorded traffic through the transport
+#   clients in accelerated, virtual time (see clock.py).
+#
+#       NewsStore       - in-memory newsgroups and articles. Each
+#                         article records when it was posted and when
+#                         it was first read to measure latency.
+#
+#       MemoryNNTP      - nntplib.NNTP stand-in backed by a store for
+#                         use inside a single process:
+#
+#                               simulation.install(store)
+#
+#       NewsServer      - minimal NNTP server backed by a store so
+#                         that clients in separate processes (ie a
+#                         whole process group) can be run against it.
+#
+#       Replay          - posts spooled messages into the store when
+#                         the virtual clock reaches their timestamp.
+#
+#   The clients are pointed at the simulated server and given the same
+#   clock with the simulation.* options:
+#
+#       simulation.enable   - use the virtual clock (False)
+#       simulation.start    - virtual time at the epoch
+#       simulation.epoch    - wall clock time (unix secs) of the start
+#       simulation.speed    - virtual seconds per real second (1000)
+#
+#   The transport-simulate command runs the server and replay and
+#   prints these settings.
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#
+##########################################################################
+
+import datetime
+import email
+import email.policy
+import email.utils
+import fnmatch
+import nntplib
+import socketserver
+import statistics
+import threading
+import time
+import uuid
+
+from pathlib import Path
+
+from datatransport import clock
+from datatransport import newstool
+
+# Headers reset when an article is injected into the store
+
+REPLACE_HEADERS = ["Path", "Xref", "NNTP-Posting-Date", "NNTP-Posting-Host"]
+
+
+class Article:
+    """Stored article"""
+
+    def __init__(self, message_id, content, posted):
+        self.message_id = message_id
+        self.content = content
+        self.posted = posted
+        self.first_read = None
+
+    @property
+    def lines(self):
+        """Article as a list of lines (bytes)"""
+        return self.content.split(b"\n")
+
+    def header(self, name):
+        """Value of a header, None if not present"""
+
+        headers = email.message_from_bytes(
+            self.content.split(b"\n\n", 1)[0], policy=email.policy.compat32
+        )
+
+        return headers.get(name)
+
+
+class NewsStore:
+    """In-memory news server contents"""
+
+    def __init__(self, create=True):
+        self.create = create
+        self.groups = {}
+        self.high = {}
+        self.articles = {}
+        self.lock = threading.Lock()
+
+        self.started = time.time()
+        self.vstarted = clock.time()
+        self.posted_bytes = 0
+
+    def add_group(self, name):
+        """Create an empty newsgroup"""
+
+        with self.lock:
+            self.groups.setdefault(name, {})
+
+    def post(self, content):
+        """Add an article, returning its message id"""
+
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+
+        message = email.message_from_bytes(content, policy=email.policy.compat32)
+
+        newsgroups = [g.strip() for g in message.get("Newsgroups", "").split(",")]
+        newsgroups = [g for g in newsgroups if g]
+
+        if not newsgroups:
+            raise ValueError("Article has no Newsgroups header")
+
+        message_id = message.get("Message-ID")
+
+        with self.lock:
+            if not message_id or message_id in self.articles:
+                message_id = f"<{uuid.uuid4().hex}@simulation>"
+                del message["Message-ID"]
+                message["Message-ID"] = message_id
+
+            for header in REPLACE_HEADERS:
+                del message[header]
+
+            posted = clock.time()
+            timestamp = datetime.datetime.fromtimestamp(posted, datetime.UTC)
+            message["NNTP-Posting-Date"] = email.utils.format_datetime(timestamp)
+
+            targets = []
+
+            for name in newsgroups:
+                if name not in self.groups:
+                    if not self.create:
+                        continue
+                    self.groups[name] = {}
+                targets.append(name)
+
+            if not targets:
+                raise KeyError(newsgroups[0])
+
+            data = message.as_bytes().replace(b"\r\n", b"\n")
+            article = Article(message_id, data, posted)
+
+            for name in targets:
+                number = self.high.get(name, 0) + 1
+                self.groups[name][number] = article
+                self.high[name] = number
+
+            self.articles[message_id] = article
+            self.posted_bytes += len(data)
+
+        return message_id
+
+    def group(self, name):
+        """Return (count, low, high) for a newsgroup"""
+
+        with self.lock:
+            group = self.groups[name]
+
+            if not group:
+                return 0, 1, 0
+
+            return len(group), next(iter(group)), self.high[name]
+
+    def article(self, name, key):
+        """Lookup an article by number in a group or by message id"""
+
+        with self.lock:
+            if str(key).startswith("<"):
+                number = 0
+                article = self.articles[key]
+            else:
+                number = int(key)
+                article = self.groups[name][number]
+
+            if article.first_read is None:
+                article.first_read = clock.time()
+
+        return number, article
+
+    def xhdr(self, name, header, first, last):
+        """Return (number, value) of a header for the articles in a range"""
+
+        with self.lock:
+            group = self.groups[name]
+            articles = [(num, group[num]) for num in sorted(group)]
+
+        results = []
+
+        for number, article in articles:
+            if first <= number <= last:
+                results.append((number, article.header(header) or "(none)"))
+
+        return results
+
+    def newnews(self, pattern, since):
+        """Message ids posted to matching groups since a time"""
+
+        since = since.timestamp()
+        results = []
+
+        with self.lock:
+            for name, group in self.groups.items():
+                if fnmatch.fnmatch(name, pattern):
+                    for number in sorted(group):
+                        article = group[number]
+                        if article.posted >= since:
+                            results.append(article.message_id)
+
+        return results
+
+    def list(self, pattern="*"):
+        """Return (name, high, low) for each matching newsgroup"""
+
+        results = []
+
+        with self.lock:
+            for name in sorted(self.groups):
+                if fnmatch.fnmatch(name, pattern):
+                    group = self.groups[name]
+                    low = next(iter(group), 1)
+                    high = self.high.get(name, 0)
+                    results.append((name, high, low))
+
+        return results
+
+    def report(self):
+        """Throughput and latency summary"""
+
+        with self.lock:
+            articles = list(self.articles.values())
+
+        elapsed = max(time.time() - self.started, 1e-6)
+        velapsed = max(clock.time() - self.vstarted, 1e-6)
+
+        latency = [a.first_read - a.posted for a in articles if a.first_read]
+
+        results = {
+            "speed": clock.get_clock().speed,
+            "elapsed": elapsed,
+            "virtual_elapsed": velapsed,
+            "posted": len(articles),
+            "posted_bytes": float(self.posted_bytes),
+            "read": len(latency),
+            "unread": len(articles) - len(latency),
+            "posted_per_hour": len(articles) / velapsed * 3600,
+            "read_per_hour": len(latency) / velapsed * 3600,
+            "posted_per_sec": len(articles) / elapsed,
+        }
+
+        if latency:
+            latency.sort()
+            results["latency"] = {
+                "mean": statistics.fmean(latency),
+                "p50": latency[len(latency) // 2],
+                "p95": latency[min(len(latency) - 1, int(len(latency) * 0.95))],
+                "max": latency[-1],
+            }
+
+        return results
+
+
+class MemoryNNTP:
+    """In-process stand-in for nntplib.NNTP"""
+
+    def __init__(self, store):
+        self.store = store
+        self.current = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.quit()
+
+    def quit(self):
+        """Close the connection"""
+        return "205 Bye"
+
+    def group(self, name):
+        """Select a newsgroup"""
+
+        try:
+            count, low, high = self.store.group(name)
+        except KeyError as err:
+            raise nntplib.NNTPTemporaryError("411 No such group") from err
+
+        self.current = name
+
+        return f"211 {count} {low} {high} {name}", count, low, high, name
+
+    def article(self, key):
+        """Retrieve an article"""
+
+        try:
+            number, article = self.store.article(self.current, key)
+        except (KeyError, ValueError) as err:
+            raise nntplib.NNTPTemporaryError("423 No such article") from err
+
+        info = nntplib.ArticleInfo(number, article.message_id, article.lines)
+
+        return f"220 {number} {article.message_id}", info
+
+    def post(self, data):
+        """Post an article"""
+
+        if hasattr(data, "read"):
+            data = data.read()
+        elif not isinstance(data, (bytes, str)):
+            data = b"\n".join(data)
+
+        try:
+            message_id = self.store.post(data)
+        except (KeyError, ValueError) as err:
+            raise nntplib.NNTPTemporaryError(f"441 Posting failed {err}") from err
+
+        return f"240 Article received {message_id}"
+
+    def xhdr(self, header, message_spec):
+        """Header values for a range of articles (first-last)"""
+
+        first, _, last = str(message_spec).partition("-")
+        first = int(first)
+        last = int(last) if last else first
+
+        try:
+            results = self.store.xhdr(self.current, header, first, last)
+        except KeyError as err:
+            raise nntplib.NNTPTemporaryError("412 No newsgroup selected") from err
+
+        return "221 Header follows", [(str(num), value) for num, value in results]
+
+    def date(self):
+        """Server (virtual) time"""
+
+        timestamp = clock.now()
+
+        return f"111 {timestamp:%Y%m%d%H%M%S}", timestamp
+
+    def newnews(self, group, since):
+        """Message ids posted since a time"""
+
+        return "230 List follows", self.store.newnews(group, since)
+
+    def list(self, group_pattern=None):
+        """List newsgroups"""
+
+        results = []
+
+        for name, high, low in self.store.list(group_pattern or "*"):
+            results.append(nntplib.GroupInfo(name, str(high), str(low), "y"))
+
+        return "215 List follows", results
+
+
+def install(store):
+    """Route newstool connections to an in-memory store"""
+
+    newstool.set_server_factory(lambda host, port, timeout: MemoryNNTP(store))
+
+
+def uninstall():
+    """Restore real news server connections"""
+
+    newstool.set_server_factory(None)
+
+
+class NNTPHandler(socketserver.StreamRequestHandler):
+    """Serve the NNTP commands used by the transport clients"""
+
+    def send(self, *lines):
+        """Send response lines"""
+
+        for line in lines:
+            if isinstance(line, str):
+                line = line.encode("utf-8")
+            self.wfile.write(line + b"\r\n")
+
+    def send_block(self, status, lines):
+        """Send a multi-line, dot-stuffed response"""
+
+        self.send(status)
+
+        for line in lines:
+            if line.startswith(b"."):
+                line = b"." + line
+            self.send(line)
+
+        self.send(".")
+
+    def read_block(self):
+        """Read a multi-line block terminated by a lone dot"""
+
+        lines = []
+
+        for line in self.rfile:
+            line = line.rstrip(b"\r\n")
+            if line == b".":
+                break
+            if line.startswith(b".."):
+                line = line[1:]
+            lines.append(line)
+
+        return b"\n".join(lines) + b"\n"
+
+    def handle(self):
+        store = self.server.store
+        current = None
+
+        self.send("200 datatransport simulation server ready")
+
+        for line in self.rfile:
+            words = line.decode("utf-8", "replace").split()
+
+            if not words:
+                continue
+
+            command = words[0].upper()
+            args = words[1:]
+
+            if command == "QUIT":
+                self.send("205 Bye")
+                break
+
+            if command == "CAPABILITIES":
+                self.send_block(
+                    "101 Capability list",
+                    [
+                        b"VERSION 2",
+                        b"READER",
+                        b"POST",
+                        b"NEWNEWS",
+                        b"HDR",
+                        b"LIST ACTIVE",
+                    ],
+                )
+            elif command == "MODE":
+                self.send("200 Posting allowed")
+            elif command == "DATE":
+                self.send(f"111 {clock.now():%Y%m%d%H%M%S}")
+            elif command == "GROUP" and args:
+                try:
+                    count, low, high = store.group(args[0])
+                    current = args[0]
+                    self.send(f"211 {count} {low} {high} {current}")
+                except KeyError:
+                    self.send("411 No such group")
+            elif command == "ARTICLE" and args:
+                try:
+                    number, article = store.article(current, args[0])
+                    status = f"220 {number} {article.message_id}"
+                    self.send_block(status, article.lines)
+                except (KeyError, ValueError):
+                    self.send("423 No such article")
+            elif command in ("XHDR", "HDR") and len(args) >= 2:
+                first, _, last = args[1].partition("-")
+                try:
+                    results = store.xhdr(
+                        current, args[0], int(first), int(last or first)
+                    )
+                    lines = [f"{num} {value}".encode() for num, value in results]
+                    self.send_block("221 Header follows", lines)
+                except (KeyError, ValueError):
+                    self.send("412 No newsgroup selected")
+            elif command == "POST":
+                self.send("340 Send article")
+                try:
+                    message_id = store.post(self.read_block())
+                    self.send(f"240 Article received {message_id}")
+                except (KeyError, ValueError) as err:
+                    self.send(f"441 Posting failed {err}")
+            elif command == "NEWNEWS" and len(args) >= 3:
+                fmt = "%Y%m%d%H%M%S" if len(args[1]) == 8 else "%y%m%d%H%M%S"
+                since = datetime.datetime.strptime(args[1] + args[2], fmt)
+                since = since.replace(tzinfo=datetime.UTC)
+                msgids = store.newnews(args[0], since)
+                self.send_block("230 List follows", [m.encode() for m in msgids])
+            elif command == "LIST":
+                if args and args[0].upper() not in ("ACTIVE",):
+                    self.send_block("215 List follows", [])
+                    continue
+                pattern = args[1] if len(args) > 1 else "*"
+                lines = [
+                    f"{name} {high} {low} y".encode()
+                    for name, high, low in store.list(pattern)
+                ]
+                self.send_block("215 List follows", lines)
+            else:
+                self.send("500 Unknown command")
+
+
+class NewsServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """NNTP server backed by a NewsStore"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, store, host="localhost", port=1119):
+        self.store = store
+        socketserver.TCPServer.__init__(self, (host, port), NNTPHandler)
+
+
+class Replay(threading.Thread):
+    """Post spooled messages at their original (virtual) times"""
+
+    def __init__(self, store, paths, log=None):
+        threading.Thread.__init__(self, name="Replay", daemon=True)
+
+        self.store = store
+        self.log = log
+        self.done = threading.Event()
+        self.messages = self.load(paths)
+
+    def load(self, paths):
+        """Read spooled messages, sorted by date"""
+
+        messages = []
+
+        for path in paths:
+            path = Path(path)
+            filenames = sorted(path.rglob("*")) if path.is_dir() else [path]
+
+            for filename in filenames:
+                if not filename.is_file():
+                    continue
+
+                content = filename.read_bytes()
+                message = email.message_from_bytes(content)
+
+                if "Newsgroups" not in message:
+                    continue
+
+                timestamp = newstool.message_date(message).timestamp()
+                messages.append((timestamp, str(filename), content))
+
+        messages.sort()
+
+        return messages
+
+    def first_time(self):
+        """Timestamp of the earliest message"""
+
+        if not self.messages:
+            return None
+
+        return datetime.datetime.fromtimestamp(self.messages[0][0], datetime.UTC)
+
+    def run(self):
+        current = clock.get_clock()
+
+        for timestamp, filename, content in self.messages:
+            delay = timestamp - current.time()
+
+            if delay > 0 and current.wait(self.done, delay):
+                break
+
+            try:
+                self.store.post(content)
+            except (KeyError, ValueError) as err:
+                if self.log:
+                    self.log.error("Failed to post %s: %s", filename, err)
+
+    def stop(self):
+        """Stop replaying"""
+
+        self.done.set()
@@ -13,6 +13,9 @@
 #               Pass stderr to log formatter in extra instead
 #                   of using separate calls to log.error()
 #
+#   2026-10-19  Todd Valentic
+#               Apply client resource limits before exec
+#
 ##########################################################################
 
 import os
@@ -49,11 +52,19 @@ class TransportManager:
 
         self.server.stop()
 
-    def launch(self, args, environ):
+    def launch(self, args, environ, limits=None):
         """Start running a client process"""
 
+        kwargs = {}
+
+        # Only use preexec_fn when needed, it is not thread safe
+
+        if limits:
+            limits.prepare()
+            kwargs["preexec_fn"] = limits.apply
+
         return subprocess.Popen(
-            args, env=environ, stderr=subprocess.PIPE, bufsize=1, text=True
+            args, env=environ, stderr=subprocess.PIPE, bufsize=1, text=True, **kwargs
         )
 
     def check(self, tasks):
@@ -86,14 +97,14 @@ class TransportManager:
             tasks = self.check(tasks)
 
             try:
-                _cmd, args, environ = self.queue.get(timeout=0.5)
+                _cmd, args, environ, limits = self.queue.get(timeout=0.5)
             except queue.Empty:
                 continue
 
             try:
-                tasks.append(self.launch(args, environ))
+                tasks.append(self.launch(args, environ, limits))
                 time.sleep(self.delay.total_seconds())
-            except (PermissionError, subprocess.SubprocessError) as err:
+            except (OSError, subprocess.SubprocessError) as err:
                 self.server.log.error("Problem starting %s: %s", args, err)
 
         self.server.shutdown()
@@ -53,6 +53,12 @@
 #               Improve start/stop messages
 #               Remove groups on shutdown
 #
+#   2026-10-19  Todd Valentic
+#               Add profileclient() and snapshotclient()
+#               Add background resource sampler, clientstats()
+#               status() uses the latest sample when available
+#               Add wakeups() report
+#
 ##########################################################################
 
 import os
@@ -66,6 +72,7 @@ from xmlrpc.server import SimpleXMLRPCServer
 from . import transportlogger 
 from . import ProcessGroup
 from . import TransportConfig
+from .resourcesampler import ResourceSampler
 
 # pylint: disable=too-many-public-methods
 
@@ -97,6 +104,11 @@ class TransportServer(Thread, ThreadingMixIn, SimpleXMLRPCServer):
         self.groups = {}
         self.pidlist = {}
 
+        if self.config.get_boolean("clientstats.enable", True):
+            self.sampler = ResourceSampler(self)
+        else:
+            self.sampler = None
+
         self.log.info(f"{' STARTING ':-^40}")
 
         self.loadgroups()
@@ -108,6 +120,8 @@ class TransportServer(Thread, ThreadingMixIn, SimpleXMLRPCServer):
 
         self.register_function(self.my_ident, "ident")
         self.register_function(self.status)
+        self.register_function(self.clientstats)
+        self.register_function(self.wakeups)
         self.register_function(self.stop)
 
         self.register_function(self.listgroups)
@@ -124,6 +138,8 @@ class TransportServer(Thread, ThreadingMixIn, SimpleXMLRPCServer):
         self.register_function(self.listclients)
         self.register_function(self.loginclient)
         self.register_function(self.logoutclient)
+        self.register_function(self.profileclient)
+        self.register_function(self.snapshotclient)
 
     def setup_environ(self):
         """Run process groups in a controlled, pristine environment"""
@@ -329,6 +345,18 @@ class TransportServer(Thread, ThreadingMixIn, SimpleXMLRPCServer):
 
         return True
 
+    def profileclient(self, group, client, seconds=0, mode=""):
+        """Profile a running client for a number of seconds"""
+
+        self.checkgroup(group, "profile client")
+        return self.groups[group].profile_client(client, seconds, mode)
+
+    def snapshotclient(self, group, client):
+        """Take a memory snapshot of a running client"""
+
+        self.checkgroup(group, "snapshot client")
+        return self.groups[group].snapshot_client(client)
+
     def listclients(self, group):
         """List all of the clients in a process group"""
 
@@ -347,8 +375,6 @@ class TransportServer(Thread, ThreadingMixIn, SimpleXMLRPCServer):
         """Indicate we are alive"""
 
         pid = os.getpid()
-        proc = pathlib.Path("/proc", str(pid), "fd")
-        numfiles = len(list(proc.iterdir()))
         numclients = sum(len(g.clients) for g in self.groups.values())
         numrunning = 0
 
@@ -357,9 +383,20 @@ class TransportServer(Thread, ThreadingMixIn, SimpleXMLRPCServer):
                 if client.pid:
                     numrunning += 1
 
-        statm = pathlib.Path("/proc", str(pid), "statm")
-        vmrss = int(statm.read_text("UTF-8").split()[1])
-        memusage = vmrss * resource.getpagesize()
+        sample = None
+
+        if self.sampler:
+            sample = self.sampler.latest("TransportServer")
+
+        if sample:
+            numfiles = sample["open_files"]
+            memusage = sample["rss"]
+        else:
+            proc = pathlib.Path("/proc", str(pid), "fd")
+            numfiles = len(list(proc.iterdir()))
+            statm = pathlib.Path("/proc", str(pid), "statm")
+            vmrss = int(statm.read_text("UTF-8").split()[1])
+            memusage = vmrss * resource.getpagesize()
 
         results = {}
         results["pid"] = os.getpid()
@@ -371,16 +408,40 @@ class TransportServer(Thread, ThreadingMixIn, SimpleXMLRPCServer):
 
         return results
 
+    def clientstats(self, history=False):
+        """Resource usage of each running client"""
+
+        if not self.sampler:
+            return {}
+
+        return self.sampler.report(history)
+
+    def wakeups(self):
+        """Synced wakeup offset (secs) of every client on this host"""
+
+        results = {}
+
+        for groupname, group in self.groups.items():
+            for name, offset in group.wakeup_offsets().items():
+                results[f"{groupname}/{name}"] = offset
+
+        return results
+
     def run(self):
         """Main loop"""
 
         self.log.info("Starting server thread")
 
+        if self.sampler:
+            self.sampler.start()
+
         try:
             self.serve_forever()
         except BaseException as err:  # pylint: disable=broad-except
             self.log.exception("Problem: (%s) %s", type(err), str(err))
         finally:
+            if self.sampler:
+                self.sampler.stop()
             self.server_close()
 
         self.log.info(f"{' SHUTDOWN ':=^40}")
@@ -3,4 +3,8 @@
 from .removefile import remove_file
 from .makepath import make_path
 from .sizedesc import size_desc
-from .patterntemplate import PatternTemplate
+from .patterntemplate import PatternTemplate, CompiledTemplate
+from .stagger import phase_offset
+from .copyinto import copy_into
+from .decompress import decompress_file, is_compressed
+from .globmatch import GlobMatcher, compile_globs
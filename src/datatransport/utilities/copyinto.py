@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""Copy a file's contents into an open file"""
+
+##########################################################################
+#
+#   copy_into
+#
+#   Copy the contents of a file into an already open destination file
+#   at its current position. The data is copied inside the kernel with
+#   copy_file_range() when possible, so it never passes through user
+#   space. Where that is not supported (older kernels, some network
+#   filesystems or files opened with O_APPEND) it falls back to a
+#   normal buffered copy.
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#
+##########################################################################
+
+import errno
+import os
+import shutil
+
+from pathlib import Path
+from typing import BinaryIO
+
+FALLBACK_ERRORS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EBADF,
+    errno.EOPNOTSUPP,
+}
+
+
+def copy_into(source: str | Path, dest: BinaryIO) -> int:
+    """
+    Append the contents of source to the open binary file dest.
+    Returns the number of bytes copied.
+    """
+
+    dest.flush()
+
+    with open(source, "rb") as src:
+        size = os.fstat(src.fileno()).st_size
+        copied = 0
+
+        try:
+            while copied < size:
+                count = os.copy_file_range(src.fileno(), dest.fileno(), size - copied)
+                if count == 0:
+                    break
+                copied += count
+            return copied
+        except (AttributeError, OSError) as err:
+            if copied or getattr(err, "errno", errno.ENOSYS) not in FALLBACK_ERRORS:
+                raise
+
+        shutil.copyfileobj(src, dest)
+        dest.flush()
+
+        return size
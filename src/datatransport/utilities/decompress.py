@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""Decompress a file in-process"""
+
+##########################################################################
+#
+#   decompress_file
+#
+#   Decompress a .gz, .bz2, .xz/.lzma or .zst file using the standard
+#   library modules instead of running gunzip/bunzip2. The data is
+#   streamed through in blocks, so memory use does not depend on the
+#   file size. Like gunzip -f, the output replaces any existing file
+#   with the suffix removed and the compressed file is deleted.
+#
+#   zstd support needs the zstandard package (or Python 3.14+).
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#
+##########################################################################
+
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import tempfile
+
+from collections.abc import Callable
+from pathlib import Path
+
+try:
+    from compression import zstd
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
+BLOCKSIZE = 1024 * 1024
+
+
+OPENERS: dict[str, Callable] = {
+    ".gz": gzip.open,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+    ".lzma": lzma.open,
+}
+
+if zstd is not None:
+    OPENERS[".zst"] = zstd.open
+
+
+def is_compressed(filename: str | Path) -> bool:
+    """True if the file has a suffix that can be decompressed"""
+
+    return Path(filename).suffix in OPENERS
+
+
+def decompress_file(filename: str | Path) -> Path:
+    """
+    Decompress filename next to itself and remove it. Returns the
+    name of the decompressed file.
+    """
+
+    filename = Path(filename)
+    opener = OPENERS.get(filename.suffix)
+
+    if opener is None:
+        raise ValueError(f"Unknown compression: {filename}")
+
+    outname = filename.with_suffix("")
+
+    fd, tmpname = tempfile.mkstemp(dir=filename.parent, prefix=".uncompress.")
+
+    try:
+        with opener(filename) as src, os.fdopen(fd, "wb") as dest:
+            shutil.copyfileobj(src, dest, BLOCKSIZE)
+        shutil.copymode(filename, tmpname)
+        os.replace(tmpname, outname)
+    except:
+        os.remove(tmpname)
+        raise
+
+    os.remove(filename)
+
+    return outname
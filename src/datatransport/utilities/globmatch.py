@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""Compiled glob pattern matching"""
+
+##########################################################################
+#
+#   GlobMatcher
+#
+#   Match names against lists of include and exclude shell patterns
+#   (fnmatch syntax). The patterns in each list are combined into a
+#   single regular expression when the matcher is created, so a name
+#   is checked with at most two regex searches instead of a loop over
+#   every pattern. Results are remembered since the same names (news
+#   groups, file names) are usually checked over and over.
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#
+##########################################################################
+
+import fnmatch
+import re
+
+from collections.abc import Iterable
+
+
+def compile_globs(patterns: Iterable[str]) -> re.Pattern | None:
+    """Combine shell patterns into one regex, None if there are none"""
+
+    patterns = [fnmatch.translate(pattern) for pattern in patterns]
+
+    if not patterns:
+        return None
+
+    return re.compile("|".join(patterns))
+
+
+class GlobMatcher:
+    """Include/exclude shell pattern matcher"""
+
+    def __init__(
+        self,
+        include: Iterable[str],
+        exclude: Iterable[str] = (),
+        cachesize: int = 10000,
+    ):
+        self.include = compile_globs(include)
+        self.exclude = compile_globs(exclude)
+        self.cachesize = cachesize
+        self.cache = {}
+
+    def match(self, name: str) -> bool:
+        """True if name matches an include and no exclude pattern"""
+
+        if self.include is None or not self.include.match(name):
+            return False
+
+        return self.exclude is None or not self.exclude.match(name)
+
+    def __call__(self, name: str) -> bool:
+        try:
+            return self.cache[name]
+        except KeyError:
+            pass
+
+        if len(self.cache) >= self.cachesize:
+            self.cache.clear()
+
+        result = self.cache[name] = self.match(name)
+
+        return result
@@ -31,6 +31,9 @@
 #   2023-07-26  Todd Valentic
 #               Missing check for pattern 
 #
+#   2026-10-19  Todd Valentic
+#               Add CompiledTemplate
+#
 #   SPDX-License-Identifier: GPL-3.0-or-later
 #   Copyright (C) 1999-2022 Todd Valentic
 #
@@ -38,9 +41,10 @@
 
 import re
 
-from typing import Union
+from collections.abc import Sequence
 
 re_pattern = re.compile(r'(?<=<).*?(?=>)')
+re_split = re.compile(r'<(.*?)>')
 re_slice = re.compile(r'^.*\[(-?[\d]*):(-?[\d]*)[:]?(-?[\d]*)\]$')
 re_index = re.compile(r'^.*\[(-?[\d]+)\]$')
 re_key = re.compile(r'^.*\[\"(.+)\"\]$')
@@ -84,17 +88,17 @@ def parse_patterns(string: str) -> list:
 class PatternTemplate:
     """String pattern replacement"""
 
-    def __init__(self, pattern: str, sep: str=None):
+    def __init__(self, pattern: str, sep: str | None=None):
         self.pattern = pattern
         self.sep = sep
         self.value = None
 
-    def set_value(self, value: Union[str, list, dict]) -> None:
+    def set_value(self, value: str | list | dict) -> None:
         """Cache the value of the replacement string"""
 
         self.value = value
 
-    def lookup_value(self, entry: str, value: Union[str, list, dict], sep: str='') -> str:
+    def lookup_value(self, entry: str, value: str | list | dict, sep: str='') -> str:
         """Look up the entry in the value str, list or dict"""
 
         if isinstance(value, (list, tuple)):
@@ -126,7 +130,7 @@ class PatternTemplate:
         return value
 
 
-    def __call__(self, src: str, value: str=None) -> str:
+    def __call__(self, src: str, value: str | None=None) -> str:
         """Replace <pattern> with value"""
 
         if value is not None:
@@ -147,3 +151,82 @@ class PatternTemplate:
             src = src.replace(f'<{entry}>', str(v))
 
         return src
+
+def parse_entry(entry: str) -> tuple:
+    """
+    Parse the index, slice or key in an entry once, in the same
+    order that lookup_value() tries them
+    """
+
+    for kind, parser in (('index', parse_index), ('slice', parse_slice),
+                         ('key', parse_key)):
+        try:
+            return kind, parser(entry)
+        except ValueError:
+            pass
+
+    return None, None
+
+class CompiledTemplate:
+    """
+    A string parsed once for a set of PatternTemplates. Calling it
+    gives the same result as applying each template in turn, but
+    the string and the index/slice/key selectors are only parsed
+    when the template is created.
+    """
+
+    def __init__(self, src: str, templates: Sequence[PatternTemplate]):
+        self.parts = []
+
+        for index, text in enumerate(re_split.split(src)):
+            if index % 2 == 0:
+                if text:
+                    self.parts.append(text)
+                continue
+
+            for template in templates:
+                if text.startswith(template.pattern):
+                    self.parts.append((template, text, *parse_entry(text)))
+                    break
+            else:
+                self.parts.append(f'<{text}>')
+
+    def __call__(self, values: dict | None=None) -> str:
+        """Render using values (pattern: value) or the cached values"""
+
+        values = values or {}
+        result = []
+
+        for part in self.parts:
+            if isinstance(part, str):
+                result.append(part)
+                continue
+
+            template, entry, kind, selector = part
+            value = values.get(template.pattern)
+
+            if value is None:
+                value = template.value
+
+            if value is None:
+                result.append(f'<{entry}>')
+                continue
+
+            sep = template.sep
+
+            if sep:
+                value = value.split(sep)
+
+            if isinstance(value, (list, tuple)):
+                if kind == 'index':
+                    value = value[selector]
+                elif kind == 'slice':
+                    value = sep.join(value[selector])
+                else:
+                    value = sep.join(value)
+            elif isinstance(value, dict):
+                value = value[selector] if kind == 'key' else entry
+
+            result.append(str(value))
+
+        return ''.join(result)
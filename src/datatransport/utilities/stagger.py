@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+"""Deterministic wakeup offsets to spread out synchronized clients"""
+
+##########################################################################
+#
+#   phase_offset
+#
+#   Clients that wake up on the same synchronized period (ie every
+#   minute on the minute) all hit the news server at the same instant.
+#   This returns a stable per-client offset within a spread so that
+#   the wakeups are distributed across the period.
+#
+#   2026-10-19  Todd Valentic
+#               Initial implementation
+#
+##########################################################################
+
+import zlib
+
+def phase_offset(key: str, spread: float) -> float:
+    """
+    Return a stable offset in [0, spread) seconds derived from key.
+    The same key always maps to the same offset, across processes
+    and restarts (unlike the builtin hash()).
+    """
+
+    if spread <= 0:
+        return 0.0
+
+    return zlib.crc32(key.encode("utf-8")) / 2**32 * spread
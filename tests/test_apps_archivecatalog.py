@@ -0,0 +1,159 @@
+import datetime
+import hashlib
+import os
+import types
+
+import pytest
+
+from datatransport.apps.archivecatalog import (
+    ArchiveCatalog,
+    checkpoint_files,
+    history_naming,
+)
+from datatransport.apps.archivegroups import ArchiveGroups, Checkpoint
+
+START = datetime.datetime(2026, 1, 1, tzinfo=datetime.UTC)
+HOUR = datetime.timedelta(hours=1)
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = ArchiveCatalog(tmp_path / 'catalog.sqlite')
+    yield catalog
+    catalog.close()
+
+def write(path, data=b'data'):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+def paths(entries):
+    return [os.path.basename(entry['path']) for entry in entries]
+
+def test_record(catalog, tmp_path):
+    path = write(tmp_path / 'a.dat')
+    catalog.record(path, 'group', START, 1, 4, True)
+    catalog.record(path, 'group', START + HOUR, 2, 8, False)
+
+    (entry,) = catalog.query()
+    assert entry['path'] == str(path)
+    assert entry['newsgroup'] == 'group'
+    assert entry['size'] == 8
+    assert entry['first_message'] == 1
+    assert entry['last_message'] == 2
+    assert entry['end_time'] == (START + HOUR).isoformat()
+    assert not entry['closed']
+
+def test_record_new_replaces(catalog, tmp_path):
+    path = write(tmp_path / 'a.dat')
+    catalog.record(path, 'group', START, 1, 4, True)
+    catalog.record(path, 'group', START + HOUR, 5, 4, True)
+    (entry,) = catalog.query()
+    assert entry['first_message'] == 5
+
+def test_expire(catalog, tmp_path):
+    old = write(tmp_path / 'old.dat')
+    recent = write(tmp_path / 'recent.dat')
+    still_open = write(tmp_path / 'open.dat')
+    catalog.record(old, 'group', START, 1, 4, True)
+    catalog.record(recent, 'group', START + 5 * HOUR, 2, 4, True)
+    catalog.record(still_open, 'group', START, 3, 4, True)
+    catalog.finish([old, recent])
+
+    assert catalog.expire(START + HOUR) == [str(old)]
+    assert paths(catalog.query()) == ['open.dat', 'recent.dat']
+    assert catalog.expire(START + HOUR) == []
+
+def test_checksum(catalog, tmp_path):
+    path = write(tmp_path / 'a.dat', b'contents')
+    catalog.record(path, 'group', START, 1, 8, True)
+    assert catalog.checksum(path) is None
+
+    catalog.finish([path])
+    assert catalog.query()[0]['md5'] is None
+    assert catalog.checksum(path) == hashlib.md5(b'contents').hexdigest()
+    assert catalog.query()[0]['md5'] == hashlib.md5(b'contents').hexdigest()
+
+    # Written again, the checksum is computed again when closed
+
+    catalog.record(path, 'group', START + HOUR, 2, 8, False)
+    assert catalog.query()[0]['md5'] is None
+    assert catalog.checksum(path) is None
+
+def test_rename_remove(catalog, tmp_path):
+    path = write(tmp_path / 'a.dat')
+    catalog.record(path, 'group', START, 1, 4, True)
+    catalog.rename(path, tmp_path / 'b.dat')
+    assert paths(catalog.query()) == ['b.dat']
+    catalog.remove(tmp_path / 'b.dat')
+    assert catalog.query() == []
+
+def test_query(catalog, tmp_path):
+    for hour, group in enumerate(['a.one', 'a.two', 'b.one']):
+        path = write(tmp_path / f'{group}.dat')
+        catalog.record(path, group, START + hour * HOUR, hour, 4, True)
+
+    assert paths(catalog.query('a.*')) == ['a.one.dat', 'a.two.dat']
+    assert paths(catalog.query(start=START + HOUR)) == ['a.two.dat', 'b.one.dat']
+    assert paths(catalog.query(stop=START)) == ['a.one.dat']
+    assert [entry['files'] for entry in catalog.stats()] == [1, 1, 1]
+
+def make_checkpoint(tmp_path, spans, max_history=5):
+    checkpoint = Checkpoint('group', 1, max_history, False)
+    for span in range(spans):
+        checkpoint.update_message(span + 1, START + span * HOUR)
+        checkpoint.update_file(str(tmp_path / f'{span}-<history>.dat'), 4)
+        checkpoint.reset(START + (span + 1) * HOUR, span + 1)
+    checkpoint.update_file(str(tmp_path / 'current-<history>.dat'), 4)
+    return checkpoint
+
+def test_checkpoint_files(tmp_path):
+    checkpoint = make_checkpoint(tmp_path, 2)
+    known = checkpoint_files([checkpoint])
+    assert known[str(tmp_path / 'current-0.dat')][3] is False
+    assert known[str(tmp_path / '1-0.dat')] == ('group', START + HOUR, START + HOUR, True)
+    assert known[str(tmp_path / '0-1.dat')][3] is True
+
+def test_checkpoint_files_slots(tmp_path):
+    checkpoint = make_checkpoint(tmp_path, 2, max_history=2)
+    known = checkpoint_files([checkpoint], *history_naming(2, 'slots'))
+    assert sorted(os.path.basename(path) for path in known) == [
+        '0-0.dat', '1-1.dat', 'current-2.dat'
+    ]
+
+def test_rebuild(catalog, tmp_path):
+    archive = tmp_path / 'archive'
+    checkpoint = make_checkpoint(archive, 2)
+    known = checkpoint_files([checkpoint])
+
+    for path in known:
+        write(archive / os.path.basename(path))
+
+    write(archive / 'other.dat')
+    write(archive / '.staging' / 'tmp.dat')
+    os.remove(archive / '0-1.dat')
+
+    assert catalog.rebuild(known, archive) == 3
+    entries = {os.path.basename(entry['path']): entry for entry in catalog.query()}
+    assert sorted(entries) == ['1-0.dat', 'current-0.dat', 'other.dat']
+    assert entries['other.dat']['newsgroup'] is None
+
+    # Files that ArchiveGroups did not write are never expired
+
+    assert catalog.expire(START + 10 * HOUR) == [str(archive / '1-0.dat')]
+    assert paths(catalog.query()) == ['other.dat', 'current-0.dat']
+
+def test_prune_history(tmp_path):
+    checkpoint = make_checkpoint(tmp_path, 3)
+    _span_name, history_name = history_naming()
+    archiver = types.SimpleNamespace(history_name=history_name, history_mode='rename')
+
+    # Emptied entries are only dropped from the end, so the others
+    # keep their positions
+
+    expired = {str(tmp_path / '2-0.dat'), str(tmp_path / '0-2.dat')}
+    assert ArchiveGroups.prune_history(archiver, checkpoint, expired)
+    assert [list(files) for files, _time in checkpoint.history] == [
+        [], [str(tmp_path / '1-<history>.dat')]
+    ]
+    assert not ArchiveGroups.prune_history(archiver, checkpoint, expired)
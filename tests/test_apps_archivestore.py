@@ -0,0 +1,162 @@
+import datetime
+import shelve
+
+import pytest
+
+from datatransport.apps.archivegroups import Checkpoint
+from datatransport.apps.archivestore import CheckpointStore
+
+START = datetime.datetime(2026, 1, 1, tzinfo=datetime.UTC)
+
+
+def make_store(tmp_path, **kwargs):
+    return CheckpointStore(tmp_path / 'checkpoint.sqlite', Checkpoint, **kwargs)
+
+def reopen(store, tmp_path):
+    store.close()
+    return make_store(tmp_path)
+
+def make_checkpoint(spans=0, max_history=3):
+    checkpoint = Checkpoint('test', 1, max_history, True)
+    for span in range(spans):
+        add_span(checkpoint, span)
+    return checkpoint
+
+def add_span(checkpoint, span):
+    checkpoint.update_message(span + 1, START + datetime.timedelta(hours=span))
+    checkpoint.update_file(f'file{span}.dat', 100)
+    checkpoint.reset(START + datetime.timedelta(hours=span + 1), span + 1)
+
+def assert_same(loaded, checkpoint):
+    for key in ('last_message', 'num_messages', 'num_bytes', 'generation'):
+        assert getattr(loaded, key) == getattr(checkpoint, key)
+    for key in ('start_time', 'last_time', 'poll_time', 'summary_start'):
+        assert getattr(loaded, key) == getattr(checkpoint, key)
+    assert loaded.filenames == checkpoint.filenames
+    assert loaded.history == checkpoint.history
+    assert loaded.summary_files == checkpoint.summary_files
+
+@pytest.fixture
+def store(tmp_path):
+    store = make_store(tmp_path)
+    yield store
+    store.close()
+
+def test_empty(store):
+    assert len(store) == 0
+    assert 'test' not in store
+
+def test_save_load(tmp_path):
+    store = make_store(tmp_path)
+    checkpoint = make_checkpoint(spans=5)
+    checkpoint.update_message(10)
+    checkpoint.update_file('current.dat', 42)
+    store['test'] = checkpoint
+
+    store = reopen(store, tmp_path)
+    assert store.keys() == ['test']
+    assert_same(store['test'], checkpoint)
+    assert len(store['test'].history) == 4
+    assert store['test'].history[0][0] == {'file4.dat': (1, 100)}
+    store.close()
+
+def test_unchanged(store):
+    checkpoint = make_checkpoint(spans=2)
+    store['test'] = checkpoint
+    changes = store.conn.total_changes
+    store['test'] = checkpoint
+    assert store.conn.total_changes == changes
+
+def test_delta(store):
+    checkpoint = make_checkpoint(spans=2)
+    store['test'] = checkpoint
+    changes = store.conn.total_changes
+    checkpoint.update_message(10)
+    checkpoint.update_file('current.dat', 42)
+    store['test'] = checkpoint
+    assert store.conn.total_changes == changes + 2
+
+def test_roll(tmp_path):
+    store = make_store(tmp_path)
+    checkpoint = make_checkpoint(spans=4)
+    store['test'] = checkpoint
+    add_span(checkpoint, 4)
+    add_span(checkpoint, 5)
+    store['test'] = checkpoint
+
+    store = reopen(store, tmp_path)
+    assert_same(store['test'], checkpoint)
+    assert [next(iter(files)) for files, _time in store['test'].history] == [
+        'file5.dat', 'file4.dat', 'file3.dat', 'file2.dat'
+    ]
+    store.close()
+
+def test_changed_in_place(tmp_path):
+    store = make_store(tmp_path)
+    checkpoint = make_checkpoint(spans=3)
+    store['test'] = checkpoint
+    checkpoint.history[1][0]['extra.dat'] = (1, 10)
+    del checkpoint.history[2][0]['file0.dat']
+    store['test'] = checkpoint
+
+    store = reopen(store, tmp_path)
+    assert_same(store['test'], checkpoint)
+    store.close()
+
+def test_rebuilt_equal(store):
+    checkpoint = make_checkpoint(spans=3)
+    store['test'] = checkpoint
+    changes = store.conn.total_changes
+    checkpoint.history = [(dict(files), date) for files, date in checkpoint.history]
+    checkpoint.summary_files = [dict(files) for files in checkpoint.summary_files]
+    store['test'] = checkpoint
+    assert store.conn.total_changes == changes
+
+def test_summary_reset(tmp_path):
+    store = make_store(tmp_path)
+    checkpoint = make_checkpoint(spans=3)
+    store['test'] = checkpoint
+    checkpoint.reset_summary()
+    add_span(checkpoint, 3)
+    store['test'] = checkpoint
+
+    store = reopen(store, tmp_path)
+    assert store['test'].summary_files == [{'file3.dat': (1, 100)}]
+    store.close()
+
+def test_batch(tmp_path):
+    store = make_store(tmp_path, batch=2)
+    store['test'] = make_checkpoint(spans=1)
+    assert store.conn.in_transaction
+    store['test'] = make_checkpoint(spans=2)
+    assert not store.conn.in_transaction
+    store.close()
+
+def test_migrate(tmp_path):
+    legacy = tmp_path / 'checkpoint.db'
+    checkpoint = make_checkpoint(spans=5)
+    other = Checkpoint('other', 10, 0, False)
+
+    with shelve.open(str(legacy)) as database:
+        database['test'] = checkpoint
+        database['other'] = other
+
+    store = make_store(tmp_path, legacy=legacy)
+    assert sorted(store.keys()) == ['other', 'test']
+    assert_same(store['test'], checkpoint)
+    assert store['other'].last_message == 9
+    store.close()
+
+    # Only imported when the store is created
+
+    with shelve.open(str(legacy)) as database:
+        database['new'] = Checkpoint('new', 1, 0, False)
+
+    store = make_store(tmp_path, legacy=legacy)
+    assert 'new' not in store
+    store.close()
+
+def test_migrate_missing(tmp_path):
+    store = make_store(tmp_path, legacy=tmp_path / 'checkpoint.db')
+    assert len(store) == 0
+    store.close()
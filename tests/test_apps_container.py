@@ -0,0 +1,99 @@
+import datetime
+import tarfile
+
+import pytest
+
+from datatransport.apps import container
+
+START = datetime.datetime(2026, 1, 1, tzinfo=datetime.UTC)
+HOUR = datetime.timedelta(hours=1)
+
+
+def make_file(tmp_path, name, data):
+    path = tmp_path / 'input' / name
+    path.parent.mkdir(exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+@pytest.fixture
+def packed(tmp_path):
+    dest = tmp_path / 'packed.tar'
+    for hour, name in enumerate(['a.dat', 'b.dat', 'c.dat']):
+        source = make_file(tmp_path, name, name.encode() * (hour + 1))
+        container.append_file(dest, source, name, START + hour * HOUR)
+    return dest
+
+def test_append(packed):
+    with tarfile.open(packed) as tar:
+        members = tar.getmembers()
+        assert [member.name for member in members] == ['a.dat', 'b.dat', 'c.dat']
+        assert tar.extractfile('b.dat').read() == b'b.datb.dat'
+        assert members[1].mtime == (START + HOUR).timestamp()
+
+def test_header_size(tmp_path):
+    dest = tmp_path / 'packed.tar'
+    source = make_file(tmp_path, 'a.dat', b'x' * 10)
+    source_time = datetime.datetime.fromtimestamp(1_000_000_000.5, datetime.UTC)
+
+    # One header block, one data block and the two end blocks
+
+    assert container.append_file(dest, source, 'a.dat', source_time) == 4 * 512
+    assert container.append_file(dest, source, 'b.dat', source_time) == 2 * 512
+    assert dest.stat().st_size == 6 * 512
+
+def test_long_name(tmp_path):
+    dest = tmp_path / 'packed.tar'
+    name = 'x' * 150 + '.dat'
+    source = make_file(tmp_path, 'a.dat', b'data')
+    container.append_file(dest, source, name, START)
+    with tarfile.open(dest) as tar:
+        assert tar.getnames() == [name]
+
+def test_not_a_container(tmp_path):
+    dest = tmp_path / 'packed.tar'
+    source = make_file(tmp_path, 'a.dat', b'data')
+
+    for data in (b'text', b'\0' * 1000, b'x' * 512 + b'\0' * 1024):
+        dest.write_bytes(data)
+        with pytest.raises(tarfile.ReadError):
+            container.append_file(dest, source, 'a.dat', START)
+        assert dest.read_bytes() == data
+
+def test_index(packed):
+    entries = container.read_index(packed)
+    assert [entry['name'] for entry in entries] == ['a.dat', 'b.dat', 'c.dat']
+    assert container.read_member(packed, entries[2]) == b'c.dat' * 3
+
+def test_rebuild_index(packed):
+    entries = container.read_index(packed)
+    container.index_name(packed).unlink()
+    assert container.read_index(packed) == entries
+
+def test_find_members(packed):
+    def names(**kwargs):
+        return [entry['name'] for entry in container.find_members(packed, **kwargs)]
+
+    assert names(name='b.dat') == ['b.dat']
+    assert names(start=START + HOUR) == ['b.dat', 'c.dat']
+    assert names(stop=START + HOUR) == ['a.dat', 'b.dat']
+
+def test_find_members_last(packed, tmp_path):
+    source = make_file(tmp_path, 'new.dat', b'new')
+    container.append_file(packed, source, 'a.dat', START + 5 * HOUR)
+    (entry,) = container.find_members(packed, name='a.dat')
+    assert container.read_member(packed, entry) == b'new'
+
+def test_extract(packed, tmp_path):
+    dest = tmp_path / 'output'
+    dest.mkdir()
+    paths = container.extract(packed, dest, start=START + HOUR)
+    assert [path.name for path in paths] == ['b.dat', 'c.dat']
+    assert paths[1].read_bytes() == b'c.dat' * 3
+    assert paths[1].stat().st_mtime == (START + 2 * HOUR).timestamp()
+
+def test_remove(packed):
+    container.read_index(packed)
+    container.remove_container(packed)
+    assert not packed.exists()
+    assert not container.index_name(packed).exists()
+    container.remove_container(packed)
@@ -0,0 +1,63 @@
+from datatransport.apps.filebatch import FileBatcher
+
+
+def make_files(tmp_path, sizes):
+    paths = []
+    for index, size in enumerate(sizes):
+        path = tmp_path / f'{index:02d}.dat'
+        path.write_bytes(b'x' * size)
+        paths.append(path)
+    return paths
+
+def test_enabled():
+    assert not FileBatcher().enabled
+    assert FileBatcher(max_files=2).enabled
+    assert FileBatcher(max_bytes=100).enabled
+    assert FileBatcher(linger=10).enabled
+
+def test_split_files(tmp_path):
+    paths = make_files(tmp_path, [10] * 5)
+    batches = FileBatcher(max_files=2).split(paths)
+    assert batches == [(paths[0:2], 20), (paths[2:4], 20), (paths[4:], 10)]
+
+def test_split_bytes(tmp_path):
+    paths = make_files(tmp_path, [40, 40, 40, 200, 10])
+    batches = FileBatcher(max_bytes=100).split(paths)
+    assert [batch for batch, _size in batches] == [
+        paths[0:2], paths[2:3], paths[3:4], paths[4:]
+    ]
+
+def test_split_missing(tmp_path):
+    paths = make_files(tmp_path, [10, 10])
+    paths[0].unlink()
+    assert FileBatcher(max_files=5).split(paths) == [([paths[1]], 10)]
+
+def test_is_full():
+    batcher = FileBatcher(max_files=2, max_bytes=100)
+    assert batcher.is_full(['a', 'b'], 10)
+    assert batcher.is_full(['a'], 100)
+    assert not batcher.is_full(['a'], 99)
+
+def test_ready_full(tmp_path):
+    paths = make_files(tmp_path, [10] * 5)
+    batcher = FileBatcher(max_files=2, linger=60)
+    assert batcher.ready(paths, 1000) == [paths[0:2], paths[2:4]]
+
+def test_ready_linger(tmp_path):
+    paths = make_files(tmp_path, [10] * 3)
+    batcher = FileBatcher(max_files=5, linger=60)
+    assert batcher.ready(paths[:2], 1000) == []
+    assert batcher.ready(paths, 1030) == []
+    assert batcher.ready(paths, 1060) == [paths]
+
+def test_ready_no_linger(tmp_path):
+    paths = make_files(tmp_path, [10] * 3)
+    batcher = FileBatcher(max_files=5)
+    assert batcher.ready(paths, 1000) == [paths]
+
+def test_ready_forgets_posted(tmp_path):
+    paths = make_files(tmp_path, [10] * 2)
+    batcher = FileBatcher(max_files=5, linger=60)
+    batcher.ready(paths[:1], 1000)
+    batcher.ready(paths[1:], 1050)
+    assert batcher.first_seen == {paths[1]: 1050}
@@ -0,0 +1,137 @@
+import datetime
+import itertools
+import logging
+import threading
+import types
+
+import pytest
+import sapphire_config
+
+from datatransport import clock
+from datatransport.apps.filepost import FilePost, Watcher
+
+
+class FakeWatcher:
+    def __init__(self, name, period=60, fail=False):
+        self.name = name
+        self.period = period
+        self.fail = fail
+        self.log = logging.getLogger(name)
+        self.due = None
+        self.active = False
+        self.pending = False
+        self.processed = 0
+
+    def next_time(self, now):
+        return now + self.period
+
+    def process(self):
+        self.processed += 1
+        if self.fail:
+            raise ValueError('failed')
+
+
+@pytest.fixture
+def now(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(clock, 'time', lambda: now[0])
+    return now
+
+@pytest.fixture
+def client():
+    client = FilePost.__new__(FilePost)
+    client.schedule = []
+    client.sequence = itertools.count()
+    client.lock = threading.Lock()
+    client.wakeup = threading.Event()
+    return client
+
+def test_due_watchers(client):
+    first = FakeWatcher('first')
+    second = FakeWatcher('second')
+    client.reschedule(first, 100)
+    client.reschedule(second, 200)
+    assert client.wakeup.is_set()
+
+    assert client.due_watchers(150) == [first]
+    assert first.active
+    assert client.next_due() == 200
+    assert client.due_watchers(150) == []
+
+def test_stale_entries(client):
+    watcher = FakeWatcher('watcher')
+    client.reschedule(watcher, 100)
+    client.reschedule(watcher, 50)
+
+    assert client.due_watchers(60) == [watcher]
+    watcher.active = False
+    assert client.due_watchers(200) == []
+    assert client.schedule == []
+
+def test_wake(client, now):
+    watcher = FakeWatcher('watcher')
+    client.reschedule(watcher, 1060)
+    client.wake(watcher)
+    assert watcher.due == 1000
+    assert client.due_watchers(1000) == [watcher]
+
+def test_wake_already_due(client, now):
+    watcher = FakeWatcher('watcher')
+    client.reschedule(watcher, 990)
+    client.wake(watcher)
+    assert len(client.schedule) == 1
+
+def test_run_watcher(client, now):
+    watcher = FakeWatcher('watcher')
+    client.reschedule(watcher, 1000)
+    client.due_watchers(1000)
+    client.run_watcher(watcher)
+    assert watcher.processed == 1
+    assert not watcher.active
+    assert watcher.due == 1060
+
+def test_run_watcher_failed(client, now, caplog):
+    watcher = FakeWatcher('watcher', fail=True)
+    client.reschedule(watcher, 1000)
+    client.due_watchers(1000)
+    client.run_watcher(watcher)
+    assert 'Problem processing' in caplog.text
+    assert watcher.due == 1060
+
+def test_wake_while_running(client, now):
+    watcher = FakeWatcher('watcher')
+    client.reschedule(watcher, 1000)
+    client.due_watchers(1000)
+
+    # The event is kept and the watcher runs again right away
+
+    client.wake(watcher)
+    assert watcher.pending
+    now[0] = 1005
+    client.run_watcher(watcher)
+    assert not watcher.pending
+    assert watcher.due == 1005
+    assert client.due_watchers(1005) == [watcher]
+
+def make_watcher(rate, phase=0, jitter=None):
+    watcher = Watcher.__new__(Watcher)
+    watcher.rate = rate
+    watcher.parent = types.SimpleNamespace(
+        wait_phase=lambda _period: phase, wait_jitter=jitter
+    )
+    return watcher
+
+def test_next_time():
+    watcher = make_watcher(sapphire_config.Rate(60))
+    assert watcher.next_time(1010) == 1070
+
+def test_next_time_synced():
+    watcher = make_watcher(sapphire_config.Rate(60, sync=True, offset=3), phase=4.5)
+    assert watcher.next_time(1000) == 1027.5
+    assert watcher.next_time(1027.5) == 1087.5
+
+def test_next_time_jitter():
+    jitter = datetime.timedelta(seconds=5)
+    watcher = make_watcher(sapphire_config.Rate(60), jitter=jitter)
+    for _count in range(20):
+        assert 1060 <= watcher.next_time(1000) <= 1065
@@ -0,0 +1,213 @@
+import logging
+import os
+import time
+
+import pytest
+from watchdog.events import (
+    FileClosedEvent,
+    FileCreatedEvent,
+    FileModifiedEvent,
+    FileMovedEvent,
+)
+
+from datatransport.apps.filescanner import FileScanner, GlobScanner
+
+
+def make_file(path, data=b'x', age=100):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+def names(paths, root):
+    return [str(path.relative_to(root)) for path in paths]
+
+def test_match(tmp_path):
+    make_file(tmp_path / 'b.dat')
+    make_file(tmp_path / 'a.dat')
+    make_file(tmp_path / 'a.txt')
+    make_file(tmp_path / 'sub' / 'c.dat')
+    make_file(tmp_path / 'x' / 'y' / 'd.dat')
+    (tmp_path / 'dir.dat').mkdir()
+    scanner = GlobScanner(tmp_path, ['*.dat', 'sub/*.dat', '*/y/*.dat'])
+    assert names(scanner.scan(), tmp_path) == [
+        'a.dat', 'b.dat', 'sub/c.dat', 'x/y/d.dat'
+    ]
+
+def test_missing_dir(tmp_path):
+    scanner = GlobScanner(tmp_path, ['missing/*.dat'])
+    assert scanner.scan() == []
+
+def test_settle(tmp_path):
+    make_file(tmp_path / 'a.dat')
+    scanner = GlobScanner(tmp_path, ['*.dat'], settle=10)
+    assert scanner.scan() == []
+    assert names(scanner.scan(), tmp_path) == ['a.dat']
+
+def test_settle_changed(tmp_path):
+    path = make_file(tmp_path / 'a.dat')
+    scanner = GlobScanner(tmp_path, ['*.dat'], settle=10)
+    scanner.scan()
+    make_file(path, b'xy')
+    assert scanner.scan() == []
+    assert names(scanner.scan(), tmp_path) == ['a.dat']
+
+def test_settle_recent(tmp_path):
+    make_file(tmp_path / 'a.dat', age=0)
+    scanner = GlobScanner(tmp_path, ['*.dat'], settle=10)
+    scanner.scan()
+    assert scanner.scan() == []
+
+def test_closed(tmp_path):
+    path = make_file(tmp_path / 'a.dat', age=0)
+    scanner = GlobScanner(tmp_path, ['*.dat'], settle=10)
+    scanner.mark_closed(path)
+    assert names(scanner.scan(), tmp_path) == ['a.dat']
+    assert names(scanner.scan(), tmp_path) == ['a.dat']
+
+def test_closed_reopened(tmp_path):
+    path = make_file(tmp_path / 'a.dat', age=0)
+    scanner = GlobScanner(tmp_path, ['*.dat'], settle=10)
+    scanner.mark_closed(path)
+    with path.open('ab') as output:
+        output.write(b'more')
+    assert scanner.scan() == []
+    assert scanner.closed == {}
+
+def test_closed_removed(tmp_path):
+    path = make_file(tmp_path / 'a.dat', age=0)
+    scanner = GlobScanner(tmp_path, ['*.dat'], settle=10)
+    scanner.mark_closed(path)
+    path.unlink()
+    assert scanner.scan() == []
+    assert scanner.closed == {}
+
+def test_dir_cache(tmp_path):
+    make_file(tmp_path / 'a.dat')
+    os.utime(tmp_path, (1000, 1000))
+    scanner = GlobScanner(tmp_path, ['*.dat'])
+    assert names(scanner.scan(), tmp_path) == ['a.dat']
+
+    # Directory unchanged, the cached listing is used
+
+    make_file(tmp_path / 'b.dat')
+    os.utime(tmp_path, (1000, 1000))
+    assert names(scanner.scan(), tmp_path) == ['a.dat']
+
+    os.utime(tmp_path, (2000, 2000))
+    assert names(scanner.scan(), tmp_path) == ['a.dat', 'b.dat']
+
+def test_dir_cache_recent(tmp_path):
+    make_file(tmp_path / 'a.dat')
+    scanner = GlobScanner(tmp_path, ['*.dat'])
+    scanner.scan()
+    mtime = os.stat(tmp_path).st_mtime_ns
+    make_file(tmp_path / 'b.dat')
+    os.utime(tmp_path, ns=(mtime, mtime))
+    assert names(scanner.scan(), tmp_path) == ['a.dat', 'b.dat']
+
+# FileScanner ----------------------------------------------------------------
+
+def open_scanner(tmp_path, settle=10):
+    scanner = FileScanner(
+        tmp_path / 'input', '*.dat', tmp_path / 'queue.sqlite',
+        logging.getLogger('test'), settle
+    )
+    scanner.path.mkdir(exist_ok=True)
+    return scanner
+
+@pytest.fixture
+def scanner(tmp_path):
+    scanner = open_scanner(tmp_path)
+    yield scanner
+    scanner.stop()
+
+def test_closed_event(scanner):
+    path = make_file(scanner.path / 'a.dat', age=0)
+    make_file(scanner.path / 'a.txt', age=0)
+    scanner.on_closed(FileClosedEvent(str(path)))
+    scanner.on_closed(FileClosedEvent(str(scanner.path / 'a.txt')))
+    assert scanner.changed.is_set()
+    assert scanner.count() == 1
+    assert scanner.files() == [path]
+
+def test_moved_event(scanner):
+    path = make_file(scanner.path / 'a.dat', age=0)
+    scanner.on_moved(FileMovedEvent('/elsewhere/a.tmp', str(path)))
+    assert scanner.files() == [path]
+
+def test_created_with_close_events(scanner):
+    path = make_file(scanner.path / 'a.dat')
+    scanner.close_events = True
+    scanner.on_created(FileCreatedEvent(str(path)))
+    scanner.on_modified(FileModifiedEvent(str(path)))
+    assert scanner.count() == 0
+
+def test_created_settles(scanner):
+    path = make_file(scanner.path / 'a.dat')
+    scanner.on_created(FileCreatedEvent(str(path)))
+    assert scanner.files() == []
+    assert scanner.files() == [path]
+
+def test_modified_not_settled(scanner):
+    path = make_file(scanner.path / 'a.dat')
+    scanner.on_modified(FileModifiedEvent(str(path)))
+    assert scanner.files() == []
+    make_file(path, b'xy')
+    assert scanner.files() == []
+    assert scanner.files() == [path]
+
+def test_modified_recent(scanner):
+    path = make_file(scanner.path / 'a.dat', age=0)
+    scanner.on_modified(FileModifiedEvent(str(path)))
+    scanner.files()
+    assert scanner.files() == []
+
+def test_written_after_close(scanner):
+    path = make_file(scanner.path / 'a.dat', age=0)
+    scanner.on_closed(FileClosedEvent(str(path)))
+    with path.open('ab') as output:
+        output.write(b'more')
+    assert scanner.files() == []
+    assert scanner.closed == {}
+
+def test_vanished(scanner):
+    path = make_file(scanner.path / 'a.dat', age=0)
+    scanner.on_closed(FileClosedEvent(str(path)))
+    path.unlink()
+    assert scanner.files() == []
+    assert scanner.count() == 0
+
+def test_remove(scanner):
+    path = make_file(scanner.path / 'a.dat', age=0)
+    scanner.on_closed(FileClosedEvent(str(path)))
+    scanner.remove(path)
+    assert scanner.count() == 0
+    assert scanner.files() == []
+
+def test_persistent(tmp_path):
+    scanner = open_scanner(tmp_path)
+    path = make_file(scanner.path / 'a.dat')
+    scanner.on_closed(FileClosedEvent(str(path)))
+    scanner.stop()
+
+    # Queued before the restart, the file has to settle
+
+    scanner = open_scanner(tmp_path)
+    assert scanner.count() == 1
+    assert scanner.files() == []
+    assert scanner.files() == [path]
+    scanner.stop()
+
+def test_scan(scanner):
+    old = make_file(scanner.path / 'old.dat', age=1000)
+    new = make_file(scanner.path / 'sub' / 'new.dat', age=10)
+    make_file(scanner.path / 'new.txt', age=10)
+    assert scanner.scan(time.time() - 100) == 1
+    assert scanner.changed.is_set()
+    scanner.files()
+    assert scanner.files() == [new]
+    assert scanner.scan() == 2
+    scanner.files()
+    assert scanner.files() == [old, new]
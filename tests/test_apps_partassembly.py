@@ -0,0 +1,102 @@
+import datetime
+import hashlib
+import logging
+
+from datatransport.apps.archivegroups import Checkpoint
+from datatransport.apps.archivestore import CheckpointStore
+from datatransport.apps.partassembly import PartAssembler
+
+TIMESTAMP = datetime.datetime(2026, 1, 1, tzinfo=datetime.UTC)
+PARTS = [bytes([ord('a') + part]) * 1000 for part in range(4)]
+CHECKSUM = hashlib.md5(b''.join(PARTS)).hexdigest()
+
+
+def open_assembler(tmp_path):
+    store = CheckpointStore(tmp_path / 'checkpoint.sqlite', Checkpoint)
+    return PartAssembler(store, tmp_path / 'parts', logging.getLogger('test'))
+
+def add(assembler, tmp_path, part):
+    source = tmp_path / f'received.{part}'
+    source.write_bytes(PARTS[part])
+    dest = tmp_path / 'joined.dat'
+    return assembler.add(
+        'test', 'joined.dat', part, len(PARTS), source, dest, TIMESTAMP
+    )
+
+def crash(assembler):
+    # Stop without committing the pending changes
+    assembler.store.conn.close()
+
+def test_in_order(tmp_path):
+    assembler = open_assembler(tmp_path)
+    for part in range(3):
+        assert add(assembler, tmp_path, part) is None
+    assert add(assembler, tmp_path, 3) == CHECKSUM
+    assert (tmp_path / 'joined.dat').read_bytes() == b''.join(PARTS)
+    assert not assembler.workdir('test', 'joined.dat').exists()
+    assembler.store.close()
+
+def test_out_of_order(tmp_path):
+    assembler = open_assembler(tmp_path)
+    for part in (3, 1, 1, 0):
+        assert add(assembler, tmp_path, part) is None
+    assert add(assembler, tmp_path, 2) == CHECKSUM
+    assert (tmp_path / 'joined.dat').read_bytes() == b''.join(PARTS)
+    assembler.store.close()
+
+def test_resume(tmp_path):
+    assembler = open_assembler(tmp_path)
+    add(assembler, tmp_path, 0)
+    add(assembler, tmp_path, 1)
+    assembler.store.commit()
+    add(assembler, tmp_path, 2)
+    crash(assembler)
+
+    # The output is truncated back to the committed size
+
+    assembler = open_assembler(tmp_path)
+    add(assembler, tmp_path, 2)
+    assert add(assembler, tmp_path, 3) == CHECKSUM
+    assert (tmp_path / 'joined.dat').read_bytes() == b''.join(PARTS)
+    assembler.store.close()
+
+def test_crash_after_held_parts_appended(tmp_path):
+    assembler = open_assembler(tmp_path)
+    add(assembler, tmp_path, 1)
+    add(assembler, tmp_path, 2)
+    assembler.store.commit()
+
+    workdir = assembler.workdir('test', 'joined.dat')
+    add(assembler, tmp_path, 0)
+    assert workdir.joinpath('part.1').exists()
+    crash(assembler)
+
+    # The rolled back held parts are still there to append again
+
+    assembler = open_assembler(tmp_path)
+    assert assembler.held('test', 'joined.dat') == {1, 2}
+    add(assembler, tmp_path, 0)
+    assembler.store.commit()
+    assert not workdir.joinpath('part.1').exists()
+    assert add(assembler, tmp_path, 3) == CHECKSUM
+    assert (tmp_path / 'joined.dat').read_bytes() == b''.join(PARTS)
+    assembler.store.close()
+
+def test_missing_held_part(tmp_path):
+    assembler = open_assembler(tmp_path)
+    add(assembler, tmp_path, 1)
+    add(assembler, tmp_path, 2)
+    assembler.store.commit()
+
+    workdir = assembler.workdir('test', 'joined.dat')
+    workdir.joinpath('part.1').unlink()
+
+    assert add(assembler, tmp_path, 0) is None
+    assert assembler.held('test', 'joined.dat') == {2}
+
+    # A re-delivered copy is not dropped as a duplicate
+
+    assert add(assembler, tmp_path, 1) is None
+    assert add(assembler, tmp_path, 3) == CHECKSUM
+    assert (tmp_path / 'joined.dat').read_bytes() == b''.join(PARTS)
+    assembler.store.close()
@@ -0,0 +1,192 @@
+import logging
+
+import pytest
+
+from datatransport.apps.postdatafiles import PostDataFiles, Uploads
+
+MB = 1000 * 1000
+
+
+class FakePoster:
+    """Records the posts, failing the post numbered fail_at (from 0)"""
+
+    def __init__(self, fail_at=None):
+        self.fail_at = fail_at
+        self.posts = []
+
+    def check(self):
+        if len(self.posts) == self.fail_at:
+            self.fail_at = None
+            raise OSError('connection lost')
+
+    def post(self, filenames, date=None, headers=None):
+        self.check()
+        self.posts.append((filenames, headers))
+
+    def post_data(self, data, name, date=None, headers=None):
+        self.check()
+        self.posts.append((data, headers))
+
+
+def make_client(tmp_path, adaptive=False, max_size=100, **kwargs):
+    client = PostDataFiles.__new__(PostDataFiles)
+    client.log = logging.getLogger('test')
+    client.news_poster = FakePoster()
+    client.uploads = Uploads(tmp_path / 'uploads.json')
+    client.domain = 'example.com'
+    client.check_size = True
+    client.adaptive = adaptive
+    client.max_size = max_size
+    client.chunk_size = max_size
+    client.min_chunk = kwargs.get('min_chunk', 10)
+    client.max_chunk = kwargs.get('max_chunk', max_size)
+    client.target_secs = kwargs.get('target_secs', 60)
+    return client
+
+def make_file(tmp_path, size, fill=b'x'):
+    path = tmp_path / 'data.dat'
+    path.write_bytes(fill * size)
+    return path
+
+def parts(poster):
+    return [headers['X-Transport-Part'] for _data, headers in poster.posts]
+
+# Chunks ---------------------------------------------------------------------
+
+def test_chunks(tmp_path):
+    client = make_client(tmp_path)
+    assert client.chunks(100) == [[0, 100]]
+    assert client.chunks(250) == [[0, 100], [100, 100], [200, 100]]
+
+def test_chunks_unchecked(tmp_path):
+    client = make_client(tmp_path)
+    client.check_size = False
+    assert client.chunks(250) == [[0, 250]]
+
+def test_chunks_adaptive(tmp_path):
+    client = make_client(tmp_path)
+    client.chunk_size = 50
+    assert len(client.chunks(100)) == 1
+    client.adaptive = True
+    assert client.chunks(100) == [[0, 50], [50, 50]]
+
+# Adaptive size --------------------------------------------------------------
+
+def test_adapt_disabled(tmp_path):
+    client = make_client(tmp_path)
+    client.adapt_chunk_size(100, 0, failed=True)
+    assert client.chunk_size == 100
+
+def test_adapt_failed(tmp_path):
+    client = make_client(tmp_path, adaptive=True, min_chunk=30)
+    client.adapt_chunk_size(100, 0, failed=True)
+    assert client.chunk_size == 50
+    client.adapt_chunk_size(50, 0, failed=True)
+    assert client.chunk_size == 30
+
+def test_adapt_rate(tmp_path):
+    client = make_client(tmp_path, adaptive=True, max_size=20 * MB, max_chunk=40 * MB)
+
+    # 1MB/s for 60s is 60MB, halfway from 20MB is 40MB (the maximum)
+
+    client.adapt_chunk_size(MB, 1)
+    assert client.chunk_size == 40 * MB
+
+    # 0.1MB/s is 6MB, halfway from 40MB
+
+    client.adapt_chunk_size(MB, 10)
+    assert client.chunk_size == 23 * MB
+
+def test_adapt_single_post(tmp_path):
+    client = make_client(tmp_path, adaptive=True)
+    client.news_poster.fail_at = 0
+    path = make_file(tmp_path, 80)
+    with pytest.raises(OSError):
+        client.post(path, None)
+    assert client.chunk_size == 50
+
+# Uploads --------------------------------------------------------------------
+
+def test_uploads(tmp_path):
+    uploads = Uploads(tmp_path / 'uploads.json')
+    upload = uploads.start('a.dat', 'sum', [[0, 10], [10, 10]])
+    uploads.posted('a.dat', '<1@example.com>')
+
+    uploads = Uploads(tmp_path / 'uploads.json')
+    upload = uploads.start('a.dat', 'sum', [[0, 20]])
+    assert upload['chunks'] == [[0, 10], [10, 10]]
+    assert upload['posted'] == ['<1@example.com>']
+
+    uploads.finish('a.dat')
+    assert Uploads(tmp_path / 'uploads.json').state == {}
+
+def test_uploads_changed(tmp_path):
+    uploads = Uploads(tmp_path / 'uploads.json')
+    uploads.start('a.dat', 'sum', [[0, 10], [10, 10]])
+    uploads.posted('a.dat', '<1@example.com>')
+    upload = uploads.start('a.dat', 'other', [[0, 20]])
+    assert upload == {'checksum': 'other', 'chunks': [[0, 20]], 'posted': []}
+
+def test_uploads_new_file(tmp_path):
+    uploads = Uploads(tmp_path / 'uploads.json')
+    uploads.start('a.dat', 'sum', [[0, 10], [10, 10]])
+    uploads.posted('a.dat', '<1@example.com>')
+    uploads.start('b.dat', 'sum', [[0, 10], [10, 10]])
+    assert list(uploads.state) == ['b.dat']
+
+def test_uploads_corrupt(tmp_path):
+    (tmp_path / 'uploads.json').write_text('{')
+    assert Uploads(tmp_path / 'uploads.json').state == {}
+
+# Posting --------------------------------------------------------------------
+
+def test_post_single(tmp_path):
+    client = make_client(tmp_path)
+    path = make_file(tmp_path, 100)
+    client.post(path, None, 'sum')
+    assert client.news_poster.posts == [([path], {'X-Transport-md5': 'sum'})]
+    assert client.uploads.state == {}
+
+def test_post_resume(tmp_path):
+    client = make_client(tmp_path)
+    client.news_poster.fail_at = 1
+    path = make_file(tmp_path, 250)
+
+    with pytest.raises(OSError):
+        client.post(path, None)
+
+    posted = client.uploads.state[str(path)]['posted']
+    first_id = client.news_poster.posts[0][1]['Message-ID']
+    assert posted == [first_id]
+
+    client.post(path, None)
+    assert parts(client.news_poster) == ['0/3', '1/3', '2/3']
+    data = [data for data, _headers in client.news_poster.posts]
+    assert data == [b'x' * 100, b'x' * 100, b'x' * 50]
+    assert client.uploads.state == {}
+
+def test_post_resume_keeps_chunks(tmp_path):
+    client = make_client(tmp_path, adaptive=True)
+    client.news_poster.fail_at = 1
+    path = make_file(tmp_path, 250)
+
+    with pytest.raises(OSError):
+        client.post(path, None)
+
+    # The part size changed, but the upload continues with its parts
+
+    assert client.chunk_size == 50
+    client.post(path, None)
+    assert parts(client.news_poster) == ['0/3', '1/3', '2/3']
+
+def test_post_changed_file(tmp_path):
+    client = make_client(tmp_path)
+    client.news_poster.fail_at = 1
+    path = make_file(tmp_path, 250)
+
+    with pytest.raises(OSError):
+        client.post(path, None)
+
+    make_file(tmp_path, 250, b'y')
+    client.post(path, None)
+    assert parts(client.news_poster) == ['0/3', '0/3', '1/3', '2/3']
@@ -0,0 +1,169 @@
+import hashlib
+import http.server
+import threading
+import urllib.error
+
+import pytest
+
+from datatransport.apps.urlfetch import URLFetcher
+
+CONTENT = b'0123456789' * 10000
+ETAG = '"v1"'
+LAST_MODIFIED = 'Thu, 01 Jan 2026 00:00:00 GMT'
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send(self, status, body=b'', headers=None):
+        self.server.requests.append((self.command, self.path, self.client_address))
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        if self.path == '/nohead':
+            self.send(405)
+        else:
+            self.do_GET()
+
+    def do_GET(self):
+        headers = {'ETag': ETAG, 'Last-Modified': LAST_MODIFIED}
+
+        if self.path in ('/file', '/nohead'):
+            if self.headers.get('If-None-Match') == ETAG:
+                self.send(304, headers=headers)
+            else:
+                self.send(200, CONTENT, headers)
+        elif self.path == '/query?a=1':
+            self.send(200, b'query')
+        elif self.path == '/redirect':
+            self.send(302, headers={'Location': '/file'})
+        elif self.path == '/loop':
+            self.send(302, headers={'Location': '/loop'})
+        elif self.path == '/close':
+            # Close without telling the client, like an idle timeout
+            self.send(200, b'closed')
+            self.close_connection = True
+        else:
+            self.send(404, b'missing')
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def url(server):
+    server.requests.clear()
+    return f'http://127.0.0.1:{server.server_port}'
+
+@pytest.fixture
+def fetcher():
+    fetcher = URLFetcher(timeout=10, workers=2)
+    fetcher.proxies = {}
+    yield fetcher
+    fetcher.close()
+
+def connections(server):
+    return {address for _method, _path, address in server.requests}
+
+def test_read(fetcher, url):
+    assert fetcher.read(f'{url}/file') == CONTENT
+    assert fetcher.read(f'{url}/query?a=1') == b'query'
+
+def test_keep_alive(fetcher, url, server):
+    for _count in range(3):
+        fetcher.read(f'{url}/file')
+    assert len(server.requests) == 3
+    assert len(connections(server)) == 1
+
+def test_stale_connection(fetcher, url, server):
+    assert fetcher.read(f'{url}/close') == b'closed'
+    assert fetcher.read(f'{url}/file') == CONTENT
+    assert len(connections(server)) == 2
+
+def test_redirect(fetcher, url, server):
+    assert fetcher.read(f'{url}/redirect') == CONTENT
+    assert [path for _method, path, _address in server.requests] == [
+        '/redirect', '/file'
+    ]
+
+def test_redirect_loop(fetcher, url):
+    with pytest.raises(urllib.error.HTTPError):
+        fetcher.read(f'{url}/loop')
+
+def test_not_found(fetcher, url):
+    with pytest.raises(urllib.error.HTTPError) as err:
+        fetcher.read(f'{url}/missing')
+    assert err.value.code == 404
+
+    # The connection is still usable
+
+    assert fetcher.read(f'{url}/file') == CONTENT
+
+def test_head(fetcher, url, server):
+    headers = fetcher.head(f'{url}/file')
+    assert headers['ETag'] == ETAG
+    assert [method for method, _path, _address in server.requests] == ['HEAD']
+
+def test_head_not_allowed(fetcher, url, server):
+    headers = fetcher.head(f'{url}/nohead')
+    assert headers['ETag'] == ETAG
+    assert [method for method, _path, _address in server.requests] == [
+        'HEAD', 'GET'
+    ]
+
+def test_fetch(fetcher, url, tmp_path):
+    filename = tmp_path / 'file'
+    result = fetcher.fetch(f'{url}/file', filename)
+    assert result.modified
+    assert result.etag == ETAG
+    assert result.last_modified == LAST_MODIFIED
+    assert result.size == len(CONTENT)
+    assert result.checksum == hashlib.md5(CONTENT).hexdigest()
+    assert filename.read_bytes() == CONTENT
+    assert list(tmp_path.iterdir()) == [filename]
+
+def test_fetch_not_modified(fetcher, url, tmp_path):
+    filename = tmp_path / 'file'
+    result = fetcher.fetch(f'{url}/file', filename, etag=ETAG)
+    assert not result.modified
+    assert result.checksum is None
+    assert not filename.exists()
+
+    # The connection is kept after a 304
+
+    fetcher.read(f'{url}/file')
+
+def test_fetch_error(fetcher, url, tmp_path):
+    with pytest.raises(urllib.error.HTTPError):
+        fetcher.fetch(f'{url}/missing', tmp_path / 'file')
+    assert list(tmp_path.iterdir()) == []
+
+def test_file_url(fetcher, tmp_path):
+    source = tmp_path / 'source'
+    source.write_bytes(b'local')
+    assert fetcher.use_urllib(source.as_uri())
+    result = fetcher.fetch(source.as_uri(), tmp_path / 'copy')
+    assert result.checksum == hashlib.md5(b'local').hexdigest()
+
+def test_map(fetcher, url):
+    results = fetcher.map(fetcher.read, [f'{url}/file', f'{url}/missing'])
+    assert results[0] == (CONTENT, None)
+    assert results[1][0] is None
+    assert isinstance(results[1][1], urllib.error.HTTPError)
@@ -0,0 +1,273 @@
+import hashlib
+import json
+import logging
+import nntplib
+import threading
+
+from datatransport.apps.urlfetch import FetchResult
+from datatransport.apps.watchurl import URLState, WatchURL
+
+
+class FakeFetcher:
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.headers = {}
+        self.fetched = []
+
+    def map(self, func, *iterables):
+        results = []
+        for args in zip(*iterables):
+            try:
+                results.append((func(*args), None))
+            except OSError as err:
+                results.append((None, err))
+        return results
+
+    def head(self, url):
+        return self.headers.get(url, {'Content-Length': len(self.pages[url])})
+
+    def fetch(self, url, filename, etag=None, last_modified=None):
+        self.fetched.append(url)
+        contents = self.pages[url]
+        if contents is None:
+            raise OSError('unreachable')
+        tag = hashlib.md5(contents).hexdigest()
+        if etag == tag:
+            return FetchResult(url, filename, 304, {})
+        with open(filename, 'wb') as f:
+            f.write(contents)
+        result = FetchResult(url, filename, 200, {'ETag': tag})
+        result.size = len(contents)
+        result.checksum = hashlib.md5(contents).hexdigest()
+        return result
+
+    def close(self):
+        pass
+
+
+class FakePoster:
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.posted = []
+
+    def post(self, filenames):
+        if self.fail:
+            raise nntplib.NNTPTemporaryError('400 server busy')
+        self.posted.append(sorted(filenames))
+
+
+def make_client(rename_rules=(), pages=None, state='urlstate.json'):
+    client = WatchURL.__new__(WatchURL)
+    client.rename_rules = list(rename_rules)
+    client.log = logging.getLogger('watchurl')
+    client.fetcher = FakeFetcher(pages or {})
+    client.state = URLState(state)
+    client.conditional = True
+    client.exclude_headers = ['Date']
+    client.legacy_checksum = None
+    return client
+
+def run_cycles(client, cycles, poster=None):
+    client.url = 'http://host/'
+    client.save_body = False
+    client.save_images = True
+    client.check_headers = True
+    client.save_thumbnails = False
+    client.pollrate = client.retryrate = 60
+    client.news_poster = poster or FakePoster()
+    client.parser = type('Parser', (), {
+        'get_images': lambda self, url, contents: list(client.fetcher.pages),
+    })()
+    client.fetcher.read = lambda url: b''
+    client.exit_event = threading.Event()
+    calls = []
+
+    def wait(_rate):
+        calls.append(1)
+        if len(calls) > cycles:
+            client.exit_event.set()
+
+    client.wait = wait
+    client.main()
+    return client.news_poster
+
+def test_file_names():
+    client = make_client()
+    names = client.file_names([
+        'http://host/index.html',
+        'http://host/a/logo.png',
+        'http://host/b/logo.png',
+        'http://host/c/logo.png',
+        'http://host/',
+        'http://host/dir/',
+    ])
+    assert list(names.values()) == [
+        'index.html', 'logo.png', 'logo-1.png', 'logo-2.png', 'unknown.0',
+        'unknown.1',
+    ]
+
+def test_file_names_renamed():
+    client = make_client([('*.png', 'image.png')])
+    names = client.file_names(['http://host/a.png', 'http://host/b.png'])
+    assert list(names.values()) == ['image.png', 'image-1.png']
+
+def test_state_save_load(tmp_path):
+    path = tmp_path / 'urlstate.json'
+    state = URLState(path)
+    assert state.get('http://host/a') == {}
+    state.update('http://host/a', etag='x', size=10)
+    state.update('http://host/a', size=20)
+    state.save()
+    assert URLState(path).get('http://host/a') == {'etag': 'x', 'size': 20}
+
+def test_state_corrupt(tmp_path):
+    path = tmp_path / 'urlstate.json'
+    path.write_text('{not json')
+    assert URLState(path).state == {}
+
+def test_state_prune(tmp_path):
+    state = URLState(tmp_path / 'urlstate.json')
+    state.update('http://host/a', etag='a')
+    state.update('http://host/b', etag='b')
+    state.prune(['http://host/b', 'http://host/c'])
+    assert list(state.state) == ['http://host/b']
+
+def test_headers_changed(tmp_path):
+    url = 'http://host/a.png'
+    client = make_client(pages={url: b'one'}, state=tmp_path / 'urlstate.json')
+    client.fetcher.headers[url] = {'Date': 'today', 'ETag': 'x'}
+    changed = client.headers_changed([url])
+    assert list(changed) == [url]
+    client.state.update(url, headers=changed[url])
+    client.fetcher.headers[url] = {'Date': 'tomorrow', 'ETag': 'x'}
+    assert client.headers_changed([url]) == {}
+    client.fetcher.headers[url] = {'Date': 'tomorrow', 'ETag': 'y'}
+    assert list(client.headers_changed([url])) == [url]
+
+def test_retrieve_changed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    url = 'http://host/a.png'
+    client = make_client(pages={url: b'one'})
+    changed = client.retrieve_files([url], {url: 'a.png'}, {url: 'h1'})
+    assert [(u, r.filename) for u, r in changed] == [(url, 'a.png')]
+    assert (tmp_path / 'a.png').read_bytes() == b'one'
+    assert client.state.get(url) == {}
+
+def test_update_state(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    url = 'http://host/a.png'
+    client = make_client(pages={url: b'one'})
+    changed = client.retrieve_files([url], {url: 'a.png'}, {url: 'h1'})
+    client.update_state(changed, {url: 'h1'})
+    state = client.state.get(url)
+    assert state['etag'] == hashlib.md5(b'one').hexdigest()
+    assert state['size'] == 3
+    assert state['checksum'] == hashlib.md5(b'one').hexdigest()
+    assert state['headers'] == 'h1'
+    assert 'posted' in state
+
+def test_retrieve_same_contents(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    url = 'http://host/a.png'
+    client = make_client(pages={url: b'one'})
+    client.conditional = False
+    client.state.update(url, checksum=hashlib.md5(b'one').hexdigest(),
+                        headers='h1', posted='earlier')
+    changed = client.retrieve_files([url], {url: 'a.png'}, {url: 'h2'})
+    assert changed == []
+    assert not (tmp_path / 'a.png').exists()
+    state = client.state.get(url)
+    assert state['headers'] == 'h2'
+    assert state['etag'] == hashlib.md5(b'one').hexdigest()
+    assert state['posted'] == 'earlier'
+
+def test_retrieve_not_modified(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    url = 'http://host/a.png'
+    client = make_client(pages={url: b'one'})
+    etag = hashlib.md5(b'one').hexdigest()
+    client.state.update(url, etag=etag, headers='h1', posted='earlier')
+    changed = client.retrieve_files([url], {url: 'a.png'}, {url: 'h2'})
+    assert changed == []
+    assert not (tmp_path / 'a.png').exists()
+    assert client.state.get(url) == {
+        'etag': etag, 'headers': 'h2', 'posted': 'earlier',
+    }
+
+def test_retrieve_error(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pages = {'http://host/a.png': None, 'http://host/b.png': b'two'}
+    client = make_client(pages=pages)
+    filenames = client.file_names(pages)
+    changed = client.retrieve_files(list(pages), filenames, {})
+    assert [url for url, _result in changed] == ['http://host/b.png']
+    assert client.state.get('http://host/a.png') == {}
+
+def test_main_posts_changed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pages = {'http://host/a.png': b'one', 'http://host/b.png': b'two'}
+    client = make_client(pages=pages)
+    poster = run_cycles(client, 1)
+    assert poster.posted == [['a.png', 'b.png']]
+    pages['http://host/b.png'] = b'three'
+    poster = run_cycles(client, 1)
+    assert poster.posted == [['b.png']]
+    assert not list(tmp_path.glob('*.png'))
+    saved = json.loads((tmp_path / 'urlstate.json').read_text())
+    assert saved['http://host/b.png']['size'] == 5
+
+def test_main_post_failed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pages = {'http://host/a.png': b'one'}
+    client = make_client(pages=pages)
+    run_cycles(client, 1, FakePoster(fail=True))
+    assert client.state.get('http://host/a.png') == {}
+    assert not (tmp_path / 'a.png').exists()
+    poster = run_cycles(client, 1)
+    assert poster.posted == [['a.png']]
+
+def test_main_prunes_state(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pages = {'http://host/a.png': b'one', 'http://host/b.png': b'two'}
+    client = make_client(pages=pages)
+    run_cycles(client, 1)
+    del pages['http://host/a.png']
+    run_cycles(client, 1)
+    saved = json.loads((tmp_path / 'urlstate.json').read_text())
+    assert list(saved) == ['http://host/b.png']
+
+def test_seed_from_legacy_checksum(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'checksum.files').write_text(
+        hashlib.md5(b'onetwo').hexdigest())
+    (tmp_path / 'checksum.headers').write_text('0')
+    pages = {'http://host/a.png': b'one', 'http://host/b.png': b'two'}
+    client = make_client(pages=pages)
+    client.legacy_checksum = client.load_legacy_checksum()
+    poster = run_cycles(client, 1)
+    assert poster.posted == []
+    assert client.state.get('http://host/a.png')['size'] == 3
+    assert not (tmp_path / 'checksum.files').exists()
+    assert not (tmp_path / 'checksum.headers').exists()
+    assert not list(tmp_path.glob('*.png'))
+
+def test_seed_legacy_changed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'checksum.files').write_text(
+        hashlib.md5(b'oldtwo').hexdigest())
+    pages = {'http://host/a.png': b'one', 'http://host/b.png': b'two'}
+    client = make_client(pages=pages)
+    client.legacy_checksum = client.load_legacy_checksum()
+    poster = run_cycles(client, 1)
+    assert poster.posted == [['a.png', 'b.png']]
+    assert not (tmp_path / 'checksum.files').exists()
+
+def test_legacy_checksum_ignored_with_state(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'checksum.files').write_text('abc')
+    client = make_client()
+    assert client.load_legacy_checksum() == 'abc'
+    client.state.save()
+    assert client.load_legacy_checksum() is None
@@ -0,0 +1,75 @@
+import datetime
+import threading
+
+import pytest
+
+from datatransport import clock
+
+EPOCH = 1_000_000.0
+START = datetime.datetime(2026, 1, 1, tzinfo=datetime.UTC)
+
+@pytest.fixture
+def walltime(monkeypatch):
+    now = [EPOCH]
+    monkeypatch.setattr(clock._time, 'time', lambda: now[0])
+    return now
+
+def test_start_at_epoch(walltime):
+    virtual = clock.VirtualClock(START, speed=100, epoch=EPOCH)
+    assert virtual.time() == START.timestamp()
+    assert virtual.now() == START
+
+def test_scaled(walltime):
+    virtual = clock.VirtualClock(START, speed=100, epoch=EPOCH)
+    walltime[0] += 36
+    assert virtual.time() == START.timestamp() + 3600
+    assert virtual.now() == START + datetime.timedelta(hours=1)
+
+def test_naive_start_is_utc(walltime):
+    virtual = clock.VirtualClock(START.replace(tzinfo=None), epoch=EPOCH)
+    assert virtual.start == START.timestamp()
+
+def test_defaults(walltime):
+    virtual = clock.VirtualClock()
+    assert virtual.epoch == EPOCH
+    assert virtual.start == EPOCH
+
+def test_bad_speed():
+    with pytest.raises(ValueError):
+        clock.VirtualClock(START, speed=0)
+
+def test_sleep_scaled(monkeypatch):
+    slept = []
+    monkeypatch.setattr(clock._time, 'sleep', slept.append)
+    clock.VirtualClock(START, speed=100).sleep(50)
+    assert slept == [0.5]
+
+def test_wait_scaled():
+    event = threading.Event()
+    virtual = clock.VirtualClock(START, speed=1000)
+    start = virtual.time()
+    assert not virtual.wait(event, 100)
+    assert virtual.time() - start >= 100
+
+def test_wait_event_set():
+    event = threading.Event()
+    event.set()
+    assert clock.VirtualClock(START, speed=1).wait(event, 60)
+
+def test_set_clock(walltime):
+    virtual = clock.VirtualClock(START, speed=10, epoch=EPOCH)
+    previous = clock.set_clock(virtual)
+    try:
+        assert clock.get_clock() is virtual
+        assert clock.time() == START.timestamp()
+        assert clock.now() == START
+    finally:
+        clock.set_clock(previous)
+    assert clock.get_clock() is previous
+
+def test_set_clock_none():
+    previous = clock.set_clock(None)
+    try:
+        assert isinstance(clock.get_clock(), clock.SystemClock)
+    finally:
+        clock.set_clock(previous)
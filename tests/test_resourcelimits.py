@@ -0,0 +1,76 @@
+import logging
+import resource
+
+import pytest
+import sapphire_config
+
+from datatransport.resourcelimits import ResourceLimits, parse_cpus
+
+
+def make_limits(text, name='client'):
+    parser = sapphire_config.Parser()
+    parser.read_string(text)
+    return ResourceLimits(parser[name], parser['ProcessGroup'], name)
+
+def test_parse_cpus():
+    assert parse_cpus('0 1') == {0, 1}
+    assert parse_cpus('0-3,6') == {0, 1, 2, 3, 6}
+
+def test_empty():
+    limits = make_limits('[ProcessGroup]\n[client]\n')
+    assert not limits
+    assert limits.ionice_level == 4
+
+def test_fallback():
+    limits = make_limits(
+        '[ProcessGroup]\nlimits.nice: 10\nlimits.files: 100\n'
+        '[client]\nlimits.nice: 5\nlimits.cpus: 0-1\n'
+        'limits.cgroup: transport/{client.name}\n'
+    )
+    assert limits
+    assert limits.nice == 5
+    assert limits.files == 100
+    assert limits.cpus == {0, 1}
+    assert str(limits.cgroup) == '/sys/fs/cgroup/transport/client'
+
+def test_bad_ionice_class():
+    with pytest.raises(ValueError):
+        make_limits('[ProcessGroup]\n[client]\nlimits.ionice.class: fast\n')
+
+@pytest.fixture
+def rlimits(monkeypatch):
+    limits = {
+        resource.RLIMIT_AS: (resource.RLIM_INFINITY, resource.RLIM_INFINITY),
+        resource.RLIMIT_NOFILE: (1024, 4096),
+    }
+    monkeypatch.setattr(resource, 'getrlimit', limits.get)
+    monkeypatch.setattr(resource, 'setrlimit', limits.__setitem__)
+    return limits
+
+def test_clamp(rlimits, caplog):
+    limits = make_limits(
+        '[ProcessGroup]\n[client]\nlimits.files: 10000\nlimits.memory: 1GB\n'
+    )
+    limits.clamp(logging.getLogger('test'))
+    assert limits.files == 4096
+    assert limits.memory == 1_000_000_000
+    assert 'limits.files 10000 is above the hard limit' in caplog.text
+
+def test_clamp_below(rlimits, caplog):
+    limits = make_limits('[ProcessGroup]\n[client]\nlimits.files: 2000\n')
+    limits.clamp(logging.getLogger('test'))
+    assert limits.files == 2000
+    assert not caplog.text
+
+def test_apply(rlimits):
+    limits = make_limits(
+        '[ProcessGroup]\n[client]\nlimits.files: 2000\nlimits.memory: 1GB\n'
+    )
+    limits.apply()
+    assert rlimits[resource.RLIMIT_NOFILE] == (2000, 4096)
+    assert rlimits[resource.RLIMIT_AS] == (1_000_000_000, resource.RLIM_INFINITY)
+
+def test_apply_never_raises_hard(rlimits):
+    limits = make_limits('[ProcessGroup]\n[client]\nlimits.files: 10000\n')
+    limits.apply()
+    assert rlimits[resource.RLIMIT_NOFILE] == (4096, 4096)
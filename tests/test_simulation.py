@@ -0,0 +1,80 @@
+import datetime
+import email.utils
+import nntplib
+import threading
+
+import pytest
+
+from datatransport import clock, simulation
+
+START = datetime.datetime(2026, 1, 1, tzinfo=datetime.UTC)
+
+ARTICLE = (
+    'From: test@example.com\r\n'
+    'Newsgroups: transport.test\r\n'
+    'Subject: test\r\n'
+    '\r\n'
+    'hello\r\n'
+)
+
+@pytest.fixture
+def virtual():
+    previous = clock.set_clock(clock.VirtualClock(START, speed=1))
+    yield clock.get_clock()
+    clock.set_clock(previous)
+
+@pytest.fixture
+def store(virtual):
+    store = simulation.NewsStore()
+    store.add_group('transport.test')
+    return store
+
+def test_empty_group(store):
+    assert store.group('transport.test') == (0, 1, 0)
+
+def test_post(store):
+    message_id = store.post(ARTICLE)
+    assert store.group('transport.test') == (1, 1, 1)
+    number, article = store.article('transport.test', 1)
+    assert number == 1
+    assert article.message_id == message_id
+    assert article.header('Subject') == 'test'
+
+def test_posting_date_from_clock(store):
+    store.post(ARTICLE)
+    _number, article = store.article('transport.test', 1)
+    posted = email.utils.parsedate_to_datetime(article.header('NNTP-Posting-Date'))
+    assert abs(posted - START) < datetime.timedelta(minutes=1)
+
+def test_no_create():
+    store = simulation.NewsStore(create=False)
+    with pytest.raises(KeyError):
+        store.post(ARTICLE)
+
+def test_first_read(store):
+    store.post(ARTICLE)
+    _number, article = store.article('transport.test', 1)
+    assert article.first_read is not None
+    assert store.report()['read'] == 1
+
+def test_xhdr(store):
+    for _index in range(3):
+        store.post(ARTICLE)
+    results = store.xhdr('transport.test', 'Subject', 2, 3)
+    assert results == [(2, 'test'), (3, 'test')]
+
+def test_server(store):
+    server = simulation.NewsServer(store, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        host, port = server.server_address
+        with nntplib.NNTP(host, port) as conn:
+            conn.post(ARTICLE.encode('utf-8'))
+            _resp, count, first, last, _name = conn.group('transport.test')
+            assert (count, first, last) == (1, 1, 1)
+            _resp, info = conn.article(1)
+            assert b'hello' in info.lines
+    finally:
+        server.shutdown()
+        server.server_close()
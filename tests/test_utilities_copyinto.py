@@ -0,0 +1,72 @@
+import errno
+import os
+
+import pytest
+
+from datatransport.utilities import copy_into
+
+
+def test_copy_new(tmp_path):
+    source = tmp_path / 'source'
+    source.write_bytes(b'abc' * 1000)
+    dest = tmp_path / 'dest'
+    with dest.open('wb') as output:
+        assert copy_into(source, output) == 3000
+    assert dest.read_bytes() == b'abc' * 1000
+
+def test_copy_append(tmp_path):
+    source = tmp_path / 'source'
+    source.write_bytes(b'456')
+    dest = tmp_path / 'dest'
+    dest.write_bytes(b'123')
+    with dest.open('r+b') as output:
+        output.seek(0, os.SEEK_END)
+        copy_into(source, output)
+    assert dest.read_bytes() == b'123456'
+
+def test_copy_after_write(tmp_path):
+    source = tmp_path / 'source'
+    source.write_bytes(b'world')
+    dest = tmp_path / 'dest'
+    with dest.open('wb') as output:
+        output.write(b'hello ')
+        copy_into(source, output)
+    assert dest.read_bytes() == b'hello world'
+
+def test_copy_empty(tmp_path):
+    source = tmp_path / 'source'
+    source.write_bytes(b'')
+    dest = tmp_path / 'dest'
+    with dest.open('wb') as output:
+        assert copy_into(source, output) == 0
+    assert dest.read_bytes() == b''
+
+def test_copy_o_append(tmp_path):
+    source = tmp_path / 'source'
+    source.write_bytes(b'456')
+    dest = tmp_path / 'dest'
+    dest.write_bytes(b'123')
+    with dest.open('ab') as output:
+        copy_into(source, output)
+    assert dest.read_bytes() == b'123456'
+
+def test_fallback(tmp_path, monkeypatch):
+    def unsupported(*args):
+        raise OSError(errno.EXDEV, 'cross device')
+    monkeypatch.setattr(os, 'copy_file_range', unsupported)
+    source = tmp_path / 'source'
+    source.write_bytes(b'xyz')
+    dest = tmp_path / 'dest'
+    with dest.open('wb') as output:
+        assert copy_into(source, output) == 3
+    assert dest.read_bytes() == b'xyz'
+
+def test_other_errors_raised(tmp_path, monkeypatch):
+    def failed(*args):
+        raise OSError(errno.ENOSPC, 'no space')
+    monkeypatch.setattr(os, 'copy_file_range', failed)
+    source = tmp_path / 'source'
+    source.write_bytes(b'xyz')
+    with (tmp_path / 'dest').open('wb') as output:
+        with pytest.raises(OSError):
+            copy_into(source, output)
@@ -0,0 +1,53 @@
+import bz2
+import gzip
+import lzma
+
+import pytest
+
+from datatransport.utilities import decompress_file, is_compressed
+
+DATA = b'0123456789' * 100000
+
+@pytest.mark.parametrize('suffix,compress', [
+    ('.gz', gzip.compress),
+    ('.bz2', bz2.compress),
+    ('.xz', lzma.compress),
+])
+def test_decompress(tmp_path, suffix, compress):
+    filename = tmp_path / f'data.txt{suffix}'
+    filename.write_bytes(compress(DATA))
+    outname = decompress_file(filename)
+    assert outname == tmp_path / 'data.txt'
+    assert outname.read_bytes() == DATA
+    assert not filename.exists()
+
+def test_decompress_replaces(tmp_path):
+    (tmp_path / 'data.txt').write_bytes(b'old')
+    filename = tmp_path / 'data.txt.gz'
+    filename.write_bytes(gzip.compress(b'new'))
+    assert decompress_file(filename).read_bytes() == b'new'
+
+def test_decompress_mode(tmp_path):
+    filename = tmp_path / 'data.gz'
+    filename.write_bytes(gzip.compress(b'abc'))
+    filename.chmod(0o640)
+    assert decompress_file(filename).stat().st_mode & 0o777 == 0o640
+
+def test_decompress_corrupt(tmp_path):
+    filename = tmp_path / 'data.gz'
+    filename.write_bytes(b'not compressed')
+    with pytest.raises(OSError):
+        decompress_file(filename)
+    assert filename.exists()
+    assert [p.name for p in tmp_path.iterdir()] == ['data.gz']
+
+def test_decompress_unknown(tmp_path):
+    filename = tmp_path / 'data.txt'
+    filename.write_bytes(b'abc')
+    with pytest.raises(ValueError):
+        decompress_file(filename)
+
+def test_is_compressed():
+    assert is_compressed('a.gz')
+    assert is_compressed('a.tar.bz2')
+    assert not is_compressed('a.txt')
@@ -0,0 +1,36 @@
+import pytest
+
+from datatransport.utilities import GlobMatcher
+
+
+def test_include():
+    match = GlobMatcher(['transport.*', 'other.data'])
+    assert match('transport.site.data')
+    assert match('other.data')
+    assert not match('other.data2')
+    assert not match('news.transport.data')
+
+def test_exclude():
+    match = GlobMatcher(['transport.*'], ['*.test', 'transport.[ab]*'])
+    assert match('transport.site')
+    assert not match('transport.site.test')
+    assert not match('transport.beta')
+
+def test_no_include():
+    match = GlobMatcher([], ['*'])
+    assert not match('anything')
+
+@pytest.mark.parametrize('name', ['a.png', 'a.PNG', 'b.jpg', 'c.txt', 'd?x'])
+def test_same_as_fnmatch(name):
+    import fnmatch
+    include = ['*.png', '*.jpg', 'd[?]x']
+    exclude = ['b*']
+    expected = any(fnmatch.fnmatch(name, p) for p in include) and not any(
+        fnmatch.fnmatch(name, p) for p in exclude)
+    assert GlobMatcher(include, exclude)(name) == expected
+
+def test_cache_limit():
+    match = GlobMatcher(['*'], cachesize=10)
+    for index in range(25):
+        assert match(f'name{index}')
+    assert len(match.cache) <= 10
@@ -3,7 +3,7 @@ import pytest
 import zoneinfo
 
 from datetime import datetime, timedelta, timezone
-from datatransport.utilities import PatternTemplate
+from datatransport.utilities import PatternTemplate, CompiledTemplate
 
 def test_pattern_replace():
     replaceRule = PatternTemplate('rule')
@@ -65,3 +65,22 @@ def test_pattern_cache():
     result = replaceDict(src)
     assert result == 'Using a dictionary: 2005-06-15'
 
+
+def test_compiled_matches_chain():
+    newsgroup = PatternTemplate('newsgroup', '.')
+    filename = PatternTemplate('filename', '.')
+    header = PatternTemplate('header')
+    header.set_value({'x-site': 'abc'})
+    src = '/data/<newsgroup[1:]>/<header["x-site"]>/<filename[0]>-<other>.<filename[-1]>'
+    values = {'newsgroup': 'transport.site.data', 'filename': 'image.png'}
+    expected = src
+    for template in (newsgroup, filename, header):
+        expected = template(expected, values.get(template.pattern))
+    compiled = CompiledTemplate(src, [newsgroup, filename, header])
+    assert compiled(values) == expected
+    assert compiled(values) == '/data/site.data/abc/image-<other>.png'
+
+def test_compiled_missing_value():
+    compiled = CompiledTemplate('<rule>/<name>', [PatternTemplate('rule')])
+    assert compiled() == '<rule>/<name>'
+    assert compiled({'rule': 'a'}) == 'a/<name>'
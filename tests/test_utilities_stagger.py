@@ -0,0 +1,27 @@
+from datatransport.utilities import phase_offset
+
+
+def test_no_spread():
+    assert phase_offset('group/client', 0) == 0
+
+def test_negative_spread():
+    assert phase_offset('group/client', -10) == 0
+
+def test_deterministic():
+    assert phase_offset('group/client', 60) == phase_offset('group/client', 60)
+
+def test_bounded():
+    for index in range(1000):
+        offset = phase_offset(f'group/client{index}', 30)
+        assert 0 <= offset < 30
+
+def test_distinct():
+    offsets = {phase_offset(f'group/client{index}', 60) for index in range(100)}
+    assert len(offsets) == 100
+
+def test_spread_out():
+    offsets = [phase_offset(f'group/client{index}', 60) for index in range(600)]
+    buckets = [0] * 6
+    for offset in offsets:
+        buckets[int(offset // 10)] += 1
+    assert min(buckets) > 50